@@ -0,0 +1,169 @@
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.qc import excluded_wells, qc_path
+from backend.running_stats import RunningStats
+from backend.save_excel import save_excel
+from backend.series_index import SeriesIndex
+from backend.well_map_store import load_well_map
+
+# Files written by run_plate in each plate directory
+SORTED_CSV = os.path.join("csv", "results_sorted.csv")
+WELL_MAP_FILE = "well_map.json"
+
+USECOLS = ["Well", "Condition", "Time_h", "Closure"]
+
+
+def find_plate_dirs(inputs):
+    '''
+    Processed plate directories (containing csv/results_sorted.csv) from paths or glob patterns.
+    A directory that is not a plate itself (e.g. a batch output directory) contributes its sub-directories.
+    '''
+    plates = []
+    for pattern in inputs:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if os.path.isfile(os.path.join(path, SORTED_CSV)):
+                plates.append(path)
+            elif os.path.isdir(path):
+                plates.extend(sorted(
+                    os.path.dirname(os.path.dirname(p))
+                    for p in glob.glob(os.path.join(path, "*", SORTED_CSV))
+                ))
+    # Same plate given twice (e.g. directory and glob)
+    return list(dict.fromkeys(os.path.normpath(p) for p in plates))
+
+
+class PlateAggregator:
+    '''
+    Pooled statistics of the closure per (Condition, Time_h) over any number of processed plates.
+    Plates are read one at a time (only the Well / Condition / Time_h / Closure columns of
+    'results_sorted.csv') and merged into running count / mean / M2 accumulators, so memory
+    depends on the number of conditions, hours and plates, not on the amount of raw data.
+    Replicate counts are the number of distinct wells (per plate) measured for a condition and hour.
+    '''
+
+    KEYS = RunningStats.KEYS
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.per_plate = []         # per-plate statistics tables (small)
+        self.controls = set()       # conditions flagged as control on any plate
+        self.plates = []
+
+    def add_plate(self, plate_dir, well_map=None):
+        '''
+        Merge one processed plate. well_map defaults to the 'well_map.json' saved with the plate.
+        Wells excluded by the QC of the plate (csv/qc_wells.csv, see backend/qc.py) are left out.
+        '''
+        df = pd.read_csv(
+            os.path.join(plate_dir, SORTED_CSV),
+            usecols=USECOLS,
+            dtype={"Well": str, "Condition": str, "Time_h": np.int64, "Closure": np.float64},
+            engine="c",
+        )
+        df = df[df["Condition"].notna()]
+        qc_file = qc_path(os.path.join(plate_dir, "csv"))
+        if os.path.isfile(qc_file):
+            excluded = excluded_wells(pd.read_csv(qc_file, dtype={"Well": str, "decision": str}))
+            df = df[~df["Well"].isin(list(excluded))]
+        self.stats.update(df)
+
+        g = df.groupby(self.KEYS)
+        closure = g["Closure"]
+        stats = pd.DataFrame({
+            "mean": closure.mean(),
+            "std": closure.std(),
+            "n": closure.count(),
+            "n_wells": g["Well"].nunique(),
+        }).reset_index()
+        stats.insert(0, "Plate", os.path.basename(os.path.abspath(plate_dir)))
+        self.per_plate.append(stats)
+        self.plates.append(plate_dir)
+
+        if well_map is None:
+            map_path = os.path.join(plate_dir, WELL_MAP_FILE)
+            well_map = load_well_map(map_path) if os.path.isfile(map_path) else {}
+        self.controls.update(
+            info["condition"] for info in well_map.values()
+            if info.get("control_group", False) and info.get("condition") is not None
+        )
+
+    def by_plate(self):
+        '''['Plate', 'Condition', 'Time_h', 'mean', 'std', 'n', 'n_wells'] for every plate'''
+        if not self.per_plate:
+            return pd.DataFrame(columns=["Plate", *self.KEYS, "mean", "std", "n", "n_wells"])
+        return pd.concat(self.per_plate, ignore_index=True)
+
+    def results(self):
+        '''
+        Pooled ['Condition', 'Time_h', 'mean', 'std', 'n', 'n_wells', 'n_plates'],
+        sorted by condition and ascending time
+        '''
+        pooled = self.stats.result()
+        counts = self.by_plate().groupby(self.KEYS).agg(
+            n=("n", "sum"), n_wells=("n_wells", "sum"), n_plates=("Plate", "nunique")
+        ).reset_index()
+        return pooled.merge(counts, on=self.KEYS, how="left")
+
+    def control_map(self):
+        '''Minimal well map flagging the control conditions, as expected by save_excel / save_fig'''
+        return {cond: {"condition": cond, "control_group": True} for cond in sorted(self.controls)}
+
+
+def aggregate_plates(plate_dirs, name="aggregate", figures=True, figure_jobs=None):
+    '''
+    Combine processed plates into 'name/':
+        - csv/results_plot.csv : pooled mean / std with measurement, well and plate counts
+        - csv/results_by_plate.csv : the statistics of each plate, aligned on condition and time
+        - excel/name_grouped.xlsx and figures/ : as for a single plate
+    Returns the aggregator.
+    '''
+    aggregator = PlateAggregator()
+    for plate_dir in plate_dirs:
+        aggregator.add_plate(plate_dir)
+
+    output_dir = os.path.join(name, "csv")
+    os.makedirs(output_dir, exist_ok=True)
+    results = aggregator.results()
+    results.to_csv(os.path.join(output_dir, "results_plot.csv"), index=False, encoding="utf-8")
+    by_plate = aggregator.by_plate()
+    by_plate.to_csv(os.path.join(output_dir, "results_by_plate.csv"), index=False, encoding="utf-8")
+
+    series = SeriesIndex(results)
+    well_map = aggregator.control_map()
+    save_excel(series, well_map, name)
+    if figures:
+        from backend.save_fig import save_fig
+        save_fig(series, well_map, name, jobs=figure_jobs)
+    return aggregator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regroupement des résultats de plusieurs plaques traitées.")
+    parser.add_argument("inputs", nargs="+",
+                        help="Dossiers de plaques traitées (ou dossiers les contenant, motifs glob)")
+    parser.add_argument("-o", "--output", default="aggregate", help="Dossier de sortie (défaut: ./aggregate)")
+    parser.add_argument("--no-figures", action="store_true", help="Ne pas générer les figures")
+    args = parser.parse_args(argv)
+
+    plate_dirs = find_plate_dirs(args.inputs)
+    if not plate_dirs:
+        parser.error("Aucune plaque traitée trouvée (csv/results_sorted.csv)")
+
+    # Outputs are written relative to the parent of the output directory (as for a plate)
+    plate_dirs = [os.path.abspath(p) for p in plate_dirs]
+    output = os.path.abspath(args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    os.chdir(os.path.dirname(output))
+
+    aggregator = aggregate_plates(plate_dirs, os.path.basename(output), figures=not args.no_figures)
+    results = aggregator.results()
+    print(f"{len(plate_dirs)} plaques, {results['Condition'].nunique()} conditions -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import random
-import importlib.util
-import difflib
-import os
 
-ROWS = ["A","B","C","D","E","F","G","H"]
-COLS = [str(i) for i in range(1,13)]
+from backend.condition_index import N_SUGGESTIONS, ConditionIndex
+from backend.plate_format import PLATE_96
+from backend.well_map_store import load_well_map
+
+# Default plate layout (96 wells), see backend/plate_format.py for 384/1536
+ROWS = PLATE_96.row_labels
+COLS = PLATE_96.col_labels
 
 
 def random_color():
@@ -16,11 +18,18 @@ def random_color():
 #   TRAITEMENT DES CONDITIONS
 # ----------------------------------------------------------------------
 
-def get_suggestions(typed: str, library: list):
-    """Retourne les conditions ressemblantes."""
+def get_suggestions(typed: str, library, n=N_SUGGESTIONS):
+    """
+    Retourne les conditions ressemblantes : début du nom, puis mots et recherche approchée
+    (trigrammes), conditions fréquentes et récentes en premier à score égal.
+    library : index de la bibliothèque (ConditionManager.index, mis à jour à chaque ajout)
+    ou simple liste de noms (index construit à chaque appel).
+    """
     if not typed:
         return []
-    return difflib.get_close_matches(typed, library, n=5, cutoff=0.1)
+    if not isinstance(library, ConditionIndex):
+        library = ConditionIndex(library)
+    return library.search(typed, n)
 
 
 # ----------------------------------------------------------------------
@@ -29,31 +38,7 @@ def get_suggestions(typed: str, library: list):
 
 def import_existing_map(path: str):
     """
-    Charge un fichier Python well_map.py existant.
+    Charge une carte existante (JSON structuré ou ancien well_map.py, sans l'exécuter).
     Retourne le dict {well: {...}}.
     """
-    spec = importlib.util.spec_from_file_location("well_map", path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module.well_map
-
-
-# ----------------------------------------------------------------------
-#   EXPORT WELL_MAP
-# ----------------------------------------------------------------------
-
-def export_well_map(final_map: dict, output_path="./backend/well_map.py"):
-    """Écrit un fichier Python well_map.py standardisé."""
-    lines = ["well_map = {"]
-    for well in sorted(final_map.keys()):
-        info = final_map[well]
-        lines.append(
-            f'    "{well}": {{"condition": {repr(info["condition"])}, '
-            f'"replicate": {repr(info["replicate"])}, '
-            f'"control_group": {repr(info["control_group"])}}},'
-        )
-    lines.append("}")
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    return load_well_map(path)
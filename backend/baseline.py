@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# How the images of a well at one timepoint (planes of a z-stack, fields) are
+# combined before the baseline and the closure. None keeps one closure per image.
+AGGREGATIONS = ("sum", "mean", "max")
+
+# Columns identifying the image of a well in the data table (when exported)
+IMAGE_COLUMNS = ("Plane", "Field")
+
+
+def check_aggregation(how):
+    '''Validate an aggregation name, 'none' / None meaning no aggregation'''
+    if how in (None, "none"):
+        return None
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Agrégation inconnue '{how}' (attendu : {', '.join(AGGREGATIONS)} ou none)")
+    return how
+
+
+def valid_area(area, present):
+    '''Measurements usable as a baseline: exported, finite and strictly positive'''
+    with np.errstate(invalid="ignore"):
+        return present & (area > 0)
+
+
+def first_valid_baseline(area, present):
+    '''
+    (n_wells, n_timepoints, n_images) -> (n_wells, n_images) area at the first valid
+    timepoint of each well image, NaN if the image has no valid measurement
+    '''
+    valid = valid_area(area, present)
+    first = valid.argmax(axis=1)
+    baseline = np.take_along_axis(area, first[:, None, :], axis=1)[:, 0, :]
+    baseline[~valid.any(axis=1)] = np.nan
+    return baseline
+
+
+def aggregate_images(area, present, how):
+    '''
+    Combine the images (last axis) of each well and timepoint: returns (area, present)
+    with a single image. 'sum' adds the exported images (NaN if one of them is NaN),
+    'mean' and 'max' ignore NaN areas.
+    '''
+    any_present = present.any(axis=2, keepdims=True)
+    if how == "sum":
+        combined = np.where(present, area, 0.0).sum(axis=2, keepdims=True)
+    elif how == "mean":
+        counted = present & ~np.isnan(area)
+        count = counted.sum(axis=2, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            combined = np.where(counted, area, 0.0).sum(axis=2, keepdims=True) / count
+    else:
+        combined = np.fmax.reduce(np.where(present, area, np.nan), axis=2, keepdims=True)
+    combined[~any_present] = np.nan
+    return combined, any_present
+
+
+def aggregate_rows(df, how, keys=("Row", "Column", "Timepoint")):
+    '''
+    Same combination on rows of the data table: one row per well and timepoint,
+    Time_s of the first image. Groups are kept in order of appearance.
+    '''
+    g = df.assign(_nan=df["Area_um2"].isna()).groupby(list(keys), sort=False)
+    combined = getattr(g["Area_um2"], how)()
+    if how == "sum":
+        combined = combined.mask(g["_nan"].any())
+    out = g["Time_s"].first().to_frame()
+    out["Area_um2"] = combined
+    return out.reset_index()
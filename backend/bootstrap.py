@@ -0,0 +1,192 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.control_stats import norm_cdf
+
+# Error bars available to the Excel file and the figures, besides the standard deviation
+METHODS = ("percentile", "bca")
+
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+SEED = 0
+
+# Upper bound of the number of bootstrap means held at once (memory)
+_BLOCK = 4_000_000
+
+
+def norm_ppf(p):
+    '''Standard normal quantile (Acklam's rational approximation, relative error < 1.2e-9)'''
+    p = np.asarray(p, dtype=np.float64)
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Tails, by symmetry
+        tail = np.minimum(p, 1 - p)
+        q = np.sqrt(-2 * np.log(tail))
+        x_tail = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q + c[5]) / \
+                 ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q + 1)
+        x_tail = np.where(p < 0.5, x_tail, -x_tail)
+        # Central region
+        q = p - 0.5
+        r = q * q
+        x_mid = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q / \
+                (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+    return np.where(np.abs(p - 0.5) <= 0.5 - 0.02425, x_mid, x_tail)
+
+
+def _sorted_quantile(values, q):
+    '''Linear-interpolation quantiles (as np.quantile) of rows sorted along axis 1, one level per row'''
+    pos = np.clip(q, 0, 1) * (values.shape[1] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, values.shape[1] - 1)
+    rows = np.arange(len(values))
+    return values[rows, lo] + (pos - lo) * (values[rows, hi] - values[rows, lo])
+
+
+def bootstrap_counts(size, resamples=RESAMPLES, seed=SEED):
+    '''
+    (resamples, size) number of times each of 'size' replicates is drawn in each resample.
+    Drawn once per replicate count and seed, so a group always gets the same resamples
+    whatever the other groups of the plate.
+    '''
+    rng = np.random.default_rng([seed, size])
+    idx = rng.integers(0, size, size=(resamples, size))
+    counts = np.zeros((resamples, size))
+    np.add.at(counts, (np.arange(resamples)[:, None], idx), 1)
+    return counts
+
+
+def bootstrap_means(samples, resamples=RESAMPLES, seed=SEED):
+    '''
+    Bootstrap distribution of the mean of groups of equal size, all groups at once:
+    samples is (n_groups, size); returns (n_groups, resamples), sorted along axis 1
+    '''
+    counts = bootstrap_counts(samples.shape[1], resamples, seed)
+    means = samples @ (counts.T / samples.shape[1])
+    means.sort(axis=1)
+    return means
+
+
+def jackknife_acceleration(samples):
+    '''BCa acceleration of the mean of groups of equal size, from the leave-one-out means (0 when undefined)'''
+    size = samples.shape[1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        loo = (samples.sum(axis=1, keepdims=True) - samples) / (size - 1)
+        d = loo.mean(axis=1, keepdims=True) - loo
+        acc = (d ** 3).sum(axis=1) / (6 * (d ** 2).sum(axis=1) ** 1.5)
+    return np.where(np.isfinite(acc), acc, 0.0)
+
+
+def mean_intervals(samples, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    '''
+    Percentile and BCa bootstrap confidence intervals of the mean of groups of equal size
+    (samples is (n_groups, size)). Returns a dict of (n_groups,) arrays:
+    mean, ci_low, ci_high, bca_low, bca_high (NaN for groups of fewer than 2 values).
+    '''
+    samples = np.asarray(samples, dtype=np.float64)
+    out = {name: np.full(len(samples), np.nan) for name in ("ci_low", "ci_high", "bca_low", "bca_high")}
+    out["mean"] = samples.mean(axis=1) if samples.shape[1] else np.full(len(samples), np.nan)
+    if samples.shape[1] < 2:
+        return out
+
+    alpha = (1 - confidence) / 2
+    levels = np.array([alpha, 1 - alpha])
+    step = max(1, _BLOCK // resamples)
+    for s in range(0, len(samples), step):
+        block = slice(s, s + step)
+        boot = bootstrap_means(samples[block], resamples, seed)
+        mean = out["mean"][block]
+        for name, q in zip(("ci_low", "ci_high"), levels):
+            out[name][block] = _sorted_quantile(boot, np.full(len(boot), q))
+
+        # Bias correction from the share of resamples below the estimate, kept away from 0 and 1.
+        # Ties are counted within rounding: the rounding of the matrix product depends on the
+        # other groups of the block, and must not change the interval of a group
+        diff = boot - mean[:, None]
+        tol = 1e-9 * np.maximum(np.abs(mean), 1.0)[:, None]
+        below = (diff < -tol).sum(axis=1) + 0.5 * (np.abs(diff) <= tol).sum(axis=1)
+        z0 = norm_ppf(np.clip(below / resamples, 1 / (resamples + 1), resamples / (resamples + 1)))
+        acc = jackknife_acceleration(samples[block])
+        for name, q in zip(("bca_low", "bca_high"), levels):
+            z = z0 + norm_ppf(q)
+            out[name][block] = _sorted_quantile(boot, norm_cdf(z0 + z / (1 - acc * z)))
+    return out
+
+
+# ----------------------------------------------------------------------
+#   TABLES
+# ----------------------------------------------------------------------
+def condition_intervals(conditions, time_h, values, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    '''
+    Bootstrap confidence intervals of the mean closure per (Condition, Time_h), resampling the
+    replicate wells, from flat arrays (one value per well and time, as control_stats.group_stats).
+    DataFrame ['Condition', 'Time_h', 'n', 'mean', 'ci_low', 'ci_high', 'bca_low', 'bca_high'],
+    sorted by condition and time; the same inputs and seed always give the same intervals.
+    '''
+    df = pd.DataFrame({"Condition": conditions, "Time_h": time_h, "value": values})
+    df = df[df["Condition"].notna() & df["value"].notna() & df["Time_h"].notna()]
+    df = df.astype({"Condition": str, "Time_h": np.int64}).sort_values(["Condition", "Time_h"], kind="stable")
+
+    # Groups of the same replicate count are resampled together
+    g = df.groupby(["Condition", "Time_h"], sort=False)
+    table = g.size().rename("n").reset_index()
+    position = g.cumcount().to_numpy()
+    group = g.ngroup().to_numpy()
+    values = df["value"].to_numpy(dtype=np.float64)
+    for name in ("mean", "ci_low", "ci_high", "bca_low", "bca_high"):
+        table[name] = np.nan
+    sizes = table["n"].to_numpy()
+    for size in np.unique(sizes):
+        rows = np.flatnonzero(sizes == size)
+        samples = np.empty((len(rows), size))
+        member = sizes[group] == size
+        samples[np.searchsorted(rows, group[member]), position[member]] = values[member]
+        for name, result in mean_intervals(samples, resamples, confidence, seed).items():
+            table.loc[rows, name] = result
+    return table
+
+
+def plate_intervals(plate, **kwargs):
+    '''condition_intervals of a PlateData, one value per well (closure averaged over its images) and time'''
+    n_times = plate.well_closure.shape[1]
+    conditions = np.repeat(np.asarray(plate.conditions, dtype=object), n_times)
+    return condition_intervals(conditions, plate.time_h.ravel(), plate.well_closure.ravel(), **kwargs)
+
+
+def interval_bounds(table, series, method="percentile"):
+    '''
+    {condition: (low, high)} arrays aligned with the times of each curve of a SeriesIndex,
+    for the error bars of save_excel / save_fig (NaN where no interval is available)
+    '''
+    low, high = ("ci_low", "ci_high") if method == "percentile" else ("bca_low", "bca_high")
+    bounds = {}
+    for cond, block in table.groupby("Condition", sort=False):
+        data = series.get(cond)
+        if data is None:
+            continue
+        pos = pd.Index(block["Time_h"].to_numpy()).get_indexer(data.time)
+        found = pos >= 0
+        bounds[cond] = tuple(
+            np.where(found, block[col].to_numpy(dtype=np.float64)[pos], np.nan) for col in (low, high)
+        )
+    return bounds
+
+
+def write_intervals(table, output_dir):
+    '''Write 'bootstrap_ci.csv' in output_dir and return its path'''
+    os.makedirs(output_dir, exist_ok=True)
+    path = intervals_path(output_dir)
+    table.to_csv(path, index=False, encoding="utf-8")
+    return path
+
+
+def intervals_path(output_dir):
+    return os.path.join(output_dir, "bootstrap_ci.csv")
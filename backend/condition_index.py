@@ -0,0 +1,134 @@
+import bisect
+import math
+import time
+from collections import Counter, defaultdict
+
+# Suggestions returned by default
+N_SUGGESTIONS = 5
+# Smallest trigram similarity (Dice coefficient) of a fuzzy match without prefix or substring
+MIN_SIMILARITY = 0.1
+# Bonus of a name starting with the typed text, of a word of the name starting with it,
+# and of a name containing it elsewhere
+PREFIX_BONUS = 1.0
+WORD_PREFIX_BONUS = 0.5
+SUBSTRING_BONUS = 0.25
+# Usage weighting: log(1 + number of uses) and recency (halved every RECENCY_HALF_LIFE seconds).
+# Kept small so that usage only reorders names matching the typed text about as well.
+FREQUENCY_WEIGHT = 0.05
+RECENCY_WEIGHT = 0.2
+RECENCY_HALF_LIFE = 14 * 24 * 3600
+
+# Greek mu typed instead of the micro sign
+_MICRO = str.maketrans({"μ": "µ"})
+
+
+def normalize(text):
+    '''Form used for matching: lower case, micro written 'µ', single spaces'''
+    return " ".join(str(text).lower().translate(_MICRO).split())
+
+
+def trigrams(text):
+    '''Set of the character trigrams of a normalized text, padded so that short texts have some'''
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ConditionIndex:
+    '''
+    Search index of the condition library, built once and updated name by name:
+        - inverted index trigram -> names, for fuzzy matches (typos, other spellings)
+        - sorted normalized names, for prefix matches by bisection
+        - usage of each name (number of uses, last use), to rank the frequent and recent ones first
+    usage: {name: [count, last use (time.time())]}, shared with the caller (updated in place).
+    '''
+
+    def __init__(self, names=(), usage=None):
+        self.names = []                     # id -> name
+        self.ids = {}                       # name -> id
+        self.keys = []                      # id -> normalized name
+        self.grams = []                     # id -> trigrams of the normalized name
+        self.postings = defaultdict(list)   # trigram -> ids
+        self.sorted_keys = []               # (normalized name, id), sorted
+        self.usage = {} if usage is None else usage
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name):
+        '''Index a name (no-op if already indexed)'''
+        if name in self.ids:
+            return
+        i = len(self.names)
+        key = normalize(name)
+        grams = trigrams(key)
+        self.names.append(name)
+        self.ids[name] = i
+        self.keys.append(key)
+        self.grams.append(grams)
+        for g in grams:
+            self.postings[g].append(i)
+        bisect.insort(self.sorted_keys, (key, i))
+
+    def record_use(self, name, now=None):
+        '''Count one use of name now (indexed if needed)'''
+        self.add(name)
+        count, _ = self.usage.get(name, (0, 0.0))
+        self.usage[name] = [count + 1, time.time() if now is None else now]
+
+    def usage_weight(self, name, now=None):
+        count, last = self.usage.get(name, (0, 0.0))
+        if not count:
+            return 0.0
+        age = max((time.time() if now is None else now) - last, 0.0)
+        return FREQUENCY_WEIGHT * math.log1p(count) + RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE)
+
+    def search(self, typed, n=N_SUGGESTIONS, now=None):
+        '''
+        Names best matching typed, at most n: names starting with it first, then names with a
+        word starting with it or containing it, then fuzzy matches by shared trigrams; ties are
+        broken by usage (frequency, recency) then alphabetically.
+        '''
+        query = normalize(typed)
+        if not query:
+            return []
+
+        # Fuzzy candidates: number of trigrams shared with the query
+        query_grams = trigrams(query)
+        shared = Counter()
+        for g in query_grams:
+            shared.update(self.postings.get(g, ()))
+
+        # Prefix matches, found by bisection in the sorted names
+        prefixed = set()
+        for j in range(bisect.bisect_left(self.sorted_keys, (query,)), len(self.sorted_keys)):
+            key, i = self.sorted_keys[j]
+            if not key.startswith(query):
+                break
+            prefixed.add(i)
+
+        # A query of 3 characters or more shares a trigram with every name containing it,
+        # shorter ones are looked for in every name
+        contained = set()
+        if len(query) < 3:
+            contained = {i for i, key in enumerate(self.keys) if query in key}
+
+        scored = []
+        for i in prefixed.union(shared, contained):
+            similarity = 2 * shared.get(i, 0) / (len(query_grams) + len(self.grams[i]))
+            key = self.keys[i]
+            if i in prefixed:
+                bonus = PREFIX_BONUS
+            elif any(word.startswith(query) for word in key.split()):
+                bonus = WORD_PREFIX_BONUS
+            elif query in key:
+                bonus = SUBSTRING_BONUS
+            elif similarity >= MIN_SIMILARITY:
+                bonus = 0.0
+            else:
+                continue
+            name = self.names[i]
+            scored.append((-(similarity + bonus + self.usage_weight(name, now)), key, name))
+
+        return [name for _, _, name in sorted(scored)[:n]]
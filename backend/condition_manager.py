@@ -1,6 +1,9 @@
 import json
 import os
 
+from backend.condition_index import ConditionIndex
+from backend.conditions import parse_condition
+
 DEFAULT_CONDITIONS = [
     "DMEM vide", "DMEM+SVF",
     "COL1", "COL3", "COL10",
@@ -16,9 +19,18 @@ class ConditionManager:
         # si dossier data/ n'existe pas → créer
         os.makedirs(os.path.dirname(json_path), exist_ok=True)
 
+        # utilisation de chaque condition {nom: [nombre, dernière utilisation]}, pour les suggestions
+        self.usage = {}
+
         # charger ou créer
         self.conditions = self.load_conditions()
 
+        # index de recherche (suggestions) et identité des conditions, mis à jour à chaque ajout
+        self.index = ConditionIndex(self.conditions, self.usage)
+        self.keys = {}
+        for c in self.conditions:
+            self.keys.setdefault(parse_condition(c).key, c)
+
     def load_conditions(self):
         """Charge conditions depuis JSON. Sinon crée un fichier par défaut."""
         if not os.path.exists(self.json_path):
@@ -28,21 +40,38 @@ class ConditionManager:
         try:
             with open(self.json_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
+                self.usage.update(data.get("usage", {}))
                 return data.get("conditions", DEFAULT_CONDITIONS.copy())
         except:
             return DEFAULT_CONDITIONS.copy()
 
     def save_conditions(self, cond_list):
-        """Écrit la liste complète dans le JSON."""
+        """Écrit la liste complète (et l'utilisation des conditions) dans le JSON."""
         with open(self.json_path, "w", encoding="utf-8") as f:
-            json.dump({"conditions": cond_list}, f, indent=4)
+            json.dump({"conditions": cond_list, "usage": self.usage}, f, indent=4)
 
     def add_condition(self, cond):
-        """Ajoute une condition et sauvegarde, sans doublon."""
+        """
+        Ajoute une condition et sauvegarde, sans doublon ; compte son utilisation (suggestions).
+        Une autre écriture de la même dose ('PTX-3 10 ng', 'PTX-3 0.01µg' pour 'PTX-3 10ng')
+        n'est pas ajoutée : retourne le nom déjà présent dans la bibliothèque, sinon cond.
+        """
         cond = cond.strip()
-        if cond and cond not in self.conditions:
+        if not cond:
+            return cond
+        existing = self.find_equivalent(cond)
+        if existing is None:
             self.conditions.append(cond)
-            self.save_conditions(self.conditions)
+            self.keys[parse_condition(cond).key] = cond
+        else:
+            cond = existing
+        self.index.record_use(cond)
+        self.save_conditions(self.conditions)
+        return cond
+
+    def find_equivalent(self, cond):
+        """Nom de la bibliothèque désignant la même condition et la même dose que cond, sinon None."""
+        return self.keys.get(parse_condition(cond).key)
 
     def get_all(self):
         return self.conditions
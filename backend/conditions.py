@@ -0,0 +1,75 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Dose units (lower case, micro written 'µ') -> (kind, factor to the canonical unit of the kind)
+UNITS = {
+    "pg": ("mass", 1e-3), "ng": ("mass", 1.0), "µg": ("mass", 1e3), "mg": ("mass", 1e6),
+    "pm": ("molar", 1e-3), "nm": ("molar", 1.0), "µm": ("molar", 1e3), "mm": ("molar", 1e6),
+}
+CANONICAL_UNITS = {"mass": "ng", "molar": "nM"}
+
+# Order of the kinds of dose when sorting: no dose, bare number, mass, molar
+# (a mass and a molar concentration cannot be compared without the molar mass)
+KIND_ORDER = {None: 0, "": 1, "mass": 2, "molar": 3}
+
+# '<base> <value>[ ]<unit>', e.g. 'COL7A1-R 20ng', 'NRP1-E 2000 pg', 'PTX-3 0,5µM', 'VEGFA 10'
+CONDITION_PATTERN = re.compile(r"^(?P<base>.*?\S)\s+(?P<value>\d+(?:[.,]\d+)?|[.,]\d+)\s*(?P<unit>[^\W\d_]*)$")
+
+_MICRO = str.maketrans({"μ": "µ", "u": "µ"})
+
+
+class Condition(namedtuple("Condition", ["name", "base", "subgroup", "family", "value", "unit", "kind", "amount"])):
+    '''
+    Parsed condition name, e.g. 'COL7A1-R 2000pg':
+        base     : name without the dose ('COL7A1-R'), the name itself without dose
+        subgroup : first word of the name ('COL7A1-R')
+        family   : subgroup before its first '-' ('COL7A1')
+        value, unit : dose as written (2000.0, 'pg'), None / '' without dose or unit
+        kind     : 'mass', 'molar', '' (number without unit) or None (no dose)
+        amount   : dose in the canonical unit of its kind (2.0 ng), None without dose
+    '''
+
+    __slots__ = ()
+
+    @property
+    def dose_key(self):
+        '''Sort key of the dose: by kind (see KIND_ORDER), then canonical amount'''
+        return KIND_ORDER[self.kind], self.amount or 0.0
+
+    @property
+    def canonical_unit(self):
+        return CANONICAL_UNITS.get(self.kind, "")
+
+    @property
+    def key(self):
+        '''Identity of the condition: two spellings of the same dose ('10ng', '0.01 µg') share it'''
+        return self.base, self.kind, self.amount
+
+
+@lru_cache(maxsize=65536)
+def parse_condition(name):
+    '''
+    Condition of a name (memoized: the same name always returns the same object),
+    None for None. A trailing number is a dose when its unit, if any, is known (see UNITS).
+    '''
+    if name is None:
+        return None
+    name = str(name)
+    subgroup = name.split()[0] if name.split() else name
+    family = subgroup.split("-")[0]
+
+    base, value, unit, kind, amount = name, None, "", None, None
+    m = CONDITION_PATTERN.match(name.strip())
+    if m:
+        written = m.group("unit")
+        normalized = written.lower().translate(_MICRO)
+        if not written or normalized in UNITS:
+            base = m.group("base")
+            value = float(m.group("value").replace(",", "."))
+            unit = written
+            kind, factor = UNITS[normalized] if written else ("", 1.0)
+            # Rounded so that equivalent spellings give the same amount (0.01 µg == 10 ng)
+            amount = float(f"{value * factor:.12g}")
+    return Condition(name, base, subgroup, family, value, unit, kind, amount)
+
@@ -0,0 +1,284 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# Significance levels of the figure markers, from the most significant
+MARKERS = ((0.001, "***"), (0.01, "**"), (0.05, "*"))
+
+# Quadrature of the Dunnett probability: nodes over the common normal factor and over
+# the pooled standard deviation ratio s = sqrt(chi2_df / df)
+_Z_NODES, _Z_WEIGHTS = np.polynomial.hermite_e.hermegauss(48)
+_Z_WEIGHTS = _Z_WEIGHTS / _Z_WEIGHTS.sum()
+_S_NODES, _S_WEIGHTS = np.polynomial.legendre.leggauss(32)
+
+# Upper bound of the number of quadrature terms evaluated at once (memory)
+_BLOCK = 2_000_000
+
+
+# ----------------------------------------------------------------------
+#   DISTRIBUTIONS (NumPy only)
+# ----------------------------------------------------------------------
+_lgamma = np.vectorize(math.lgamma, otypes=[np.float64])
+
+
+def norm_cdf(x):
+    '''Standard normal CDF, from the complementary error function (relative error < 1.2e-7)'''
+    x = np.asarray(x, dtype=np.float64)
+    z = np.abs(x) / math.sqrt(2)
+    t = 1 / (1 + 0.5 * z)
+    # Chebyshev fit of erfc (Numerical Recipes, erfcc)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    erfc = t * np.exp(poly)
+    return np.where(x >= 0, 1 - erfc / 2, erfc / 2)
+
+
+def betainc(a, b, x, iterations=300):
+    '''Regularized incomplete beta function I_x(a, b), vectorized (continued fraction, modified Lentz)'''
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (a, b, x)))
+    result = np.full(a.shape, np.nan)
+    ok = (a > 0) & (b > 0) & (x >= 0) & (x <= 1)
+    result[ok & (x == 0)] = 0.0
+    result[ok & (x == 1)] = 1.0
+    inner = ok & (x > 0) & (x < 1)
+
+    # The continued fraction converges quickly for x < (a + 1) / (a + b + 2); otherwise use symmetry
+    swap = inner & (x > (a + 1) / (a + b + 2))
+    aa, bb, xx = np.where(swap, b, a), np.where(swap, a, b), np.where(swap, 1 - x, x)
+    aa, bb, xx = aa[inner], bb[inner], xx[inner]
+
+    log_front = (_lgamma(aa + bb) - _lgamma(aa) - _lgamma(bb)
+                 + aa * np.log(xx) + bb * np.log1p(-xx))
+    tiny = 1e-300
+    c = np.ones_like(xx)
+    d = 1 - (aa + bb) * xx / (aa + 1)
+    d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+    h = d.copy()
+    for m in range(1, iterations + 1):
+        m2 = 2 * m
+        for num in (m * (bb - m) * xx / ((aa + m2 - 1) * (aa + m2)),
+                    -(aa + m) * (aa + bb + m) * xx / ((aa + m2) * (aa + m2 + 1))):
+            d = 1 + num * d
+            d = 1 / np.where(np.abs(d) < tiny, tiny, d)
+            c = 1 + num / c
+            c = np.where(np.abs(c) < tiny, tiny, c)
+            delta = c * d
+            h = h * delta
+        if np.all(np.abs(delta - 1) < 1e-14):
+            break
+
+    value = np.exp(log_front) * h / aa
+    result[inner] = np.where(swap[inner], 1 - value, value)
+    return result
+
+
+def t_sf2(t, df):
+    '''Two-sided p-value of Student's t: P(|T| >= |t|) with df degrees of freedom'''
+    t, df = np.broadcast_arrays(np.asarray(t, dtype=np.float64), np.asarray(df, dtype=np.float64))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return betainc(df / 2, 0.5, df / (df + t * t))
+
+
+def dunnett_p(t, b, df):
+    '''
+    Two-sided many-to-one (Dunnett) adjusted p-values.
+    t: (n_families, k) statistics of the k comparisons to the common control (NaN for padding),
+    b: (n_families, k) sqrt(n_i / (n_i + n_control)), so that corr(T_i, T_j) = b_i b_j,
+    df: (n_families,) degrees of freedom of the pooled variance.
+    p_i = 1 - P(max_j |T_j| < |t_i|), integrated over the common normal factor and the
+    distribution of the pooled standard deviation (Gauss quadrature).
+    '''
+    t, b = np.asarray(t, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    df = np.asarray(df, dtype=np.float64)
+    n_fam, k = t.shape
+    p = np.full(t.shape, np.nan)
+    if t.size == 0:
+        return p
+
+    # Nodes and weights of s = sqrt(chi2_df / df), per family (a single node s = 1 for large df)
+    width = np.where(df > 1000, 0.0, 8 / np.sqrt(2 * np.maximum(df, 1)))
+    lo = np.maximum(1 - width, 0.0)[:, None]
+    hi = (1 + width)[:, None]
+    s = lo + (hi - lo) * (_S_NODES[None, :] + 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        half = df[:, None] / 2
+        log_pdf = (math.log(2) + half * np.log(half) - _lgamma(half)
+                   + (df[:, None] - 1) * np.log(s) - half * s * s)
+        ws = np.exp(log_pdf) * _S_WEIGHTS[None, :] * (hi - lo) / 2
+    ws = np.where(df[:, None] > 1000, np.r_[1.0, np.zeros(len(_S_NODES) - 1)][None, :], ws)
+    s = np.where(df[:, None] > 1000, 1.0, s)
+    ws = ws / ws.sum(axis=1, keepdims=True)
+
+    # Members of a family share few distinct b values (replicate counts): the product over the
+    # members is computed once per distinct value, raised to its multiplicity
+    member = ~np.isnan(t) & ~np.isnan(b)
+    values, code = np.unique(b[member], return_inverse=True)
+    counts = np.zeros((n_fam, len(values)))
+    np.add.at(counts, (np.nonzero(member)[0], code), 1)
+    bu = values[None, None, :, None, None]
+    ru = np.sqrt(1 - bu * bu)
+    z = _Z_NODES[None, None, None, :, None]
+
+    step = max(1, _BLOCK // max(1, k * len(values) * len(_Z_NODES) * len(_S_NODES)))
+    for f0 in range(0, n_fam, step):
+        f = slice(f0, f0 + step)
+        # (F, k_i, u, z, s): P(|T_u| < |t_i|) given the common factor z and the pooled sd s
+        c = np.abs(t[f])[:, :, None, None, None] * s[f][:, None, None, None, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            inside = norm_cdf((c - bu * z) / ru) - norm_cdf((-c - bu * z) / ru)
+            log_prob = counts[f][:, None, :, None, None] * np.log(np.maximum(inside, 1e-300))
+        prob = np.exp(log_prob.sum(axis=2))                 # (F, k_i, z, s)
+        prob = np.einsum("fizs,z,fs->fi", prob, _Z_WEIGHTS, ws[f])
+        p[f] = np.clip(1 - prob, 0.0, 1.0)
+    p[~member | ~np.isfinite(t)] = np.nan
+    p[np.isinf(t)] = 0.0
+    return p
+
+
+def fdr_bh(p):
+    '''Benjamini-Hochberg adjusted p-values (q-values) of a 1-D array, NaN entries are ignored'''
+    p = np.asarray(p, dtype=np.float64)
+    q = np.full(p.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(p))
+    if len(valid) == 0:
+        return q
+    order = valid[np.argsort(p[valid])]
+    ranked = p[order] * len(valid) / np.arange(1, len(valid) + 1)
+    q[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return q
+
+
+# ----------------------------------------------------------------------
+#   COMPARISONS TO CONTROLS
+# ----------------------------------------------------------------------
+def group_stats(conditions, time_h, values):
+    '''
+    Replicate statistics per (Condition, Time_h) from flat arrays (one value per well and time):
+    DataFrame ['Condition', 'Time_h', 'n', 'mean', 'var'] (sample variance)
+    '''
+    df = pd.DataFrame({"Condition": conditions, "Time_h": time_h, "value": values})
+    df = df[df["Condition"].notna() & df["value"].notna() & df["Time_h"].notna()]
+    df = df.astype({"Time_h": np.int64})
+    g = df.groupby(["Condition", "Time_h"], observed=True)["value"]
+    return pd.DataFrame({"n": g.count(), "mean": g.mean(), "var": g.var()}).reset_index()
+
+
+def plate_group_stats(plate):
+    '''group_stats of a PlateData, one value per well (closure averaged over its images) and time'''
+    n_times = plate.well_closure.shape[1]
+    conditions = np.repeat(np.asarray(plate.conditions, dtype=object), n_times)
+    return group_stats(conditions, plate.time_h.ravel(), plate.well_closure.ravel())
+
+
+def compare_to_controls(stats, controls):
+    '''
+    Compare every condition to each control condition at every time (array operations over the
+    conditions x times grid):
+        - Welch t-test (t, df, two-sided p) and its Benjamini-Hochberg q-value per control
+        - Dunnett-style many-to-one test with the pooled variance of each (control, time) family
+        - effect sizes: mean difference, Cohen's d and Hedges' g
+    stats: output of group_stats. Returns one row per (Control, Condition, Time_h).
+    '''
+    columns = ["Control", "Condition", "Time_h", "n", "n_control", "mean", "mean_control", "diff",
+               "cohen_d", "hedges_g", "welch_t", "welch_df", "welch_p", "welch_q", "dunnett_t",
+               "dunnett_df", "dunnett_p"]
+    tables = []
+    for control in controls:
+        ref = stats[stats["Condition"] == control].set_index("Time_h")[["n", "mean", "var"]]
+        cmp_ = stats[(stats["Condition"] != control) & ~stats["Condition"].isin(controls)]
+        cmp_ = cmp_[cmp_["Time_h"].isin(ref.index)]
+        if cmp_.empty:
+            continue
+        r = ref.loc[cmp_["Time_h"]]
+        n1, m1, v1 = (cmp_[c].to_numpy(dtype=np.float64) for c in ("n", "mean", "var"))
+        n0, m0, v0 = (r[c].to_numpy(dtype=np.float64) for c in ("n", "mean", "var"))
+        diff = m1 - m0
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Welch
+            se1, se0 = v1 / n1, v0 / n0
+            welch_t = diff / np.sqrt(se1 + se0)
+            welch_df = (se1 + se0) ** 2 / (se1**2 / (n1 - 1) + se0**2 / (n0 - 1))
+            welch_p = t_sf2(welch_t, welch_df)
+
+            # Effect sizes
+            pooled = np.sqrt(((n1 - 1) * v1 + (n0 - 1) * v0) / (n1 + n0 - 2))
+            cohen_d = diff / pooled
+            hedges_g = cohen_d * (1 - 3 / (4 * (n1 + n0) - 9))
+
+        table = pd.DataFrame({
+            "Control": control,
+            "Condition": cmp_["Condition"].to_numpy(),
+            "Time_h": cmp_["Time_h"].to_numpy(),
+            "n": n1.astype(np.int64), "n_control": n0.astype(np.int64),
+            "mean": m1, "mean_control": m0, "diff": diff,
+            "cohen_d": cohen_d, "hedges_g": hedges_g,
+            "welch_t": welch_t, "welch_df": welch_df, "welch_p": welch_p,
+        })
+        table["welch_q"] = fdr_bh(welch_p)
+        table[["dunnett_t", "dunnett_df", "dunnett_p"]] = _dunnett(table, ref, cmp_)
+        tables.append(table)
+
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(tables, ignore_index=True)[columns]
+
+
+def _dunnett(table, ref, cmp_):
+    '''Dunnett statistics of the comparisons to one control, one family per time'''
+    times, family = np.unique(table["Time_h"].to_numpy(), return_inverse=True)
+    rank = table.groupby(family).cumcount().to_numpy()
+    k = rank.max() + 1
+
+    # Pooled variance of each family: the control and every compared condition at that time
+    n1, v1 = cmp_["n"].to_numpy(dtype=np.float64), cmp_["var"].to_numpy(dtype=np.float64)
+    dof = np.where(n1 > 1, n1 - 1, 0.0)
+    ss = np.bincount(family, weights=np.where(dof > 0, dof * v1, 0.0), minlength=len(times))
+    df = np.bincount(family, weights=dof, minlength=len(times))
+    n0, v0 = ref.loc[times, "n"].to_numpy(dtype=np.float64), ref.loc[times, "var"].to_numpy(dtype=np.float64)
+    ss += np.where(n0 > 1, (n0 - 1) * v0, 0.0)
+    df += np.maximum(n0 - 1, 0.0)
+
+    n1, n0f = table["n"].to_numpy(dtype=np.float64), n0[family]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = table["diff"].to_numpy() / np.sqrt(ss / df)[family] / np.sqrt(1 / n1 + 1 / n0f)
+        b = np.sqrt(n1 / (n1 + n0f))
+
+    grid_t = np.full((len(times), k), np.nan)
+    grid_b = np.full((len(times), k), np.nan)
+    grid_t[family, rank], grid_b[family, rank] = t, b
+    p = dunnett_p(grid_t, grid_b, np.where(df > 0, df, np.nan))[family, rank]
+    p[~(df[family] > 0)] = np.nan
+    return np.column_stack([t, df[family], p])
+
+
+def significance(p, markers=MARKERS):
+    '''Marker ('***', '**', '*' or '') of each p-value'''
+    p = np.asarray(p, dtype=np.float64)
+    out = np.full(p.shape, "", dtype=object)
+    for level, marker in reversed(markers):
+        out[p < level] = marker
+    return out
+
+
+def control_conditions(well_map):
+    '''Conditions flagged as control_group in a well map, sorted'''
+    return sorted({
+        info["condition"] for info in well_map.values()
+        if info.get("control_group", False) and info.get("condition") is not None
+    })
+
+
+def write_control_stats(table, output_dir):
+    '''Write 'stats_vs_control.csv' in output_dir and return its path'''
+    os.makedirs(output_dir, exist_ok=True)
+    path = stats_path(output_dir)
+    table.to_csv(path, index=False, encoding="utf-8")
+    return path
+
+
+def stats_path(output_dir):
+    return os.path.join(output_dir, "stats_vs_control.csv")
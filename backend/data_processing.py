@@ -1,123 +1,220 @@
 import os
+import mmap
 import pandas as pd
 
+from backend.bootstrap import plate_intervals, write_intervals
+from backend.control_stats import (
+    compare_to_controls, control_conditions, plate_group_stats, write_control_stats
+)
+from backend.dose_response import fit_dose_response, write_dose_response
+from backend.kinetics import well_kinetics, write_kinetics
+from backend.plate_data import PlateData
+from backend.profiling import NULL_PROFILER
+from backend.qc import excluded_wells, plate_qc, write_qc
+
+# Bumped whenever read_plate_table output changes (invalidates the parse cache)
+PARSER_VERSION = 2
+
+# Index columns of the data table and their parsed dtype
+INDEX_DTYPES = {
+    "Row": "int16",
+    "Column": "int16",
+    "Plane": "int16",
+    "Field": "int16",
+    "Timepoint": "int32",
+}
+
 def data_preprocessing(filepath):
-        '''Find the plate name and the line where the data begins to skip header'''
-        
+        '''
+        Find the plate name and the byte offset where the data table begins, to skip header.
+        The file is memory-mapped and searched once, without decoding the whole export.
+        '''
+
         plate_name = "unknown_name"
-        start = None
-
-        with open(filepath, "r", encoding="utf-8") as f:
-            for i, line in enumerate(f):
-                
-                try:
-                    if line.split()[0] == 'Plate':
-                        plate_name = line.split()[-1]
-                except:
-                     None
-                
-                if line.strip() == "[Data]": # Expected to start after [Data] header
-                    start = i + 1
-                    break
-
-        if start is None:
-            raise ValueError("Impossible d'identifier où le tableau de données débute dans le fichier")
 
-        return start,plate_name
+        with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data_pos = _find_line(mm, b"[Data]")
+            if data_pos < 0: # Expected to start after [Data] header
+                raise ValueError("Impossible d'identifier où le tableau de données débute dans le fichier")
 
-def data_processing(filepath, well_map, start, plate_name):
-    '''
-    Extract and process the data from the txt file according to the given well map &
-    Export data into two csv file: 
-        - 'results_sorted.csv' containing the relevant data (see 'cols' list)
-        - 'results_plot.csv' which will be used to plot the figures (mean and std against time for each condition)
-    '''
-    output_dir = plate_name + "/csv"
+            # Plate name is only looked for in the header block
+            plate_pos = _find_line(mm, b"Plate Name", 0, data_pos)
+            if plate_pos >= 0:
+                line = mm[plate_pos:mm.find(b"\n", plate_pos)].decode("utf-8").split()
+                plate_name = line[-1]
 
-    # Data load
-    df = pd.read_csv(
-        filepath,
-        sep="\t",
-        skiprows=start,
-        engine="python"
-    )
+            start = mm.find(b"\n", data_pos)
+            start = len(mm) if start < 0 else start + 1
 
-    ## Robustly rename columns
-    df=df.copy()
-    columns = df.columns
+        return start,plate_name
 
-    # Identify area column
-    area_col = None
-    for col in columns:
-        if "Area" in col:
-            area_col = col
-            break
+def _find_line(mm, token, begin=0, end=None):
+    '''Return the offset of the first line starting with token, -1 if not found'''
+    end = len(mm) if end is None else end
+    if mm[begin:begin + len(token)] == token:
+        return begin
+    pos = mm.find(b"\n" + token, begin, end)
+    return pos + 1 if pos >= 0 else -1
 
+def table_schema(header):
+    '''
+    From the header fields of the data table, return (dtypes, renames):
+    the columns to parse with their dtype and the renaming to Area_um2 / Time_s
+    '''
+    # Identify area column
+    area_col = next((col for col in header if "Area" in col), None)
     if area_col is None:
         raise ValueError("Aucune colonne contenant 'Area' ou 'µm²' trouvée dans les données")
 
     # Identify time column
-    time_col = None
-    for col in columns:
-        if "Time [s]" in col:
-            time_col = col
-            break
-
+    time_col = next((col for col in header if "Time [s]" in col), None)
     if time_col is None:
         raise ValueError("Aucune colonne contenant 'Time' trouvée dans les données")
 
-    # Rename columns consistently
-    df = df.rename(columns={
-        area_col: "Area_um2",
-        time_col: "Time_s"
-    })
-
-    ## Create results data
-    # Well
-    df["Well"] = df.apply(
-        lambda x: f"{chr(ord('A') + int(x['Row']) - 1)}{x['Column']}",
-        axis=1
-    )
-
-    # Well information
-    df["Condition"] = df["Well"].map(lambda w: well_map.get(w, {}).get("condition"))
-    df["Replicate"] = df["Well"].map(lambda w: well_map.get(w, {}).get("replicate"))
-
-    # Time in hours
-    df['Time_s'] = df['Time_s'].round().astype(int)
-    df["Time_h"] = (df["Time_s"]/3600).round().astype(int)
-
-    # Area_t0 (Time_s = 0)
-    Area_t0 = df[df["Time_s"] == 0].set_index("Well")["Area_um2"]
-    df["Area_t0"] = df["Well"].map(Area_t0)
-
-    # %Closure
-    df["Closure"] = 100 * (df["Area_t0"] - df["Area_um2"]) / df["Area_t0"]
-    df["Closure"] = df["Closure"].clip(lower=0)
-
-    # Sort 
-    cols = [
-        "Row", "Column", "Well", 
-        "Condition", "Replicate",
-        "Time_s", "Time_h", 
-        "Area_t0", "Area_um2", "Closure"
-    ]
-
-    df = df.sort_values(by=['Well', 'Time_h'], ascending=[True, True])
+    dtypes = {col: dtype for col, dtype in INDEX_DTYPES.items() if col in header}
+    dtypes[area_col] = "float64"
+    dtypes[time_col] = "float64"
 
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, "results_sorted.csv")
-    df[cols].to_csv(output_file, index=False, encoding="utf-8")
+    return dtypes, {area_col: "Area_um2", time_col: "Time_s"}
 
-    ## Calculate mean and standard deviation
-    df = df.groupby(['Condition', 'Time_h'])['Closure']
+def read_header(f):
+    '''Read the header line of the data table at the current position of binary file f'''
+    return f.readline().decode("utf-8").rstrip("\r\n").split("\t")
 
-    df = df.agg(['mean', 'std']).reset_index()
+def read_plate_table(filepath, start):
+    '''
+    Read the data table located at byte offset 'start' (see data_preprocessing).
+    Only the columns used downstream are parsed, with compact dtypes:
+        Row, Column, Plane, Field, Timepoint, Area_um2, Time_s (Plane and Field when exported)
+    '''
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        dtypes, renames = table_schema(read_header(f))
+
+        f.seek(start)
+        df = pd.read_csv(
+            f,
+            sep="\t",
+            usecols=list(dtypes),
+            dtype=dtypes,
+            engine="c",
+            encoding="utf-8"
+        )
 
-    # Sort by condition and ascending time
-    df = df.sort_values(by=['Condition', 'Time_h'])
+    # Rename columns consistently
+    return df.rename(columns=renames)
 
-    output_file = os.path.join(output_dir, "results_plot.csv")
-    df.to_csv(output_file, index=False, encoding="utf-8")
+def load_plate(filepath, well_map, start, plate_name, use_cache=True, profiler=NULL_PROFILER, plane_agg=None):
+    '''
+    Read the data table and build the dense PlateData representation.
+    With use_cache, the parsed table is taken from (or stored in) the parse cache.
+    plane_agg ('sum', 'mean', 'max') combines the planes / fields of each well before the baseline.
+    '''
+    with profiler.stage("parse") as rec:
+        if use_cache:
+            from backend.parse_cache import ParseCache
+            df = ParseCache().get_table(filepath, start)
+        else:
+            df = read_plate_table(filepath, start)
+        rec["rows"] = len(df)
+
+    with profiler.stage("derive", rows=len(df)):
+        plate = PlateData.from_table(df, well_map, plate_name).aggregate(plane_agg)
+        plate.closure
+    return plate
+
+def data_processing(filepath, well_map, start, plate_name, use_cache=True, chunksize=None,
+                    profiler=NULL_PROFILER, plane_agg=None, intervals=False, qc=False, dose_response=False):
+    '''
+    Extract and process the data from the txt file according to the given well map &
+    ('start' is the byte offset returned by data_preprocessing)
+    Export data into two csv file: 
+        - 'results_sorted.csv' containing the relevant data (see PlateData.to_frame)
+        - 'results_plot.csv' which will be used to plot the figures (mean and std against time for each condition)
+    The parsed table is cached by file content (see backend/parse_cache.py) unless use_cache is False.
+    With chunksize, the file is streamed by chunks of rows with bounded memory (see backend/streaming.py).
+    Stages are measured by profiler (see backend/profiling.py).
+    The baseline (Area_t0) of each well is its first valid timepoint; with plane_agg
+    ('sum', 'mean', 'max') the planes / fields of a well are combined before it
+    (see backend/baseline.py).
+    With intervals, bootstrap confidence intervals of the mean closure are written to
+    'bootstrap_ci.csv' (see backend/bootstrap.py).
+    With qc, outlier replicate wells are excluded from the per-condition results and the
+    decisions written to 'qc_wells.csv' (see backend/qc.py).
+    With dose_response, 4-parameter logistic fits of the closure against the dose of each
+    compound are written to 'dose_response.csv' (see backend/dose_response.py).
+    '''
+    if chunksize:
+        from backend.streaming import data_processing_streaming
+        return data_processing_streaming(filepath, well_map, start, plate_name, chunksize, plane_agg,
+                                         intervals, qc, dose_response, profiler)
+
+    plate = load_plate(filepath, well_map, start, plate_name, use_cache, profiler, plane_agg)
+    return export_results(plate, profiler, control_conditions(well_map), intervals, qc, dose_response)
+
+def export_results(plate, profiler=NULL_PROFILER, controls=(), intervals=False, qc=False, dose_response=False):
+    '''
+    Write 'results_sorted.csv', 'results_plot.csv', the kinetics tables (see backend/kinetics.py),
+    the comparisons to the controls (see backend/control_stats.py), with intervals the
+    bootstrap confidence intervals (see backend/bootstrap.py) and with dose_response the
+    dose-response fits (see backend/dose_response.py) for a PlateData, return the plot table.
+    With qc, the outlier wells (see backend/qc.py) keep their rows in 'results_sorted.csv'
+    and 'kinetics_wells.csv' but are left out of every per-condition result.
+    '''
+    output_dir = plate.plate_name + "/csv"
+    os.makedirs(output_dir, exist_ok=True)
 
-    return df
\ No newline at end of file
+    # Outlier replicate wells, removed from their condition
+    excluded = set()
+    analysed = plate
+    if qc:
+        with profiler.stage("qc") as rec:
+            table = plate_qc(plate)
+            write_qc(table, output_dir)
+            excluded = excluded_wells(table)
+            analysed = plate.exclude(excluded)
+            rec["rows"] = len(table)
+
+    ## Calculate mean and standard deviation, sorted by condition and ascending time
+    with profiler.stage("aggregate") as rec:
+        df = analysed.condition_stats()
+        rec["rows"] = len(df)
+
+    with profiler.stage("csv") as rec:
+        # Sorted by well id (A1, A2, ..., A10) and ascending time
+        sorted_df = plate.to_frame()
+        output_file = os.path.join(output_dir, "results_sorted.csv")
+        sorted_df.to_csv(output_file, index=False, encoding="utf-8")
+
+        output_file = os.path.join(output_dir, "results_plot.csv")
+        df.to_csv(output_file, index=False, encoding="utf-8")
+        rec["rows"] = len(sorted_df) + len(df)
+
+    # Per-well kinetic parameters and their per-condition summary
+    with profiler.stage("kinetics") as rec:
+        wells = well_kinetics(plate)
+        write_kinetics(wells, output_dir, excluded)
+        rec["rows"] = len(wells)
+
+    # Tests and effect sizes of every condition against each control, at every time
+    with profiler.stage("statistics") as rec:
+        stats = plate_group_stats(analysed)
+        table = compare_to_controls(stats, controls)
+        write_control_stats(table, output_dir)
+        rec["rows"] = len(table)
+
+    # Confidence intervals of the mean closure, resampling the replicate wells
+    if intervals:
+        with profiler.stage("bootstrap") as rec:
+            table = plate_intervals(analysed)
+            write_intervals(table, output_dir)
+            rec["rows"] = len(table)
+
+    # Dose-response curves of each compound, all compounds and hours at once
+    if dose_response:
+        with profiler.stage("dose_response") as rec:
+            table = fit_dose_response(stats)
+            write_dose_response(table, output_dir)
+            rec["rows"] = len(table)
+
+    return df
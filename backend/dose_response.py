@@ -0,0 +1,166 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.conditions import parse_condition
+from backend.kinetics import least_squares
+
+# Distinct doses needed to fit the 4 parameters of a compound at a time
+MIN_DOSES = 4
+# Smallest closure difference between the plateaus [% closure]: below it the compound has no
+# dose effect at that time and its EC50 / Hill slope are not reported
+MIN_SPAN = 5.0
+# Levenberg-Marquardt iterations (see kinetics.least_squares)
+ITERATIONS = 100
+# Bounds of the fit: largest Hill slope (absolute value), and EC50 at most EC50_MARGIN decades
+# outside the tested doses (a few doses cannot pin down a steeper or farther curve)
+MAX_HILL = 5.0
+EC50_MARGIN = 1.0
+
+DOSE_COLUMNS = ["Compound", "Unit", "Time_h", "n_doses", "n_wells", "dose_min", "dose_max",
+                "bottom", "top", "ec50", "log10_ec50", "hill", "rmse", "r2", "in_range"]
+
+_LN10 = math.log(10)
+
+
+def logistic4(log_dose, bottom, top, log_ec50, hill):
+    '''4-parameter logistic: bottom + (top - bottom) / (1 + 10^(hill * (log10 EC50 - log10 dose)))'''
+    return bottom + (top - bottom) / (1 + np.exp(np.clip(_LN10 * hill * (log_ec50 - log_dose), -50, 50)))
+
+
+def dose_points(stats):
+    '''
+    Rows of a statistics table ['Condition', 'Time_h', 'n', 'mean', 'var'] (see
+    control_stats.group_stats) whose condition has a positive dose, with the compound of the
+    condition (its name without the dose, Condition.base), its canonical unit and dose.
+    Doses of different kinds (mass, molar) are fitted separately, as they cannot be compared.
+    '''
+    columns = ["Compound", "Unit", "Time_h", "dose", "n", "mean", "var"]
+    stats = stats[(stats["n"] > 0) & stats["mean"].notna()]
+    parsed = [parse_condition(c) for c in stats["Condition"]]
+    keep = np.array([p is not None and p.kind is not None and (p.amount or 0) > 0 for p in parsed], dtype=bool)
+    if not keep.any():
+        return pd.DataFrame(columns=columns)
+    parsed = [p for p, k in zip(parsed, keep) if k]
+    points = stats[keep]
+    return pd.DataFrame({
+        "Compound": [p.base for p in parsed],
+        "Unit": [p.canonical_unit for p in parsed],
+        "Time_h": points["Time_h"].to_numpy(dtype=np.int64),
+        "dose": [p.amount for p in parsed],
+        "n": points["n"].to_numpy(dtype=np.float64),
+        "mean": points["mean"].to_numpy(dtype=np.float64),
+        "var": points["var"].to_numpy(dtype=np.float64),
+    })[columns]
+
+
+def fit_dose_response(stats, min_doses=MIN_DOSES, min_span=MIN_SPAN, iterations=ITERATIONS):
+    '''
+    4-parameter logistic fit of the closure against log10(dose) for every compound and time at
+    once (batched Levenberg-Marquardt, see kinetics.least_squares), from the replicate
+    statistics of the conditions (see dose_points). The mean of each dose is weighted by its
+    number of wells, which gives the same fit as the individual wells.
+    Plateaus are bounded to [0, 100] % closure, the Hill slope to +/-MAX_HILL and the EC50 to
+    EC50_MARGIN decades around the tested doses.
+    Compounds with fewer than min_doses doses at a time are left out.
+    Returns one row per compound and time: DOSE_COLUMNS, with the EC50 in the canonical unit
+    of the compound ('ng', 'nM', or '' for bare numbers), the RMSE and R² over the wells,
+    and in_range when the EC50 lies within the tested doses.
+    '''
+    points = dose_points(stats)
+    keys = ["Compound", "Unit", "Time_h"]
+    n_doses = points.groupby(keys)["dose"].transform("nunique") if len(points) else points["dose"]
+    points = points[n_doses >= min_doses].sort_values(keys + ["dose"]).reset_index(drop=True)
+    if points.empty:
+        return pd.DataFrame(columns=DOSE_COLUMNS)
+
+    # One row per compound and time, padded with zero-weight points
+    g = points.groupby(keys, sort=False)
+    row = g.ngroup().to_numpy()
+    col = g.cumcount().to_numpy()
+    shape = (row.max() + 1, col.max() + 1)
+    x = np.zeros(shape)
+    y = np.zeros(shape)
+    w = np.zeros(shape)
+    x[row, col] = np.log10(points["dose"].to_numpy())
+    y[row, col] = points["mean"].to_numpy()
+    w[row, col] = points["n"].to_numpy()
+
+    # Starting point: observed extremes, weighted mean dose, Hill slope of +/-1 following the trend
+    observed = np.where(w > 0, y, np.nan)
+    bottom0, top0 = np.nanmin(observed, axis=1), np.nanmax(observed, axis=1)
+    n_wells = w.sum(axis=1)
+    x_mean = (w * x).sum(axis=1) / n_wells
+    y_mean = (w * y).sum(axis=1) / n_wells
+    trend = (w * (x - x_mean[:, None]) * (y - y_mean[:, None])).sum(axis=1)
+    params = np.stack([bottom0, top0, x_mean, np.where(trend < 0, -1.0, 1.0)], axis=1)
+
+    # Plateaus within [0, 100] % closure, EC50 near the tested doses, bounded Hill slope
+    x_min = np.where(w > 0, x, np.inf).min(axis=1)
+    x_max = np.where(w > 0, x, -np.inf).max(axis=1)
+    low = np.stack(np.broadcast_arrays(0.0, 0.0, x_min - EC50_MARGIN, -MAX_HILL), axis=1)
+    high = np.stack(np.broadcast_arrays(100.0, 100.0, x_max + EC50_MARGIN, MAX_HILL), axis=1)
+    params = np.clip(params, low, high)
+
+    def model(params, jacobian=True):
+        bottom, top, c, h = (params[:, i:i + 1] for i in range(4))
+        s = 1 / (1 + np.exp(np.clip(_LN10 * h * (c - x), -50, 50)))
+        if not jacobian:
+            return bottom + (top - bottom) * s
+        ds = -(top - bottom) * s * (1 - s) * _LN10
+        return bottom + (top - bottom) * s, np.stack([1 - s, s, ds * h, ds * (c - x)], axis=2)
+
+    params, sse = least_squares(model, params, y, w, iterations, (low, high))
+
+    # Residuals over the wells: fit of the means plus the spread of the wells around them
+    within = np.zeros(shape)
+    within[row, col] = np.nan_to_num((points["n"] - 1).to_numpy() * points["var"].to_numpy())
+    within = within.sum(axis=1)
+    total = (w * (y - y_mean[:, None]) ** 2).sum(axis=1) + within
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rmse = np.sqrt((sse + within) / n_wells)
+        r2 = np.where(total > 0, 1 - (sse + within) / total, np.nan)
+
+    bottom, top, log_ec50, hill = params.T
+    flat = np.abs(top - bottom) < min_span
+    log_ec50 = np.where(flat, np.nan, log_ec50)
+    hill = np.where(flat, np.nan, hill)
+
+    table = g.agg(n_doses=("dose", "nunique"), dose_min=("dose", "min"), dose_max=("dose", "max")).reset_index()
+    table["n_wells"] = n_wells.astype(np.int64)
+    table["bottom"] = bottom
+    table["top"] = top
+    table["ec50"] = 10 ** log_ec50
+    table["log10_ec50"] = log_ec50
+    table["hill"] = hill
+    table["rmse"] = rmse
+    table["r2"] = r2
+    table["in_range"] = (table["ec50"] >= table["dose_min"]) & (table["ec50"] <= table["dose_max"])
+    return table[DOSE_COLUMNS]
+
+
+def endpoint_fits(table, endpoint=None):
+    '''
+    Fits of each compound at the endpoint hour (default: the last hour fitted for the compound),
+    compounds not fitted at that hour are left out
+    '''
+    if table.empty:
+        return table
+    if endpoint is None:
+        last = table.groupby(["Compound", "Unit"])["Time_h"].transform("max")
+        return table[table["Time_h"] == last].reset_index(drop=True)
+    return table[table["Time_h"] == int(endpoint)].reset_index(drop=True)
+
+
+def write_dose_response(table, output_dir):
+    '''Write 'dose_response.csv' in output_dir and return its path'''
+    os.makedirs(output_dir, exist_ok=True)
+    path = dose_response_path(output_dir)
+    table.to_csv(path, index=False, encoding="utf-8")
+    return path
+
+
+def dose_response_path(output_dir):
+    return os.path.join(output_dir, "dose_response.csv")
@@ -0,0 +1,177 @@
+import argparse
+import io
+import os
+import time
+
+import pandas as pd
+
+from backend.baseline import AGGREGATIONS
+from backend.data_processing import data_preprocessing, table_schema, read_header
+from backend.streaming import StreamingProcessor
+
+
+class PlateFollower:
+    '''
+    Incremental processing of a PlateResults file that is still being written.
+    Each poll() parses only the complete lines appended since the previous call
+    and hands them to a StreamingProcessor, which updates Area_t0 / Closure and
+    the per-condition running mean/std, so an update costs the size of the new data.
+    Live refreshes only use these running statistics (and only re-render the figures
+    whose curves changed); the per-well tables are written once, by the final refresh
+    (with the QC, bootstrap interval and dose-response tables when requested, see StreamingProcessor).
+    '''
+
+    def __init__(self, filepath, well_map, plane_agg=None, intervals=False, qc=False, dose_response=False):
+        self.filepath = filepath
+        self.well_map = well_map
+        self.plane_agg = plane_agg
+        self.intervals = intervals
+        self.qc = qc
+        self.dose_response = dose_response
+        self.plate_name = None
+        self.offset = None          # byte offset of the first unparsed line
+        self.header = None
+        self.dtypes = None
+        self.renames = None
+        self.processor = None
+        self.figure_keys = None     # {figure path: content key} of the figures already rendered
+
+    @property
+    def hours(self):
+        return self.processor.hours if self.processor else set()
+
+    @property
+    def n_rows(self):
+        return self.processor.n_rows if self.processor else 0
+
+    def _start(self):
+        '''Locate the data table; False while the [Data] header is not written yet'''
+        try:
+            start, self.plate_name = data_preprocessing(self.filepath)
+        except ValueError:
+            return False
+        with open(self.filepath, "rb") as f:
+            f.seek(start)
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                return False
+            f.seek(start)
+            self.header = read_header(f)
+            self.offset = f.tell()
+        self.dtypes, self.renames = table_schema(self.header)
+        self.processor = StreamingProcessor(self.well_map, self.plate_name, self.plane_agg,
+                                            self.intervals, self.qc, self.dose_response)
+        return True
+
+    def poll(self):
+        '''
+        Parse the rows appended since the last call.
+        Returns True if new timepoints (hours) were added to the results.
+        '''
+        if self.offset is None and not self._start():
+            return False
+
+        with open(self.filepath, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read()
+
+        # Only complete lines are parsed; the rest is read again next time
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return False
+        self.offset += end
+
+        df = pd.read_csv(
+            io.BytesIO(chunk[:end]),
+            sep="\t",
+            header=None,
+            names=self.header,
+            usecols=list(self.dtypes),
+            dtype=self.dtypes,
+            engine="c",
+            encoding="utf-8"
+        ).rename(columns=self.renames)
+
+        return bool(self.processor.process(df))
+
+    def results(self):
+        '''Current ['Condition', 'Time_h', 'mean', 'std'] table'''
+        return self.processor.results()
+
+    def write_results(self, figures=True, final=False):
+        '''
+        Rewrite 'results_plot.csv' (and the figures whose curves changed) from the running
+        statistics; with final, also the per-well tables (kinetics, comparisons to the controls)
+        '''
+        df = self.processor.write_results() if final else self.processor.refresh_results()
+        if figures and not df.empty:
+            from backend.save_fig import save_fig
+            self.figure_keys = save_fig(df, self.well_map, self.plate_name, previous=self.figure_keys)
+        return df
+
+
+def follow(filepath, well_map, interval=60.0, idle_timeout=None, figures=True, on_update=None,
+           plane_agg=None, intervals=False, qc=False, dose_response=False):
+    '''
+    Tail a growing PlateResults file and refresh the results each time new timepoints arrive.
+    Stops after idle_timeout seconds without new data (never if None), or on Ctrl+C: the final
+    refresh (last partial timepoint, per-well tables) is written in both cases.
+    '''
+    follower = PlateFollower(filepath, well_map, plane_agg, intervals, qc, dose_response)
+    last_data = time.monotonic()
+
+    try:
+        while True:
+            offset = follower.offset
+            if follower.poll():
+                df = follower.write_results(figures=figures)
+                if on_update:
+                    on_update(follower, df)
+            if follower.offset != offset:
+                last_data = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - last_data > idle_timeout:
+                break
+            time.sleep(interval)
+    finally:
+        # Final state, including the last (possibly partial) timepoint
+        if follower.plate_name:
+            follower.processor.flush()
+            follower.write_results(figures=figures, final=True)
+    return follower
+
+
+def main(argv=None):
+    from backend.assign import import_existing_map
+
+    parser = argparse.ArgumentParser(description="Suivi en direct d'un fichier PlateResults en cours d'acquisition.")
+    parser.add_argument("file", help="Fichier PlateResults (.txt) en cours d'écriture")
+    parser.add_argument("--well-map", required=True, help="Carte de plaque (.json ou .py)")
+    parser.add_argument("--interval", type=float, default=60.0, help="Intervalle de lecture [s]")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Arrêt après ce délai sans nouvelles données [s]")
+    parser.add_argument("--no-figures", action="store_true", help="Ne pas générer les figures")
+    parser.add_argument("--plane-agg", choices=AGGREGATIONS, default=None,
+                        help="Combiner les plans / champs de chaque puits avant la référence Area_t0")
+    parser.add_argument("--intervals", action="store_true",
+                        help="Écrire les intervalles de confiance à 95 %% par bootstrap des puits "
+                             "('<plaque>/csv/bootstrap_ci.csv') à la fin du suivi")
+    parser.add_argument("--qc", action="store_true",
+                        help="Exclure les puits réplicats aberrants des résultats finaux "
+                             "(décisions dans '<plaque>/csv/qc_wells.csv')")
+    parser.add_argument("--dose-response", action="store_true",
+                        help="Ajuster les courbes dose-réponse à la fin du suivi ('<plaque>/csv/dose_response.csv')")
+    args = parser.parse_args(argv)
+
+    def report(follower, df):
+        print(f"{follower.plate_name}: {follower.n_rows} lignes, "
+              f"jusqu'à {max(follower.hours)} h")
+
+    try:
+        follow(args.file, import_existing_map(args.well_map), args.interval, args.idle_timeout,
+               not args.no_figures, report, args.plane_agg, args.intervals, args.qc, args.dose_response)
+    except KeyboardInterrupt:
+        print("Suivi arrêté, résultats finaux écrits.")
+
+
+if __name__ == "__main__":
+    main()
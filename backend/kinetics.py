@@ -0,0 +1,271 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Per-well kinetic parameters, in the column order of 'kinetics_wells.csv'
+METRICS = [
+    "rate_initial",     # initial closure rate [%/h], slope over the first valid points
+    "t50_h",            # time to 50 % closure [h], linear interpolation, NaN if never reached
+    "plateau",          # mean closure over the last valid points [%]
+    "max_closure",      # maximum closure [%]
+    "auc",              # area under the closure curve [%.h], trapezoidal
+    "logistic_K",       # logistic fit K / (1 + exp(-r (t - t_mid)))
+    "logistic_r",
+    "logistic_tmid",
+    "logistic_rmse",
+]
+
+INITIAL_POINTS = 3
+PLATEAU_POINTS = 3
+LOGISTIC_MIN_POINTS = 4
+LOGISTIC_ITERATIONS = 60
+
+
+# ----------------------------------------------------------------------
+#   CURVE METRICS (all curves at once)
+# ----------------------------------------------------------------------
+# Curves are (n_curves, n_timepoints) arrays of time [h] and closure [%],
+# with NaN for missing measurements; time increases along axis 1.
+
+def _valid(time, closure):
+    return ~np.isnan(time) & ~np.isnan(closure)
+
+
+def _previous_valid(valid):
+    '''Index of the previous valid point of each point (-1 if none)'''
+    idx = np.where(valid, np.arange(valid.shape[1]), -1)
+    prev = np.maximum.accumulate(idx, axis=1)
+    return np.concatenate([np.full((len(valid), 1), -1), prev[:, :-1]], axis=1)
+
+
+def initial_rate(time, closure, points=INITIAL_POINTS):
+    '''Least-squares slope over the first 'points' valid points of each curve (NaN with fewer than 2)'''
+    valid = _valid(time, closure)
+    use = valid & (np.cumsum(valid, axis=1) <= points)
+    n = use.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_mean = np.where(use, time, 0.0).sum(axis=1) / n
+        y_mean = np.where(use, closure, 0.0).sum(axis=1) / n
+        dt = np.where(use, time - t_mean[:, None], 0.0)
+        dy = np.where(use, closure - y_mean[:, None], 0.0)
+        slope = (dt * dy).sum(axis=1) / (dt**2).sum(axis=1)
+    slope[n < 2] = np.nan
+    return slope
+
+
+def crossing_time(time, closure, level):
+    '''First time each curve reaches level (scalar or per curve), interpolated from the previous valid point'''
+    valid = _valid(time, closure)
+    level = np.broadcast_to(np.asarray(level, dtype=np.float64), (len(time),))[:, None]
+    above = valid & (closure >= level)
+    reached = above.any(axis=1)
+    j = above.argmax(axis=1)
+    p = _previous_valid(valid)[np.arange(len(time)), j]
+
+    rows = np.arange(len(time))
+    t_j, y_j = time[rows, j], closure[rows, j]
+    t_p, y_p = time[rows, np.maximum(p, 0)], closure[rows, np.maximum(p, 0)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        interp = t_p + (level[:, 0] - y_p) * (t_j - t_p) / (y_j - y_p)
+    result = np.where(p >= 0, interp, t_j)
+    result[~reached] = np.nan
+    return result
+
+
+def plateau(time, closure, points=PLATEAU_POINTS):
+    '''Mean closure over the last 'points' valid points of each curve'''
+    valid = _valid(time, closure)
+    use = valid & (np.cumsum(valid[:, ::-1], axis=1)[:, ::-1] <= points)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(use, closure, 0.0).sum(axis=1) / use.sum(axis=1)
+
+
+def area_under_curve(time, closure):
+    '''Trapezoidal area between consecutive valid points of each curve (NaN with fewer than 2 points)'''
+    valid = _valid(time, closure)
+    p = _previous_valid(valid)
+    pair = valid & (p >= 0)
+    rows = np.arange(len(time))[:, None]
+    p = np.maximum(p, 0)
+    segments = np.where(pair, (time - time[rows, p]) * (closure + closure[rows, p]) / 2, 0.0)
+    auc = segments.sum(axis=1)
+    auc[pair.sum(axis=1) == 0] = np.nan
+    return auc
+
+
+def fit_logistic(time, closure, iterations=LOGISTIC_ITERATIONS, min_points=LOGISTIC_MIN_POINTS):
+    '''
+    Least-squares fit of closure = K / (1 + exp(-r (t - t_mid))) for all curves at once,
+    with batched Levenberg-Marquardt steps (one 3x3 system per curve and iteration, see least_squares).
+    Returns K, r, t_mid and the RMSE (NaN for curves with fewer than min_points points).
+    '''
+    valid = _valid(time, closure)
+    t = np.where(valid, time, 0.0)
+    y = np.where(valid, closure, 0.0)
+    w = valid.astype(np.float64)
+    n = valid.sum(axis=1)
+
+    # Starting point: observed maximum, time of half maximum, steepest observed slope
+    k0 = np.maximum(np.nanmax(np.where(valid, closure, np.nan), axis=1, initial=0.0), 1.0)
+    m0 = crossing_time(time, closure, k0 / 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_mean = t.sum(axis=1) / n
+    m0 = np.where(np.isnan(m0), t_mean, m0)
+    slopes = _steepest_slope(time, closure, valid)
+    r0 = np.where(slopes > 0, 4 * slopes / k0, 0.1)
+    params = np.nan_to_num(np.stack([k0, r0, m0], axis=1))
+
+    def model(params, jacobian=True):
+        K, r, m = params[:, 0:1], params[:, 1:2], params[:, 2:3]
+        s = 1 / (1 + np.exp(np.clip(-r * (t - m), -50, 50)))
+        if not jacobian:
+            return K * s
+        ds = s * (1 - s)
+        return K * s, np.stack([s, K * ds * (t - m), -K * ds * r], axis=2)
+
+    params, current = least_squares(model, params, y, w, iterations)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rmse = np.sqrt(current / n)
+    fit = np.column_stack([params, rmse])
+    fit[n < min_points] = np.nan
+    return fit[:, 0], fit[:, 1], fit[:, 2], fit[:, 3]
+
+
+def least_squares(model, params, y, w, iterations=LOGISTIC_ITERATIONS, bounds=None):
+    '''
+    Batched Levenberg-Marquardt: fits every row of y (weights w, 0 for missing points) at once,
+    with one small linear system per row and iteration. model(params) returns the prediction
+    and its Jacobian (n_rows, n_points, n_params), model(params, jacobian=False) the prediction.
+    bounds, if given, is a (low, high) pair broadcastable to params: steps are clipped to it.
+    Returns the fitted params and the weighted sum of squared residuals of each row.
+    '''
+    sw = np.sqrt(w)
+
+    def sse(params):
+        return (w * (y - model(params, jacobian=False)) ** 2).sum(axis=1)
+
+    lam = np.full(len(y), 1e-2)
+    current = sse(params)
+    eye = np.eye(params.shape[1])
+    for _ in range(iterations):
+        prediction, jac = model(params)
+        jac = jac * sw[:, :, None]
+        jtj = np.einsum("ntk,ntl->nkl", jac, jac)
+        grad = np.einsum("ntk,nt->nk", jac, sw * (y - prediction))
+        damped = jtj + (lam[:, None, None] * np.diagonal(jtj, axis1=1, axis2=2)[:, :, None] + 1e-9) * eye
+        step = np.linalg.solve(damped, grad[:, :, None])[:, :, 0]
+
+        candidate = params + step
+        if bounds is not None:
+            candidate = np.clip(candidate, *bounds)
+        new = sse(candidate)
+        better = np.isfinite(new) & (new < current)
+        params = np.where(better[:, None], candidate, params)
+        current = np.where(better, new, current)
+        lam = np.clip(np.where(better, lam / 10, lam * 10), 1e-9, 1e9)
+    return params, current
+
+
+def _steepest_slope(time, closure, valid):
+    p = _previous_valid(valid)
+    rows = np.arange(len(time))[:, None]
+    q = np.maximum(p, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (closure - closure[rows, q]) / (time - time[rows, q])
+    slope = np.where(valid & (p >= 0) & np.isfinite(slope), slope, -np.inf)
+    return slope.max(axis=1, initial=-np.inf)
+
+
+def curve_metrics(time, closure):
+    '''All METRICS of each curve, as a dict of (n_curves,) arrays'''
+    time = np.asarray(time, dtype=np.float64)
+    closure = np.asarray(closure, dtype=np.float64)
+    valid = _valid(time, closure)
+    metrics = {
+        "rate_initial": initial_rate(time, closure),
+        "t50_h": crossing_time(time, closure, 50.0),
+        "plateau": plateau(time, closure),
+        "max_closure": np.nanmax(np.where(valid, closure, np.nan), axis=1, initial=-np.inf),
+        "auc": area_under_curve(time, closure),
+    }
+    metrics["max_closure"][~valid.any(axis=1)] = np.nan
+    (metrics["logistic_K"], metrics["logistic_r"],
+     metrics["logistic_tmid"], metrics["logistic_rmse"]) = fit_logistic(time, closure)
+    return metrics
+
+
+# ----------------------------------------------------------------------
+#   TABLES
+# ----------------------------------------------------------------------
+def well_kinetics(plate):
+    '''
+    Kinetic parameters of each well of a PlateData (closure averaged over the images of
+    the well). DataFrame [Row, Column, Well, Condition, Replicate, n_points, *METRICS].
+    '''
+    return _well_table(plate.rows, plate.columns, plate.labels, plate.conditions,
+                       plate.replicates, np.round(plate.time_s) / 3600, plate.well_closure)
+
+
+def well_kinetics_from_long(df, well_map):
+    '''
+    Same table from per-well curves in long form: columns Row, Column, Time_s, Closure
+    (mean closure of the well at that time), as accumulated by the streaming mode.
+    '''
+    from backend.plate_format import well_labels
+
+    wells = df[["Row", "Column"]].drop_duplicates().sort_values(["Row", "Column"])
+    times = np.sort(df["Time_s"].unique())
+    w_idx = pd.MultiIndex.from_frame(wells).get_indexer(pd.MultiIndex.from_frame(df[["Row", "Column"]]))
+    t_idx = np.searchsorted(times, df["Time_s"].to_numpy())
+
+    curves = np.full((len(wells), len(times)), np.nan)
+    curves[w_idx, t_idx] = df["Closure"].to_numpy(dtype=np.float64)
+    time = np.broadcast_to(times / 3600, curves.shape)
+
+    labels = well_labels(wells["Row"], wells["Column"])
+    conditions = pd.Categorical([well_map.get(w, {}).get("condition") for w in labels])
+    replicates = pd.array([well_map.get(w, {}).get("replicate") for w in labels], dtype="Int64")
+    return _well_table(wells["Row"].to_numpy(), wells["Column"].to_numpy(), labels,
+                       conditions, replicates, time, curves)
+
+
+def _well_table(rows, columns, labels, conditions, replicates, time, curves):
+    time = np.where(np.isnan(curves), np.nan, time)
+    table = pd.DataFrame({
+        "Row": rows,
+        "Column": columns,
+        "Well": labels,
+        "Condition": conditions,
+        "Replicate": replicates,
+        "n_points": (~np.isnan(curves)).sum(axis=1),
+    })
+    for name, values in curve_metrics(time, curves).items():
+        table[name] = values
+    return table
+
+
+def condition_kinetics(wells):
+    '''Mean and standard deviation of each metric over the wells of each condition'''
+    wells = wells[wells["Condition"].notna()]
+    g = wells.groupby("Condition", observed=True, sort=True)[METRICS]
+    table = g.agg(["mean", "std"])
+    table.columns = [f"{metric}_{stat}" for metric, stat in table.columns]
+    table.insert(0, "n_wells", wells.groupby("Condition", observed=True, sort=True).size())
+    return table.reset_index()
+
+
+def kinetics_paths(output_dir):
+    return [os.path.join(output_dir, "kinetics_wells.csv"), os.path.join(output_dir, "kinetics_conditions.csv")]
+
+
+def write_kinetics(wells, output_dir, exclude=()):
+    '''
+    Write 'kinetics_wells.csv' and 'kinetics_conditions.csv' in output_dir, return their paths.
+    The wells in exclude (labels, see backend/qc.py) are left out of the condition summary.
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    paths = kinetics_paths(output_dir)
+    wells.to_csv(paths[0], index=False, encoding="utf-8")
+    condition_kinetics(wells[~wells["Well"].isin(list(exclude))]).to_csv(paths[1], index=False, encoding="utf-8")
+    return paths
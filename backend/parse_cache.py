@@ -0,0 +1,204 @@
+import hashlib
+import json
+import mmap
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from backend.data_processing import PARSER_VERSION, read_plate_table
+
+DEFAULT_CACHE_DIR = "./cache/plates"
+DEFAULT_MAX_SIZE = 2 * 1024**3  # 2 GB
+# Index lock: longest wait before updating without it [s] (the index is only a cache),
+# age after which a lock left by a crashed process is removed [s]
+LOCK_TIMEOUT = 5.0
+LOCK_STALE = 30.0
+
+
+class ParseCache:
+    '''
+    Local cache of parsed data tables (output of read_plate_table).
+    Entries are '.npz' files (one array per column) keyed by the content hash
+    of the raw export and the parser version. The least recently used entries
+    are evicted when the cache grows above max_size bytes.
+    'index.json' remembers the hash of each file (path, size, mtime -> hash) so that
+    unchanged files are not hashed again; it is shared by concurrent processes
+    (updated under a lock file, written atomically) and pruned of the stamps of
+    modified files and of evicted entries.
+    '''
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ----------------------------------------------------------------------
+    #   KEYS
+    # ----------------------------------------------------------------------
+    def key(self, filepath):
+        '''Content hash of the file + parser version (the hash is remembered per path, size and mtime)'''
+        st = os.stat(filepath)
+        stamp = f"{os.path.abspath(filepath)}|{st.st_size}|{st.st_mtime_ns}"
+
+        digest = self._load_index().get(stamp)
+        if digest is None:
+            digest = file_digest(filepath)
+            path = stamp.rsplit("|", 2)[0]
+
+            def update(index):
+                # Stamps of older versions of the same file are stale
+                for old in [k for k in index if k.rsplit("|", 2)[0] == path]:
+                    del index[old]
+                index[stamp] = digest
+            self._update_index(update)
+
+        return f"{digest}-v{PARSER_VERSION}"
+
+    def _load_index(self):
+        '''Index {stamp: digest}, empty if missing or unreadable'''
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _update_index(self, update):
+        '''Apply update(index) to the current index and write it back, under the index lock'''
+        with self._index_lock():
+            index = self._load_index()
+            update(index)
+            self._save_index(index)
+
+    @contextmanager
+    def _index_lock(self):
+        '''Exclusive lock file of the index; after LOCK_TIMEOUT the update goes ahead without it'''
+        path = self.index_path + ".lock"
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        fd = None
+        while fd is None:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(path).st_mtime > LOCK_STALE:
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _save_index(self, index):
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_path)
+
+    # ----------------------------------------------------------------------
+    #   ENTRIES
+    # ----------------------------------------------------------------------
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key):
+        '''Return the cached table, None on a cache miss'''
+        path = self._entry_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                df = pd.DataFrame({col: data[col] for col in data.files})
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None     # evicted meanwhile by another process
+        return df
+
+    def store(self, key, df):
+        '''Write the table to the cache then evict old entries if needed'''
+        path = self._entry_path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **{col: df[col].to_numpy() for col in df.columns})
+        os.replace(tmp, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        '''Remove least recently used entries until the cache is under max_size'''
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue    # evicted meanwhile by another process
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = set()
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass            # already evicted by another process
+            removed.add(path)
+            total -= size
+        if not removed:
+            return
+
+        # Forget the hashes of the evicted entries (unless another parser version is still cached)
+        def digest_of(path):
+            return os.path.basename(path).rsplit("-v", 1)[0]
+        evicted = {digest_of(p) for p in removed} - {digest_of(p) for _, _, p in entries if p not in removed}
+
+        def update(index):
+            for stamp in [k for k, digest in index.items() if digest in evicted]:
+                del index[stamp]
+        self._update_index(update)
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    # ----------------------------------------------------------------------
+    def get_table(self, filepath, start):
+        '''Parsed data table of the file, from the cache when available'''
+        key = self.key(filepath)
+        df = self.load(key)
+        if df is None:
+            df = read_plate_table(filepath, start)
+            self.store(key, df)
+        return df
+
+
+def file_digest(filepath):
+    '''SHA-256 of the file content'''
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+    return h.hexdigest()
@@ -0,0 +1,142 @@
+import os
+import time
+
+import pandas as pd
+
+from backend.bootstrap import interval_bounds, intervals_path
+from backend.control_stats import stats_path
+from backend.data_processing import data_preprocessing, data_processing
+from backend.dose_response import dose_response_path, endpoint_fits
+from backend.kinetics import kinetics_paths
+from backend.parse_cache import ParseCache
+from backend.profiling import StageProfiler
+from backend.qc import qc_path
+from backend.save_excel import save_excel
+from backend.series_index import SeriesIndex
+from backend.stages import StageState, stage_key
+from backend.well_map_store import save_well_map, well_map_hash
+
+# Ordered pipeline stages, as reported in the timings
+STAGES = ("preprocessing", "processing", "excel", "figures")
+
+
+def run_plate(filepath, well_map, figures=True, chunksize=None, progress=None, figure_jobs=None,
+              profile=False, cprofile=False, force=False, plane_agg=None, significance=False,
+              ci=None, qc=False, dose_response=False, endpoint=None):
+    '''
+    Run the full chain on one PlateResults file:
+        data_preprocessing -> data_processing -> save_excel (-> save_fig)
+    Outputs are written relative to the current working directory (plate_name/...).
+    Each stage is keyed by its inputs (raw file hash, well-map hash, options, see backend/stages.py)
+    and is skipped when its key and output files are unchanged since the last run, unless force.
+    With chunksize, the data table is processed in streaming mode (bounded memory).
+    plane_agg ('sum', 'mean', 'max') combines the planes / fields of each well before the baseline.
+    The comparisons to the controls are added to the Excel file and, with significance,
+    shown as markers on the figures.
+    ci ('percentile' or 'bca') computes bootstrap confidence intervals of the mean closure
+    (see backend/bootstrap.py) and uses them as error bars in the Excel file and the figures.
+    With qc, outlier replicate wells are excluded from the per-condition results (see backend/qc.py).
+    With dose_response, 4-parameter logistic curves of the closure against the dose are fitted for
+    every compound (condition name without the dose) and hour (see backend/dose_response.py); the fits at the endpoint hour
+    (default: last hour of each compound) are added to the Excel file and plotted.
+    figure_jobs is the number of processes rendering the figures (default: number of cores).
+    progress, if given, is called with the name of each stage (see STAGES) before it starts.
+    With profile (and optionally cprofile), the detailed stages (preprocess, parse, derive,
+    aggregate, csv, excel, figures) are profiled and written to 'plate_name/profile.json'.
+    Returns a dict with the plate name, the Excel path, the wall time of each stage [s]
+    and the stages reused from the previous run.
+    '''
+    timings = {}
+    reused = []
+    notify = progress or (lambda stage: None)
+    profiler = StageProfiler(memory=profile, cprofile=cprofile)
+
+    notify("preprocessing")
+    t = time.perf_counter()
+    with profiler.stage("preprocess"):
+        start, plate_name = data_preprocessing(filepath)
+        state = StageState(plate_name)
+        map_hash = well_map_hash(well_map)
+        table_key = ParseCache().key(filepath)
+    timings["preprocessing"] = time.perf_counter() - t
+
+    notify("processing")
+    t = time.perf_counter()
+    options = {"streaming": bool(chunksize), "plane_agg": plane_agg, "intervals": bool(ci), "qc": qc,
+               "dose_response": dose_response}
+    results_key = stage_key("results", table_key, map_hash, options)
+    csv_dir = os.path.join(plate_name, "csv")
+    map_file = os.path.join(plate_name, "well_map.json")
+    results_files = [os.path.join(csv_dir, "results_sorted.csv"), os.path.join(csv_dir, "results_plot.csv"),
+                     *kinetics_paths(csv_dir), stats_path(csv_dir), map_file]
+    if ci:
+        results_files.append(intervals_path(csv_dir))
+    if qc:
+        results_files.append(qc_path(csv_dir))
+    if dose_response:
+        results_files.append(dose_response_path(csv_dir))
+    if not force and state.fresh("results", results_key):
+        results = pd.read_csv(results_files[1], dtype={"Condition": str}, float_precision="round_trip")
+        reused.append("processing")
+    else:
+        results = data_processing(filepath, well_map, start, plate_name, chunksize=chunksize, profiler=profiler,
+                                  plane_agg=plane_agg, intervals=bool(ci), qc=qc, dose_response=dose_response)
+        # Map used for these results, read back when plates are aggregated (see backend/aggregate.py)
+        save_well_map(well_map, map_file, plate_name)
+        state.record("results", results_key, results_files)
+    timings["processing"] = time.perf_counter() - t
+
+    # Per-condition curves and comparisons to the controls, shared by the Excel and figure writers
+    series = SeriesIndex(results)
+    stats = pd.read_csv(stats_path(csv_dir), dtype={"Control": str, "Condition": str})
+    intervals = None
+    if ci:
+        table = pd.read_csv(intervals_path(csv_dir), dtype={"Condition": str}, float_precision="round_trip")
+        intervals = interval_bounds(table, series, ci)
+    doses = None
+    if dose_response:
+        table = pd.read_csv(dose_response_path(csv_dir), dtype={"Compound": str, "Unit": str},
+                            float_precision="round_trip")
+        # Bare-number doses have no unit
+        doses = endpoint_fits(table.fillna({"Unit": ""}), endpoint)
+
+    notify("excel")
+    t = time.perf_counter()
+    excel_key = stage_key("excel", results_key, map_hash, {"ci": ci, "endpoint": endpoint})
+    if not force and state.fresh("excel", excel_key):
+        excel_path = state.get("excel", "path")
+        reused.append("excel")
+    else:
+        with profiler.stage("excel", rows=len(results)):
+            excel_path = save_excel(series, well_map, plate_name, stats=stats, intervals=intervals,
+                                    dose_response=doses)
+        state.record("excel", excel_key, [excel_path], path=excel_path)
+    timings["excel"] = time.perf_counter() - t
+
+    if figures:
+        notify("figures")
+        t = time.perf_counter()
+        figures_key = stage_key("figures", results_key, map_hash,
+                                {"significance": significance, "ci": ci, "endpoint": endpoint})
+        if not force and state.fresh("figures", figures_key):
+            reused.append("figures")
+        else:
+            # matplotlib is only needed when figures are rendered
+            from backend.save_fig import save_dose_response_fig, save_fig
+
+            # Figures whose content did not change are kept (see save_fig)
+            previous = None if force else state.get("figures", "figures")
+            with profiler.stage("figures", rows=len(results)):
+                keys = save_fig(series, well_map, plate_name, jobs=figure_jobs, previous=previous,
+                                stats=stats if significance else None, intervals=intervals)
+                if doses is not None:
+                    keys.update(save_dose_response_fig(series, doses, plate_name, previous=previous))
+            state.record("figures", figures_key, list(keys), figures=keys)
+        timings["figures"] = time.perf_counter() - t
+
+    result = {"plate_name": plate_name, "excel_path": excel_path, "timings": timings, "reused": reused}
+    if profile or cprofile:
+        result["profile_path"] = profiler.write(plate_name)
+    else:
+        profiler.stop()
+    return result
@@ -0,0 +1,201 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from backend.baseline import aggregate_images, check_aggregation, first_valid_baseline
+from backend.plate_format import format_of_wells, get_format
+
+
+class PlateData:
+    '''
+    Dense representation of a plate.
+    Measurements are stored as NumPy arrays indexed by [well, timepoint, image]
+    where 'well' runs over the wells present in the export, sorted by their
+    plate format index (row then column, so A2 < A10), and 'image' over the
+    (Plane, Field) pairs of the export (see aggregate to combine them).
+    Conditions and replicates are per-well vectors taken from the well map.
+    '''
+
+    def __init__(self, plate_name, plate_format, well_ids, rows, columns, labels, timepoints, planes, fields,
+                 area, time_s, present, conditions, replicates):
+        self.plate_name = plate_name
+        self.plate_format = plate_format
+        self.well_ids = well_ids        # (n_wells,) well index in plate_format
+        self.rows = rows                # (n_wells,) 1-based plate row
+        self.columns = columns          # (n_wells,) 1-based plate column
+        self.labels = labels            # (n_wells,) well labels ('A1', ...)
+        self.timepoints = timepoints    # (n_timepoints,) Timepoint numbers of the export
+        self.planes = planes            # (n_images,) Plane number of each image (0 once aggregated)
+        self.fields = fields            # (n_images,) Field number of each image (0 once aggregated)
+        self.area = area                # (n_wells, n_timepoints, n_images) float64
+        self.time_s = time_s            # (n_wells, n_timepoints) float64
+        self.present = present          # (n_wells, n_timepoints, n_images) rows found in the export
+        self.conditions = conditions    # pd.Categorical (n_wells,), NaN for unassigned wells
+        self.replicates = replicates    # Int64 array (n_wells,), <NA> for unassigned wells
+
+    # ----------------------------------------------------------------------
+    #   CONSTRUCTION
+    # ----------------------------------------------------------------------
+    @classmethod
+    def from_table(cls, df, well_map, plate_name, plate_format=None):
+        '''
+        Build the dense arrays from the long table returned by read_plate_table
+        (columns Row, Column, Plane, Field, Timepoint, Area_um2, Time_s; Plane and Field are optional).
+        Without plate_format, the smallest standard format holding the data and the well map is used.
+        '''
+        row = df["Row"].to_numpy()
+        col = df["Column"].to_numpy()
+        plane = df["Plane"].to_numpy() if "Plane" in df else np.ones(len(df), dtype="int16")
+        field = df["Field"].to_numpy() if "Field" in df else np.ones(len(df), dtype="int16")
+
+        if plate_format is None:
+            map_format = format_of_wells(well_map)
+            plate_format = get_format(max(int(row.max(initial=1)), map_format.n_rows),
+                                      max(int(col.max(initial=1)), map_format.n_cols))
+
+        # Integer well id, ordered by row then column
+        well_ids, w_idx = np.unique(plate_format.index(row, col), return_inverse=True)
+        timepoints, t_idx = np.unique(df["Timepoint"].to_numpy(), return_inverse=True)
+        images, p_idx = np.unique(plane.astype(np.int64) << 16 | field.astype(np.int64), return_inverse=True)
+        planes, fields = (images >> 16).astype(np.int16), (images & 0xFFFF).astype(np.int16)
+
+        rows, columns = plate_format.position(well_ids)
+        labels = plate_format.labels[well_ids]
+
+        shape = (len(well_ids), len(timepoints), len(planes))
+        area = np.full(shape, np.nan)
+        area[w_idx, t_idx, p_idx] = df["Area_um2"].to_numpy(dtype=np.float64)
+        present = np.zeros(shape, dtype=bool)
+        present[w_idx, t_idx, p_idx] = True
+        time_s = np.full(shape[:2], np.nan)
+        time_s[w_idx, t_idx] = df["Time_s"].to_numpy(dtype=np.float64)
+
+        conditions = pd.Categorical(
+            [well_map.get(w, {}).get("condition") for w in labels]
+        )
+        replicates = pd.array(
+            [well_map.get(w, {}).get("replicate") for w in labels], dtype="Int64"
+        )
+
+        return cls(plate_name, plate_format, well_ids, rows, columns, labels, timepoints, planes, fields,
+                   area, time_s, present, conditions, replicates)
+
+    def aggregate(self, how):
+        '''
+        PlateData with the images (planes, fields) of each well and timepoint combined
+        by how ('sum', 'mean' or 'max', see backend/baseline.py), so the baseline and the
+        closure are computed on the combined area. None returns the plate unchanged.
+        '''
+        how = check_aggregation(how)
+        if how is None or self.shape[2] == 0:
+            return self
+        area, present = aggregate_images(self.area, self.present, how)
+        zero = np.zeros(1, dtype=np.int16)
+        return PlateData(self.plate_name, self.plate_format, self.well_ids, self.rows, self.columns,
+                         self.labels, self.timepoints, zero, zero, area, self.time_s, present,
+                         self.conditions, self.replicates)
+
+    def exclude(self, wells):
+        '''
+        PlateData with the given wells (labels) removed from their condition: their measurements
+        are kept but they no longer count in the per-condition results. Derived arrays already
+        computed are shared.
+        '''
+        drop = np.isin(self.labels, list(wells))
+        if not drop.any():
+            return self
+        conditions = pd.Categorical(np.where(drop, None, np.asarray(self.conditions, dtype=object)),
+                                    categories=self.conditions.categories)
+        plate = PlateData(self.plate_name, self.plate_format, self.well_ids, self.rows, self.columns,
+                          self.labels, self.timepoints, self.planes, self.fields, self.area, self.time_s,
+                          self.present, conditions, self.replicates)
+        for name in ("time_h", "area_t0", "closure", "well_closure"):
+            if name in self.__dict__:
+                plate.__dict__[name] = self.__dict__[name]
+        return plate
+
+    # ----------------------------------------------------------------------
+    #   DERIVED ARRAYS (computed once, the measurement arrays are not modified)
+    # ----------------------------------------------------------------------
+    @property
+    def shape(self):
+        return self.area.shape
+
+    @cached_property
+    def time_h(self):
+        '''(n_wells, n_timepoints) time rounded to the hour'''
+        return np.round(np.round(self.time_s) / 3600)
+
+    @cached_property
+    def area_t0(self):
+        '''(n_wells, n_images) baseline area: first valid timepoint of each image, NaN if none'''
+        return first_valid_baseline(self.area, self.present)
+
+    @cached_property
+    def closure(self):
+        '''(n_wells, n_timepoints, n_images) %closure relative to Area_t0, clipped at 0'''
+        area_t0 = self.area_t0[:, None, :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            closure = 100 * (area_t0 - self.area) / area_t0
+        return np.maximum(closure, 0, where=~np.isnan(closure), out=closure)
+
+    @cached_property
+    def well_closure(self):
+        '''(n_wells, n_timepoints) closure of each well, averaged over its images'''
+        counted = ~np.isnan(self.closure)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counted, self.closure, 0.0).sum(axis=2) / counted.sum(axis=2)
+
+    # ----------------------------------------------------------------------
+    #   EXPORT
+    # ----------------------------------------------------------------------
+    def to_frame(self):
+        '''Long table (one row per measurement) sorted by well id then time'''
+        w, t, p = np.nonzero(self.present)
+        time_s = np.round(self.time_s)
+
+        return pd.DataFrame({
+            "Row": self.rows[w],
+            "Column": self.columns[w],
+            "Well": self.labels[w],
+            "Condition": self.conditions[w],
+            "Replicate": self.replicates[w],
+            "Time_s": time_s[w, t].astype(np.int64),
+            "Time_h": self.time_h[w, t].astype(np.int64),
+            "Area_t0": self.area_t0[w, p],
+            "Area_um2": self.area[w, t, p],
+            "Closure": self.closure[w, t, p],
+        })
+
+    def condition_stats(self):
+        '''
+        Mean and standard deviation of the closure per condition and hour.
+        Returns a DataFrame with columns ['Condition', 'Time_h', 'mean', 'std'],
+        sorted by condition and ascending time.
+        '''
+        codes = np.broadcast_to(self.conditions.codes.astype(np.int64)[:, None, None], self.shape)
+        time_h = np.broadcast_to(self.time_h[:, :, None], self.shape)
+        keep = self.present & (codes >= 0)
+
+        codes, time_h, closure = codes[keep], time_h[keep].astype(np.int64), self.closure[keep]
+        n_hours = int(time_h.max(initial=0)) + 1
+        keys, inverse = np.unique(codes * n_hours + time_h, return_inverse=True)
+
+        valid = ~np.isnan(closure)
+        values = np.where(valid, closure, 0.0)
+        count = np.bincount(inverse, weights=valid, minlength=len(keys))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(inverse, weights=values, minlength=len(keys)) / count
+            sq_dev = np.where(valid, (values - mean[inverse]) ** 2, 0.0)
+            std = np.sqrt(np.bincount(inverse, weights=sq_dev, minlength=len(keys)) / (count - 1))
+        mean[count == 0] = np.nan
+        std[count < 2] = np.nan
+
+        stats = pd.DataFrame({
+            "Condition": np.asarray(self.conditions.categories, dtype=object)[keys // n_hours],
+            "Time_h": keys % n_hours,
+            "mean": mean,
+            "std": std,
+        })
+        return stats.sort_values(by=["Condition", "Time_h"]).reset_index(drop=True)
@@ -0,0 +1,122 @@
+import re
+from functools import cached_property, lru_cache
+
+# numpy is imported by the vectorized helpers only: the plate formats are also used by the
+# interface (well grid, map validation), which should not load numpy before its first paint
+
+WELL_PATTERN = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def row_label(row):
+    '''1-based row number -> 'A' ... 'Z', 'AA', 'AB', ...'''
+    label = ""
+    while row > 0:
+        row, rem = divmod(row - 1, 26)
+        label = chr(ord('A') + rem) + label
+    return label
+
+
+def row_number(label):
+    ''''A' ... 'Z', 'AA', ... -> 1-based row number'''
+    row = 0
+    for char in label:
+        row = row * 26 + ord(char) - ord('A') + 1
+    return row
+
+
+class PlateFormat:
+    '''
+    Plate geometry (rows x columns) and conversions between
+    (row, column), integer well index and well label ('A1', ..., 'AF48').
+    Rows and columns are 1-based; the well index is 0-based, row-major
+    (A1, A2, ..., A12, B1, ...), so sorting by index gives the natural well order.
+    Scalar lookups (labels, wells()) are plain Python; the array conversions use numpy.
+    '''
+
+    def __init__(self, n_rows, n_cols, name=None):
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.name = name or f"{n_rows * n_cols}"
+        self.row_labels = [row_label(r) for r in range(1, n_rows + 1)]
+        self.col_labels = [str(c) for c in range(1, n_cols + 1)]
+        self._wells = [r + c for r in self.row_labels for c in self.col_labels]
+
+    def __repr__(self):
+        return f"PlateFormat({self.n_rows}, {self.n_cols}, name={self.name!r})"
+
+    @property
+    def n_wells(self):
+        return self.n_rows * self.n_cols
+
+    @cached_property
+    def labels(self):
+        '''Array of the well labels, in well index order'''
+        import numpy as np
+        return np.array(self._wells)
+
+    def index(self, rows, cols):
+        '''(row, column) -> well index'''
+        import numpy as np
+        return (np.asarray(rows, dtype=np.int64) - 1) * self.n_cols + np.asarray(cols, dtype=np.int64) - 1
+
+    def position(self, index):
+        '''well index -> (row, column)'''
+        import numpy as np
+        rows, cols = np.divmod(np.asarray(index, dtype=np.int64), self.n_cols)
+        return rows + 1, cols + 1
+
+    def label(self, rows, cols):
+        '''(row, column) -> well labels'''
+        return self.labels[self.index(rows, cols)]
+
+    def wells(self):
+        '''All well labels, in well index order'''
+        return list(self._wells)
+
+
+PLATE_96 = PlateFormat(8, 12, "96")
+PLATE_384 = PlateFormat(16, 24, "384")
+PLATE_1536 = PlateFormat(32, 48, "1536")
+
+PLATE_FORMATS = {fmt.name: fmt for fmt in (PLATE_96, PLATE_384, PLATE_1536)}
+
+
+@lru_cache(maxsize=None)
+def _custom_format(n_rows, n_cols):
+    return PlateFormat(n_rows, n_cols)
+
+
+def get_format(n_rows, n_cols):
+    '''Smallest standard format holding n_rows x n_cols, else a custom format'''
+    for fmt in PLATE_FORMATS.values():
+        if n_rows <= fmt.n_rows and n_cols <= fmt.n_cols:
+            return fmt
+    return _custom_format(n_rows, n_cols)
+
+
+def _positions(labels):
+    '''Well labels -> (rows, cols) lists'''
+    matches = [WELL_PATTERN.match(str(w)) for w in labels]
+    bad = [w for w, m in zip(labels, matches) if m is None]
+    if bad:
+        raise ValueError(f"Nom de puits invalide: {bad[:5]}")
+    return [row_number(m.group(1)) for m in matches], [int(m.group(2)) for m in matches]
+
+
+def format_of_wells(labels):
+    '''Plate format needed for a collection of well labels (e.g. the keys of a well map); invalid labels are ignored'''
+    labels = [w for w in labels if WELL_PATTERN.match(str(w))]
+    if not labels:
+        return PLATE_96
+    rows, cols = _positions(labels)
+    return get_format(max(rows), max(cols))
+
+
+def well_labels(rows, cols):
+    '''(row, column) arrays -> well labels, vectorized for any plate size'''
+    import numpy as np
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    if rows.size == 0:
+        return np.array([], dtype=str)
+    fmt = get_format(int(rows.max()), int(cols.max()))
+    return fmt.label(rows, cols)
@@ -0,0 +1,123 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageProfiler:
+    '''
+    Per-stage instrumentation of the pipeline.
+    Each stage records its wall time, CPU time, row count and, with memory=True,
+    its peak traced memory (tracemalloc). With cprofile=True a cProfile of the
+    whole run is also captured. write() saves everything as 'profile.json'.
+
+        profiler = StageProfiler(memory=True)
+        with profiler.stage("parse") as rec:
+            df = read_plate_table(filepath, start)
+            rec["rows"] = len(df)
+
+    Stages measured once per chunk (streaming) use accumulate=True: their measures are
+    added up in a single record, with the number of 'calls' and the largest peak memory.
+    '''
+
+    def __init__(self, memory=False, cprofile=False):
+        self.memory = memory
+        self.records = []
+        self._profile = cProfile.Profile() if cprofile else None
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self._profile is not None:
+            self._profile.enable()
+
+    def stop(self):
+        if not self._started:
+            return
+        self._started = False
+        if self._profile is not None:
+            self._profile.disable()
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name, rows=None, accumulate=False):
+        '''Measure the enclosed block; the yielded record can be completed (e.g. rec["rows"])'''
+        self.start()
+        record = {"stage": name, "rows": rows}
+        if self.memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = time.perf_counter() - wall
+            record["cpu_s"] = time.process_time() - cpu
+            if self.memory:
+                record["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024**2
+            if accumulate:
+                self._accumulate(record)
+            else:
+                self.records.append(record)
+
+    def _accumulate(self, record):
+        '''Add the measures of record to the accumulated record of the same stage (created at the first call)'''
+        for total in self.records:
+            if total["stage"] == record["stage"] and "calls" in total:
+                break
+        else:
+            self.records.append(dict(record, calls=1))
+            return
+        total["calls"] += 1
+        total["wall_s"] += record["wall_s"]
+        total["cpu_s"] += record["cpu_s"]
+        if record["rows"] is not None:
+            total["rows"] = (total["rows"] or 0) + record["rows"]
+        if "peak_mb" in record:
+            total["peak_mb"] = max(total["peak_mb"], record["peak_mb"])
+
+    def summary(self):
+        return {
+            "stages": self.records,
+            "total_wall_s": sum(r["wall_s"] for r in self.records),
+            "total_cpu_s": sum(r["cpu_s"] for r in self.records),
+        }
+
+    def write(self, output_dir, top=30):
+        '''Write 'profile.json' (and 'profile.pstats' with cProfile) in output_dir, return the JSON path'''
+        self.stop()
+        os.makedirs(output_dir, exist_ok=True)
+        data = self.summary()
+
+        if self._profile is not None:
+            self._profile.dump_stats(os.path.join(output_dir, "profile.pstats"))
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(top)
+            data["cprofile_top"] = out.getvalue().splitlines()
+
+        path = os.path.join(output_dir, "profile.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        return path
+
+
+class NullProfiler(StageProfiler):
+    '''Profiler doing nothing, used when profiling is off'''
+
+    @contextmanager
+    def stage(self, name, rows=None, accumulate=False):
+        yield {}
+
+    def start(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Robust z-score (0.6745 * (x - median) / MAD) above which a point or a curve is an outlier
+Z_THRESHOLD = 3.5
+# Lower bound of the MAD [% closure], so that near-identical replicates (e.g. all at 0 %
+# closure at the first hours) do not turn small differences into huge z-scores
+MIN_MAD = 2.0
+# A well is also an outlier when at least this share of its points are
+POINT_SHARE = 0.5
+# Replicates needed to judge a condition, and kept in any case
+MIN_WELLS = 3
+MIN_KEPT = 2
+
+_MAD_SCALE = 0.6745
+
+QC_COLUMNS = ["Well", "Condition", "n_points", "outlier_points", "max_abs_z",
+              "deviation", "deviation_z", "decision", "reason"]
+
+
+def robust_z(values, groups, scale_groups=None, min_mad=MIN_MAD):
+    '''
+    Median / MAD z-score of each value: distance to the median of its group, over the MAD
+    of the distances within its scale group (groups, scale_groups: key arrays, as for groupby;
+    by default the group itself). A few replicates give a poor MAD, so the scale is usually
+    pooled over more values than the median.
+    Returns the z-scores and the median of the group of each value.
+    '''
+    values = pd.Series(values).reset_index(drop=True)
+    median = values.groupby(groups).transform("median")
+    # The median value of an odd group is at distance 0 and says nothing about the spread
+    distance = (values - median).abs().replace(0.0, np.nan)
+    mad = distance.groupby(groups if scale_groups is None else scale_groups).transform("median")
+    return _MAD_SCALE * (values - median) / np.maximum(mad.fillna(0.0), min_mad), median
+
+
+def flag_outliers(wells, conditions, time_h, values, z_threshold=Z_THRESHOLD, min_mad=MIN_MAD,
+                  point_share=POINT_SHARE):
+    '''
+    Outlier replicate wells from flat arrays (one closure value per well and time, as
+    control_stats.group_stats), all wells at once:
+        - a point is an outlier when its distance to the median of the wells of its condition
+          at the same hour, over the MAD of these distances for all wells at that hour
+          (robust z-score), is above z_threshold
+        - the deviation of a well is the mean distance of its curve to the median curve of
+          its condition; the curve is an outlier when the robust z-score of its deviation
+          among all the wells of the plate is above z_threshold
+        - a well is flagged for an outlier curve ('curve') or when at least point_share of its
+          points are outliers ('points')
+    Conditions with fewer than MIN_WELLS wells are not judged, and flagged wells are only
+    excluded while MIN_KEPT wells of their condition remain (decision 'flagged' otherwise).
+    Returns one row per well with a condition: QC_COLUMNS, decision 'ok', 'excluded' or 'flagged'.
+    '''
+    df = pd.DataFrame({"Well": wells, "Condition": conditions, "Time_h": time_h, "value": values})
+    df = df[df["Condition"].notna() & df["value"].notna() & df["Time_h"].notna()]
+    if df.empty:
+        return pd.DataFrame(columns=QC_COLUMNS)
+    df = df.astype({"Well": str, "Condition": str, "Time_h": np.int64})
+    # One value per well and hour (timepoints rounded to the same hour are averaged)
+    df = df.groupby(["Well", "Condition", "Time_h"], sort=False)["value"].mean().reset_index()
+
+    df = df.reset_index(drop=True)
+    z, median = robust_z(df["value"], [df["Condition"], df["Time_h"]], df["Time_h"], min_mad)
+    judged = df.groupby("Condition")["Well"].transform("nunique") >= MIN_WELLS
+    df["abs_z"] = z.abs()
+    df["outlier"] = judged & (df["abs_z"] > z_threshold)
+    df["distance"] = (df["value"] - median).abs()
+
+    g = df.groupby(["Well", "Condition"], sort=False)
+    table = pd.DataFrame({
+        "n_points": g["value"].count(),
+        "outlier_points": g["outlier"].sum(),
+        "max_abs_z": g["abs_z"].max(),
+        "deviation": g["distance"].mean(),
+    }).reset_index()
+    table["judged"] = table.groupby("Condition")["Well"].transform("size") >= MIN_WELLS
+    plate = np.zeros(len(table))
+    table["deviation_z"], _ = robust_z(table["deviation"], plate, plate, min_mad)
+
+    curve = table["judged"] & (table["deviation_z"] > z_threshold)
+    points = table["judged"] & (table["outlier_points"] > 0) & \
+        (table["outlier_points"] >= point_share * table["n_points"])
+    flagged = curve | points
+    table["reason"] = np.where(curve & points, "curve+points",
+                               np.where(curve, "curve", np.where(points, "points", "")))
+
+    # Never leave a condition with fewer than MIN_KEPT wells
+    kept = (~flagged).groupby(table["Condition"]).transform("sum")
+    table["decision"] = np.where(~flagged, "ok", np.where(kept >= MIN_KEPT, "excluded", "flagged"))
+    table["outlier_points"] = table["outlier_points"].astype(np.int64)
+    return table[QC_COLUMNS]
+
+
+def plate_qc(plate, **kwargs):
+    '''flag_outliers of a PlateData, one value per well (closure averaged over its images) and time'''
+    n_times = plate.well_closure.shape[1]
+    return flag_outliers(np.repeat(plate.labels, n_times),
+                         np.repeat(np.asarray(plate.conditions, dtype=object), n_times),
+                         plate.time_h.ravel(), plate.well_closure.ravel(), **kwargs)
+
+
+def excluded_wells(table):
+    '''Labels of the wells excluded by the QC'''
+    return set(table.loc[table["decision"] == "excluded", "Well"])
+
+
+def write_qc(table, output_dir):
+    '''Write 'qc_wells.csv' in output_dir and return its path'''
+    os.makedirs(output_dir, exist_ok=True)
+    path = qc_path(output_dir)
+    table.to_csv(path, index=False, encoding="utf-8")
+    return path
+
+
+def qc_path(output_dir):
+    return os.path.join(output_dir, "qc_wells.csv")
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+class RunningStats:
+    '''
+    Running mean and standard deviation of the closure per (Condition, Time_h).
+    Each update merges the statistics of a chunk of rows into the current
+    count / mean / M2 accumulators (Welford, with Chan's pairwise merge),
+    so the memory used only depends on the number of conditions and hours.
+    Finer keys (e.g. per well) can be regrouped afterwards.
+    '''
+
+    KEYS = ["Condition", "Time_h"]
+
+    def __init__(self, keys=KEYS):
+        self.keys = list(keys)
+        self.state = pd.DataFrame(
+            {"n": [], "mean": [], "m2": []},
+            index=pd.MultiIndex.from_arrays([[] for _ in self.keys], names=self.keys),
+        )
+
+    def update(self, df):
+        '''Merge a chunk with the key columns and 'Closure' (rows with a missing key are ignored)'''
+        g = df.groupby(self.keys)["Closure"]
+        n = g.count()
+        chunk = pd.DataFrame({
+            "n": n.astype(np.float64),
+            "mean": g.mean(),
+            "m2": (g.var(ddof=0) * n).fillna(0.0),
+        })
+        if chunk.empty:
+            return
+
+        a, b = self.state.align(chunk, join="outer")
+        a["n"] = a["n"].fillna(0.0)
+        b["n"] = b["n"].fillna(0.0)
+        n = a["n"] + b["n"]
+
+        # Chan et al. merge of two partial (n, mean, M2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = b["mean"].fillna(0.0) - a["mean"].fillna(0.0)
+            mean = np.where(a["n"] == 0, b["mean"], np.where(b["n"] == 0, a["mean"],
+                            a["mean"] + delta * b["n"] / n))
+            m2 = a["m2"].fillna(0.0) + b["m2"].fillna(0.0) + delta**2 * a["n"] * b["n"] / n
+
+        self.state = pd.DataFrame({"n": n, "mean": mean, "m2": m2.where(n > 0, 0.0)})
+
+    def regroup(self, keys=KEYS, where=None):
+        '''
+        RunningStats over coarser keys (a subset of the current ones), merging the groups
+        selected by where (boolean mask over the current groups, default all of them)
+        '''
+        state = (self.state if where is None else self.state[np.asarray(where)]).reset_index()
+        state = state[state["n"] > 0]
+        g = state.assign(total=state["n"] * state["mean"]).groupby(keys)
+        n = g["n"].sum()
+        mean = g["total"].sum() / n
+        # M2 of a union: M2 of each part plus its weighted squared distance to the common mean
+        common = g["total"].transform("sum") / g["n"].transform("sum")
+        spread = state["m2"] + state["n"] * (state["mean"] - common) ** 2
+        out = RunningStats(keys)
+        out.state = pd.DataFrame({"n": n, "mean": mean, "m2": spread.groupby([state[k] for k in keys]).sum()})
+        return out
+
+    def result(self):
+        '''DataFrame ['Condition', 'Time_h', 'mean', 'std'] sorted by condition and ascending time'''
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.state["m2"] / (self.state["n"] - 1))
+        df = pd.DataFrame({
+            "mean": self.state["mean"],
+            "std": std.where(self.state["n"] > 1),
+        }).reset_index()
+        df["Time_h"] = df["Time_h"].astype(np.int64)
+        return df.sort_values(by=self.keys).reset_index(drop=True)
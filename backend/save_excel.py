@@ -1,37 +1,82 @@
 import os
-import re
-import pandas as pd
+import numpy as np
+import xlsxwriter
 
-def parse_condition(cond):
+from backend.conditions import parse_condition
+from backend.series_index import SeriesIndex
+
+# Sheet of the comparisons to the controls
+STATS_SHEET = "Stats vs contrôles"
+# Sheet of the dose-response fits
+DOSE_SHEET = "Dose-réponse"
+
+def write_block(ws, first_row, columns, constant_memory=True):
+    """
+    Write equal-length arrays as adjacent columns starting at (first_row, 0).
+    NaN values are left blank. In constant memory mode the cells are streamed
+    row by row (XlsxWriter ignores cells written above the current row),
+    otherwise each column is written in a single call.
+    Returns the row following the block.
     """
-    Parse 'COL7A1-R 20ng' -> (main_group='COL7A1', subgroup='COL7A1-R', concentration=20.0)
-    If parsing fails, returns (cond, cond, None)
+    columns = [
+        [None if v != v else v for v in np.asarray(col, dtype=np.float64).tolist()]
+        for col in columns
+    ]
+    if constant_memory:
+        for i, values in enumerate(zip(*columns)):
+            ws.write_row(first_row + i, 0, values)
+    else:
+        for j, col in enumerate(columns):
+            ws.write_column(first_row, j, col)
+    return first_row + len(columns[0])
+
+
+def curve_block(dfc, err, bounds=None):
     """
-    if cond is None:
-        return None, None, None
-    parts = str(cond).split()
-    subgroup = parts[0]
-    main_group = subgroup.split("-")[0] if "-" in subgroup else subgroup
-    concentration = None
-    if len(parts) > 1:
-        m = re.search(r"(\d+\.?\d*)", parts[-1])
-        if m:
-            try:
-                concentration = float(m.group(1))
-            except:
-                concentration = None
-    return main_group, subgroup, concentration
-
-
-def save_excel(results_csv, well_map, plate_name):
+    Header, columns and (minus, plus) error bar columns of one curve:
+    Time_h, mean, std with error bars of +/- err, or, with confidence bounds (low, high),
+    Time_h, mean, std, ci_low, ci_high, err_minus, err_plus with asymmetric error bars.
+    """
+    if bounds is None:
+        return ["Time_h", "mean", "std"], [dfc.time, dfc.mean, err], ("C", "C")
+    low, high = bounds
+    return (["Time_h", "mean", "std", "ci_low", "ci_high", "err_minus", "err_plus"],
+            [dfc.time, dfc.mean, dfc.std, low, high, dfc.mean - low, high - dfc.mean], ("F", "G"))
+
+
+def write_table(ws, first_row, table):
+    """
+    Write a DataFrame (header then one row per record) starting at (first_row, 0).
+    NaN values are left blank. Returns the row following the table.
+    """
+    ws.write_row(first_row, 0, [str(c) for c in table.columns])
+    records = table.to_dict("split")["data"]
+    for i, record in enumerate(records, start=first_row + 1):
+        ws.write_row(i, 0, [None if v != v else v for v in record])
+    return first_row + 1 + len(records)
+
+
+def save_excel(results_csv, well_map, plate_name, constant_memory=True, stats=None, intervals=None,
+               dose_response=None):
     """
     Export grouped Excel with real error bars using XlsxWriter.
-    - results_csv: DataFrame with columns ['Condition','Time_h','mean','std']
+    - results_csv: DataFrame with columns ['Condition','Time_h','mean','std'] (or its SeriesIndex)
     - well_map: dict with keys wells -> {'condition', 'replicate', 'control_group'}
     - plate_name: folder/name prefix
+    - constant_memory: stream each sheet row by row to disk (XlsxWriter constant_memory mode)
+      instead of buffering the whole workbook. Sheets are laid out top to bottom so
+      both modes give the same file.
+    - stats: optional comparisons to the controls (see backend/control_stats.py),
+      written in a last sheet
+    - intervals: optional {condition: (low, high)} confidence bounds aligned with the curves
+      (see backend/bootstrap.py), used as error bars instead of the standard deviation
+    - dose_response: optional dose-response fits (EC50, Hill slope, plateaus, see
+      backend/dose_response.py), written in a last sheet
     Returns path to created file.
     """
 
+    index = SeriesIndex.of(results_csv)
+
     # output paths
     out_dir = os.path.join(plate_name, "excel")
     os.makedirs(out_dir, exist_ok=True)
@@ -46,19 +91,25 @@ def save_excel(results_csv, well_map, plate_name):
     # two clearly distinct colors for controls
     control_palette = ["#000000", "#555555"]  # noir + gris foncé
 
+    # confidence bounds of a curve (NaN if it has none), None without intervals
+    def bounds_of(cond, dfc):
+        if intervals is None:
+            return None
+        nan = np.full(len(dfc.time), np.nan)
+        return intervals.get(cond, (nan, nan))
+
+    # charts next to the data columns
+    chart_cell = 'F2' if intervals is None else 'I2'
+
     # parse
-    unique_conditions = [c for c in results_csv["Condition"].unique() if c is not None]
-    parsed = {c: parse_condition(c) for c in unique_conditions}
+    parsed = index.parsed(parse_condition)
 
     # group by main_group
     groups = {}
-    for cond, (main, sub, conc) in parsed.items():
-        if main is None:
-            continue
-        groups.setdefault(main, []).append(cond)
+    for cond, condition in parsed.items():
+        groups.setdefault(condition.family, []).append(cond)
 
-    with pd.ExcelWriter(out_file, engine='xlsxwriter') as writer:
-        workbook = writer.book
+    with xlsxwriter.Workbook(out_file, {'constant_memory': constant_memory}) as workbook:
 
         base_color_hex = [
             "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728",
@@ -78,11 +129,12 @@ def save_excel(results_csv, well_map, plate_name):
 
             subgroups = {}
             for cond in conds:
-                _, subgroup, conc = parsed[cond]
-                subgroups.setdefault(subgroup, []).append((cond, conc))
+                condition = parsed[cond]
+                subgroups.setdefault(condition.subgroup, []).append((cond, condition))
 
+            # by increasing dose (canonical unit), conditions without dose last
             for sub in subgroups:
-                subgroups[sub].sort(key=lambda x: (x[1] is None, x[1]))
+                subgroups[sub].sort(key=lambda x: (x[1].amount is None, x[1].dose_key))
 
             # test solutions
             for s_idx, (subgroup, cond_list) in enumerate(sorted(subgroups.items())):
@@ -97,34 +149,33 @@ def save_excel(results_csv, well_map, plate_name):
 
                 n = max(1, len(cond_list))
 
-                for i, (cond, conc) in enumerate(cond_list):
+                for i, (cond, _) in enumerate(cond_list):
 
                     rgb = hex_to_rgb(base_color)
                     ratio = i / max(1, n-1) if n > 1 else 0.0
                     dark_rgb = tuple(int((1 - 0.5 * ratio) * c) for c in rgb)
                     color_hex = rgb_to_hex(dark_rgb)
 
-                    dfc = results_csv[results_csv["Condition"] == cond].sort_values("Time_h")
-                    if dfc.empty:
+                    dfc = index.get(cond)
+                    if dfc is None:
                         continue
 
+                    header, columns, (minus, plus) = curve_block(dfc, dfc.std, bounds_of(cond, dfc))
+
                     ws.write(row_cursor, 0, cond)
                     row_cursor += 1
-                    ws.write_row(row_cursor, 0, ["Time_h", "mean", "std"])
+                    ws.write_row(row_cursor, 0, header)
                     row_cursor += 1
                     start_row = row_cursor + 1
 
-                    for _, r in dfc.iterrows():
-                        ws.write_number(row_cursor, 0, float(r["Time_h"]) if not pd.isna(r["Time_h"]) else None)
-                        ws.write_number(row_cursor, 1, float(r["mean"]) if not pd.isna(r["mean"]) else None)
-                        ws.write_number(row_cursor, 2, float(r["std"]) if not pd.isna(r["std"]) else None)
-                        row_cursor += 1
+                    row_cursor = write_block(ws, row_cursor, columns, constant_memory)
 
                     end_row = row_cursor
 
                     cat = f"='{sheet_name}'!$A${start_row}:$A${end_row}"
                     vals = f"='{sheet_name}'!$B${start_row}:$B${end_row}"
-                    errs = f"='{sheet_name}'!$C${start_row}:$C${end_row}"
+                    errs_minus = f"='{sheet_name}'!${minus}${start_row}:${minus}${end_row}"
+                    errs_plus = f"='{sheet_name}'!${plus}${start_row}:${plus}${end_row}"
 
                     chart.add_series({
                         'name': cond,
@@ -132,8 +183,8 @@ def save_excel(results_csv, well_map, plate_name):
                         'values': vals,
                         'y_error_bars': {
                             'type': 'custom',
-                            'plus_values': errs,
-                            'minus_values': errs
+                            'plus_values': errs_plus,
+                            'minus_values': errs_minus
                         },
                         'line': {'color': color_hex, 'width': 2.0},
                         'marker': {
@@ -148,27 +199,26 @@ def save_excel(results_csv, well_map, plate_name):
 
             # CONTROL groups
             for i, ctrl in enumerate(control_groups):
-                dfc = results_csv[results_csv["Condition"] == ctrl].sort_values("Time_h")
-                if dfc.empty:
+                dfc = index.get(ctrl)
+                if dfc is None:
                     continue
 
+                header, columns, (minus, plus) = curve_block(dfc, dfc.std / 2, bounds_of(ctrl, dfc))
+
                 ws.write(row_cursor, 0, ctrl + " (control)")
                 row_cursor += 1
-                ws.write_row(row_cursor, 0, ["Time_h", "mean", "std"])
+                ws.write_row(row_cursor, 0, header)
                 row_cursor += 1
                 start_row = row_cursor + 1
 
-                for _, r in dfc.iterrows():
-                    ws.write_number(row_cursor, 0, float(r["Time_h"]) if not pd.isna(r["Time_h"]) else None)
-                    ws.write_number(row_cursor, 1, float(r["mean"]) if not pd.isna(r["mean"]) else None)
-                    ws.write_number(row_cursor, 2, float(r["std"]/2) if not pd.isna(r["std"]/2) else None)
-                    row_cursor += 1
+                row_cursor = write_block(ws, row_cursor, columns, constant_memory)
 
                 end_row = row_cursor
 
                 cat = f"='{sheet_name}'!$A${start_row}:$A${end_row}"
                 vals = f"='{sheet_name}'!$B${start_row}:$B${end_row}"
-                errs = f"='{sheet_name}'!$C${start_row}:$C${end_row}"
+                errs_minus = f"='{sheet_name}'!${minus}${start_row}:${minus}${end_row}"
+                errs_plus = f"='{sheet_name}'!${plus}${start_row}:${plus}${end_row}"
 
                 control_color = control_palette[i % len(control_palette)]
 
@@ -178,8 +228,8 @@ def save_excel(results_csv, well_map, plate_name):
                     'values': vals,
                     'y_error_bars': {
                         'type': 'custom',
-                        'plus_values': errs,
-                        'minus_values': errs
+                        'plus_values': errs_plus,
+                        'minus_values': errs_minus
                     },
                     'line': {'color': control_color, 'width': 2.5},
                     'marker': {
@@ -190,6 +240,14 @@ def save_excel(results_csv, well_map, plate_name):
                     }
                 })
 
-            ws.insert_chart('F2', chart, {'x_scale': 1.4, 'y_scale': 1.1})
+            ws.insert_chart(chart_cell, chart, {'x_scale': 1.4, 'y_scale': 1.1})
+
+        if stats is not None and len(stats):
+            ws = workbook.add_worksheet(STATS_SHEET)
+            write_table(ws, 0, stats)
+
+        if dose_response is not None and len(dose_response):
+            ws = workbook.add_worksheet(DOSE_SHEET)
+            write_table(ws, 0, dose_response)
 
     return out_file
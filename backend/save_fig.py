@@ -1,41 +1,88 @@
 import os
-import matplotlib.pyplot as plt
+import multiprocessing
+import matplotlib
 import matplotlib.cm as cm
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
-def parse_condition(cond):
+from backend.conditions import parse_condition
+from backend.control_stats import significance
+from backend.dose_response import logistic4
+from backend.series_index import SeriesIndex
+from backend.stages import stage_key
+
+def render_figure(spec):
     """
-    Sépare une condition du type 'COL7A1-R 20ng'
-    -> ('COL7A1-R', 20)
-    Si aucune concentration n'est trouvée, retourne (cond, None).
+    Trace et enregistre une figure à partir de sa description (voir save_fig).
+    Utilise une Figure explicite et le backend Agg : sans état pyplot,
+    donc exécutable dans un processus séparé.
     """
-    if cond is None:
-        return None, None
-
-    parts = cond.split()
-    if len(parts) < 2:
-        return cond, None
-
-    base = " ".join(parts[:-1])
-    value = parts[-1]
-
-    try:
-        # gère ng ou pg → converti tout en nombre
-        number = float(value.replace("ng", "").replace("pg", ""))
-    except:
-        return cond, None
-
-    return base, number
-
-
-def save_fig(results_csv, well_map, plate_name):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(10, 7))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    handles = []
+    for s in spec["series"]:
+        handles.append(ax.errorbar(
+            s["time"], s["mean"], yerr=s.get("yerr", s["std"]),
+            label=s["label"],
+            color=s["color"],
+            marker=s["marker"],
+            markersize=s["markersize"],
+            linestyle=s["linestyle"],
+            linewidth=s["linewidth"],
+            capsize=4
+        ))
+        # Marqueurs de significativité au-dessus des points
+        for x, y, text in s.get("markers", ()):
+            ax.text(x, y, text, ha="center", va="bottom", fontsize=10, color=s["color"])
+
+    if spec.get("marker_note"):
+        ax.text(0.99, 0.01, spec["marker_note"], transform=ax.transAxes,
+                ha="right", va="bottom", fontsize=9, color="#333333")
+
+    # Ticks & axes
+    ax.set_xlim(0, spec["max_time"])
+    ax.set_ylim(0, 100)
+
+    ax.grid(True, alpha=0.3)
+    ax.set_xlabel("Temps [h]", fontsize=14)
+    ax.set_ylabel("Fermeture moyenne [%]", fontsize=14)
+    ax.set_title(spec["title"], fontsize=16)
+
+    # Légende : triée par concentration
+    if handles:
+        order = spec["legend_order"]
+        ax.legend([handles[i] for i in order], [spec["series"][i]["label"] for i in order],
+                  fontsize=11, frameon=True)
+
+    fig.tight_layout()
+    fig.savefig(spec["path"], dpi=300)
+    return spec["path"]
+
+
+def save_fig(results_csv, well_map, plate_name, jobs=None, previous=None, stats=None, intervals=None):
     """
     Génère les figures :
     - contrôle en noir
     - groupes colorés avec gradient selon concentration
     - légende ordonnée selon concentration
+    Les figures sont décrites ici puis rendues en parallèle par 'jobs' processus
+    (défaut : nombre de cœurs ; jobs=1 rend tout dans le processus courant).
+    results_csv peut être le tableau des résultats ou son SeriesIndex.
+    previous : {chemin: clé} retourné par un appel précédent ; les figures dont le
+    contenu (courbes, couleurs, titre) n'a pas changé ne sont pas retracées.
+    stats : comparaisons aux contrôles (voir backend/control_stats.py) ; si fourni, les points
+    significativement différents du premier contrôle (test de Dunnett) sont marqués (*, **, ***).
+    intervals : {condition: (bas, haut)} intervalles de confiance alignés sur les courbes
+    (voir backend/bootstrap.py) ; si fourni, ils remplacent l'écart-type comme barres d'erreur.
+    Retourne {chemin: clé} de toutes les figures.
     """
+    index = SeriesIndex.of(results_csv)
 
     output_dir = os.path.join(plate_name, "figures")
     os.makedirs(output_dir, exist_ok=True)
@@ -45,38 +92,50 @@ def save_fig(results_csv, well_map, plate_name):
                              for info in well_map.values()
                              if info.get('control_group', False)})
 
-    all_conditions = [c for c in results_csv['Condition'].unique() if c is not None]
+    all_conditions = list(index.conditions)
 
     # --- Regroupement par base de condition --- #
     grouped = defaultdict(list)   # ex : "COL7A1-R": ["COL7A1-R 20ng", "COL7A1-R 50ng"]
-    parsed = {}                   # cache parsing
+    parsed = index.parsed(parse_condition)
 
     for cond in all_conditions:
-        base, conc = parse_condition(cond)
-        parsed[cond] = (base, conc)
+        base = parsed[cond].base
         if base:
             grouped[base].append(cond)
 
     # Ajouter un groupe ALL
     grouped["ALL"] = all_conditions
 
-    # --- Génération des figures --- #
+    max_time = index.max_time
+
+    # --- Marqueurs de significativité par condition : {condition: [(temps, marqueur)]} --- #
+    markers, marker_note = {}, None
+    if stats is not None and len(stats):
+        reference = next((c for c in control_groups if c in set(stats["Control"])), None)
+        if reference is not None:
+            ref = stats[stats["Control"] == reference]
+            text = significance(ref["dunnett_p"].to_numpy())
+            for cond, t, m in zip(ref["Condition"], ref["Time_h"], text):
+                if m:
+                    markers.setdefault(cond, []).append((t, m))
+            marker_note = f"* p<0.05, ** p<0.01, *** p<0.001 vs {reference} (Dunnett)"
+
+    # --- Description des figures --- #
+    specs = []
     for group_name, conds in grouped.items():
 
-        plt.figure(figsize=(10, 7))
-
         # Ajouter tous les contrôles à chaque figure
         plot_conditions = conds + [c for c in control_groups if c not in conds]
 
         # ---- Génération des couleurs par groupe ---- #
         # pour les conditions non-contrôles :
         non_ctrl = [c for c in plot_conditions if c not in control_groups]
-        base = parsed[non_ctrl[0]][0] if non_ctrl else None
+        base = parsed[non_ctrl[0]].base if non_ctrl else None
 
         # Si plusieurs concentrations → gradient
         if base and len(grouped[base]) > 1:
-            # valeurs de concentration triées
-            cond_vals = [(c, parsed[c][1]) for c in grouped[base]]
+            # valeurs de concentration triées (unité canonique : 2000pg = 2ng)
+            cond_vals = [(c, parsed[c].amount) for c in grouped[base]]
             cond_vals = [(c, v) for c, v in cond_vals if v is not None]
             cond_vals = sorted(cond_vals, key=lambda x: x[1])
 
@@ -92,69 +151,166 @@ def save_fig(results_csv, well_map, plate_name):
 
         else:
             # fallback normal : couleurs tab20
-            fallback = cm.get_cmap("tab20", len(plot_conditions))
+            fallback = matplotlib.colormaps["tab20"].resampled(len(plot_conditions))
             color_map = {c: fallback(i) for i, c in enumerate(plot_conditions)}
 
-        # --- Tracé des courbes --- #
+        # --- Courbes --- #
+        series, plotted = [], []
         for cond in plot_conditions:
 
-            data = results_csv[results_csv["Condition"] == cond]
-            if data.empty:
+            data = index.get(cond)
+            if data is None:
                 continue
 
+            curve = {"time": data.time, "mean": data.mean, "std": data.std}
+            upper = data.std
+            if intervals is not None and cond in intervals:
+                # Barres asymétriques : de la borne basse à la borne haute de l'intervalle
+                low, high = intervals[cond]
+                curve["yerr"] = np.clip(np.vstack([data.mean - low, high - data.mean]), 0, None)
+                upper = curve["yerr"][1]
+
             # style pour contrôles
+            if cond in markers:
+                top = dict(zip(data.time.tolist(), (data.mean + np.nan_to_num(upper)).tolist()))
+                curve["markers"] = [(t, min(top[t] + 1, 96), m) for t, m in markers[cond] if t in top]
+
             if cond in control_groups:
-                plt.errorbar(
-                    data["Time_h"], data["mean"], yerr=data["std"],
-                    label=f"[CTRL] {cond}",
-                    color="black",
-                    marker="s",
-                    markersize=7,
-                    linestyle="--",
-                    linewidth=2.8,
-                    capsize=4
-                )
+                curve.update(label=f"[CTRL] {cond}", color="black", marker="s",
+                             markersize=7, linestyle="--", linewidth=2.8)
             else:
-                base, conc = parsed[cond]
-                color = color_map.get(cond, "grey")
-
-                plt.errorbar(
-                    data["Time_h"], data["mean"], yerr=data["std"],
-                    label=f"{cond}",
-                    color=color,
-                    marker="o",
-                    markersize=6,
-                    linestyle="-",
-                    linewidth=2,
-                    capsize=4
-                )
-
-        # Ticks & axes
-        max_time = max(results_csv["Time_h"])
-        plt.xlim(0, max_time)
-        plt.ylim(0, 100)
-
-        plt.grid(True, alpha=0.3)
-        plt.xlabel("Temps [h]", fontsize=14)
-        plt.ylabel("Fermeture moyenne [%]", fontsize=14)
-        plt.title(f"Évolution de la fermeture moyenne – {group_name}", fontsize=16)
-
-        # Légende : triée par concentration
-        handles, labels = plt.gca().get_legend_handles_labels()
-
-        def sort_key(label):
-            if "CTRL" in label:
-                return (0, -999)
-            name = label.replace("[CTRL] ", "")
-            b, c = parse_condition(name)
-            return (1, c or 0)
-
-        sorted_pairs = sorted(zip(handles, labels), key=lambda x: sort_key(x[1]))
-        handles, labels = zip(*sorted_pairs)
-        plt.legend(handles, labels, fontsize=11, frameon=True)
-
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, f"fermeture_{group_name}.png"), dpi=300)
-        plt.close()
-
-    return True
+                curve.update(label=f"{cond}", color=color_map.get(cond, "grey"), marker="o",
+                             markersize=6, linestyle="-", linewidth=2)
+            series.append(curve)
+            plotted.append(cond)
+
+        # Légende : contrôles d'abord, puis par dose croissante (unité canonique)
+        def sort_key(cond):
+            if cond in control_groups:
+                return (0, 0, -999)
+            return (1, *parsed[cond].dose_key)
+
+        legend_order = sorted(range(len(series)), key=lambda i: sort_key(plotted[i]))
+
+        specs.append({
+            "series": series,
+            "legend_order": legend_order,
+            "max_time": max_time,
+            "marker_note": marker_note,
+            "title": f"Évolution de la fermeture moyenne – {group_name}",
+            "path": os.path.join(output_dir, f"fermeture_{group_name}.png"),
+        })
+
+    # --- Figures inchangées depuis 'previous' --- #
+    keys = {spec["path"]: stage_key("figure", spec) for spec in specs}
+    previous = previous or {}
+    specs = [spec for spec in specs
+             if previous.get(spec["path"]) != keys[spec["path"]] or not os.path.exists(spec["path"])]
+
+    # --- Rendu des figures --- #
+    jobs = min(jobs or os.cpu_count() or 1, len(specs))
+    if multiprocessing.current_process().daemon:
+        jobs = 1  # un processus démon ne peut pas créer de processus
+    if jobs <= 1:
+        for spec in specs:
+            render_figure(spec)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(render_figure, specs))
+
+    return keys
+
+
+def render_dose_response(spec):
+    """
+    Trace et enregistre une figure dose-réponse (voir save_dose_response_fig) :
+    fermeture moyenne ± écart-type de chaque dose et courbe logistique ajustée.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    ax.errorbar(spec["dose"], spec["mean"], yerr=spec["std"], color="#1f4e79", marker="o",
+                markersize=7, linestyle="none", capsize=4, label="Moyenne ± écart-type")
+    ax.plot(spec["curve_dose"], spec["curve"], color="#2e75b6", linewidth=2, label="Ajustement 4PL")
+    if spec.get("ec50") is not None:
+        ax.axvline(spec["ec50"], color="#888888", linestyle=":", linewidth=1.5)
+
+    ax.text(0.01, 0.99, spec["note"], transform=ax.transAxes, ha="left", va="top",
+            fontsize=10, color="#333333")
+
+    ax.set_xscale("log")
+    ax.set_ylim(0, 100)
+    ax.grid(True, which="both", alpha=0.3)
+    ax.set_xlabel(spec["xlabel"], fontsize=14)
+    ax.set_ylabel("Fermeture moyenne [%]", fontsize=14)
+    ax.set_title(spec["title"], fontsize=16)
+    ax.legend(fontsize=11, frameon=True, loc="lower right")
+
+    fig.tight_layout()
+    fig.savefig(spec["path"], dpi=300)
+    return spec["path"]
+
+
+def save_dose_response_fig(results_csv, fits, plate_name, previous=None):
+    """
+    Figures dose-réponse, une par composé (nom de la condition sans la dose) :
+    points de chaque dose à l'heure de l'ajustement et courbe logistique à 4 paramètres.
+    - fits : ajustements à tracer, une ligne par composé (voir backend/dose_response.py, endpoint_fits)
+    - previous : {chemin: clé} d'un appel précédent, les figures inchangées ne sont pas retracées
+    Retourne {chemin: clé} des figures.
+    """
+    index = SeriesIndex.of(results_csv)
+    parsed = index.parsed(parse_condition)
+
+    output_dir = os.path.join(plate_name, "figures")
+    os.makedirs(output_dir, exist_ok=True)
+
+    specs = []
+    for fit in fits.to_dict("records"):
+        # Doses du composé (même unité canonique) à l'heure de l'ajustement
+        points = []
+        for cond in index.conditions:
+            p = parsed[cond]
+            if p.base != fit["Compound"] or p.canonical_unit != fit["Unit"] or not (p.amount or 0) > 0:
+                continue
+            data = index.get(cond)
+            at = np.flatnonzero(data.time == fit["Time_h"])
+            if len(at):
+                points.append((p.amount, data.mean[at[0]], data.std[at[0]]))
+        if not points:
+            continue
+        dose, mean, std = (np.array(v, dtype=np.float64) for v in zip(*sorted(points)))
+
+        curve_dose = np.geomspace(dose.min() / 2, dose.max() * 2, 200)
+        unit = f" {fit['Unit']}" if fit["Unit"] else ""
+        has_ec50 = fit["ec50"] == fit["ec50"]
+        if has_ec50:
+            curve = logistic4(np.log10(curve_dose), fit["bottom"], fit["top"], fit["log10_ec50"], fit["hill"])
+            note = (f"EC50 = {fit['ec50']:.3g}{unit}" + ("" if fit["in_range"] else " (hors gamme)")
+                    + f"\nHill = {fit['hill']:.2f}")
+        else:
+            # Sans effet dose : plateau moyen
+            curve = np.full_like(curve_dose, (fit["bottom"] + fit["top"]) / 2)
+            note = "Pas d'effet dose"
+        note += f"\nR² = {fit['r2']:.3f}"
+
+        specs.append({
+            "dose": dose, "mean": mean, "std": std,
+            "curve_dose": curve_dose, "curve": curve,
+            "ec50": fit["ec50"] if has_ec50 else None,
+            "note": note,
+            "xlabel": f"Dose [{fit['Unit']}]" if fit["Unit"] else "Dose",
+            "title": f"Dose-réponse – {fit['Compound']} ({int(fit['Time_h'])} h)",
+            "path": os.path.join(output_dir, f"dose_reponse_{fit['Compound']}_{fit['Unit'] or 'dose'}.png"),
+        })
+
+    keys = {spec["path"]: stage_key("figure", spec) for spec in specs}
+    previous = previous or {}
+    for spec in specs:
+        if previous.get(spec["path"]) != keys[spec["path"]] or not os.path.exists(spec["path"]):
+            render_dose_response(spec)
+    return keys
@@ -0,0 +1,63 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Time-sorted curve of one condition (read-only arrays)
+Series = namedtuple("Series", ["time", "mean", "std"])
+
+
+class SeriesIndex:
+    '''
+    Immutable index of the results table (columns ['Condition', 'Time_h', 'mean', 'std']):
+    maps each condition to contiguous, time-sorted arrays (Time_h, mean, std).
+    Built once with a single sort and shared by save_fig and save_excel
+    instead of filtering the whole table for every condition.
+    '''
+
+    def __init__(self, results_csv):
+        df = results_csv[results_csv["Condition"].notna()]
+        df = df.sort_values(by=["Condition", "Time_h"], kind="stable")
+
+        cond = df["Condition"].to_numpy()
+        time = _frozen(df["Time_h"].to_numpy())
+        mean = _frozen(df["mean"].to_numpy(dtype=np.float64))
+        std = _frozen(df["std"].to_numpy(dtype=np.float64))
+
+        # Boundaries of each condition block in the sorted arrays
+        starts = np.flatnonzero(np.r_[True, cond[1:] != cond[:-1]]) if len(cond) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(cond)]
+
+        self._series = {
+            cond[s]: Series(time[s:e], mean[s:e], std[s:e]) for s, e in zip(starts, ends)
+        }
+        # Conditions in order of appearance in the table (as Series.unique())
+        self.conditions = tuple(c for c in results_csv["Condition"].unique() if c is not None and c in self._series)
+        self.max_time = time.max() if len(time) else 0
+        self._parsed = {}
+
+    @classmethod
+    def of(cls, results):
+        '''SeriesIndex of a results table (returned unchanged if it is already an index)'''
+        return results if isinstance(results, cls) else cls(results)
+
+    def __contains__(self, cond):
+        return cond in self._series
+
+    def __getitem__(self, cond):
+        return self._series[cond]
+
+    def get(self, cond):
+        '''Series of the condition, None if it has no data'''
+        return self._series.get(cond)
+
+    def parsed(self, parse):
+        '''{condition: parse(condition)} for all conditions, computed once per parser'''
+        if parse not in self._parsed:
+            self._parsed[parse] = {c: parse(c) for c in self.conditions}
+        return self._parsed[parse]
+
+
+def _frozen(a):
+    a = np.ascontiguousarray(a)
+    a.setflags(write=False)
+    return a
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+
+# Bump when the output of a stage changes for the same inputs
+STAGE_VERSION = 2
+
+# Each pipeline stage is keyed by the keys of the stages it reads from plus its own
+# inputs (see run_plate), so a change upstream changes the keys of every stage below:
+#   table   : raw file content hash, parser version (parse cache)
+#   results : table, well-map hash, options (streaming, plane aggregation, intervals, QC, dose response)
+#   excel   : results, well-map hash, error bars, dose-response endpoint
+#   figures : results, well-map hash, markers, error bars, dose-response endpoint
+#             (each figure is also keyed by its content)
+
+STATE_FILE = ".stages.json"
+
+
+def stage_key(stage, *inputs):
+    '''Key of a stage from its inputs (upstream keys, hashes, options), any JSON-serializable values'''
+    payload = json.dumps([stage, STAGE_VERSION, *inputs], sort_keys=True, default=_jsonable)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _jsonable(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class StageState:
+    '''
+    Keys and output files of the last run of each stage for one plate,
+    stored in 'plate_name/.stages.json'.
+    A stage is fresh when its key is unchanged and its output files are still
+    the ones it wrote (same size and modification time).
+    '''
+
+    def __init__(self, plate_name):
+        self.path = os.path.join(plate_name, STATE_FILE)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.stages = json.load(f)
+        except (OSError, ValueError):
+            self.stages = {}
+
+    def fresh(self, stage, key):
+        entry = self.stages.get(stage)
+        if entry is None or entry["key"] != key:
+            return False
+        return all(_stamp(path) == stamp for path, stamp in entry["outputs"].items())
+
+    def get(self, stage, name, default=None):
+        '''Extra value recorded with the last run of a stage'''
+        return self.stages.get(stage, {}).get(name, default)
+
+    def record(self, stage, key, outputs, **extra):
+        '''Record a completed stage, its key and output files, then save the state'''
+        self.stages[stage] = {"key": key, "outputs": {path: _stamp(path) for path in outputs}, **extra}
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.stages, f, indent=4)
+        os.replace(tmp, self.path)
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
@@ -0,0 +1,310 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.baseline import IMAGE_COLUMNS, aggregate_rows, check_aggregation
+from backend.bootstrap import condition_intervals, write_intervals
+from backend.control_stats import compare_to_controls, control_conditions, group_stats, write_control_stats
+from backend.data_processing import read_header, table_schema
+from backend.dose_response import fit_dose_response, write_dose_response
+from backend.kinetics import well_kinetics_from_long, write_kinetics
+from backend.plate_format import format_of_wells, get_format, well_labels
+from backend.profiling import NULL_PROFILER
+from backend.qc import excluded_wells, flag_outliers, write_qc
+from backend.running_stats import RunningStats
+
+# Image key: well index * IMAGE_CODES + (Plane, Field) codes, each int16 shifted to 16 unsigned bits
+IMAGE_CODES = 2**32
+_INT16_SHIFT = 2**15
+
+
+class StreamingProcessor:
+    '''
+    Row-chunk processing of a data table with bounded memory.
+    Each chunk (columns from read_plate_table) gets its Well / Condition / Closure
+    columns, is appended to 'results_sorted.csv' (in file order) and merged into
+    the per-condition running mean/std. Only the Area_t0 of each well, the
+    accumulators and the closure sums of each well and timepoint (for the per-well
+    tables, one small partial table per chunk, combined once when needed) are kept
+    between chunks.
+    The baseline of a well image is its first valid row in file order. With plane_agg,
+    the images of a well and timepoint are combined first; the rows of the last well
+    and timepoint of a chunk are held back until the next chunk (or flush()) in case
+    the group continues there.
+    The stages of each chunk (plane_agg, derive, csv, aggregate) are added up across the
+    chunks by profiler (see backend/profiling.py), the final tables profiled like the dense path.
+    '''
+
+    SORTED_COLS = [
+        "Row", "Column", "Well",
+        "Condition", "Replicate",
+        "Time_s", "Time_h",
+        "Area_t0", "Area_um2", "Closure"
+    ]
+
+    GROUP_KEYS = ["Row", "Column", "Timepoint"]
+
+    def __init__(self, well_map, plate_name, plane_agg=None, intervals=False, qc=False, dose_response=False,
+                 profiler=NULL_PROFILER):
+        self.plate_name = plate_name
+        self.profiler = profiler
+        self.plane_agg = check_aggregation(plane_agg)
+        self.intervals = intervals
+        self.qc = qc
+        self.dose_response = dose_response
+        self.well_map = well_map
+        self.conditions = {w: info.get("condition") for w, info in well_map.items()}
+        self.replicates = {w: info.get("replicate") for w, info in well_map.items()}
+        self.format = format_of_wells(well_map)     # grown if the data has wells outside it
+        self.area_t0 = pd.Series(dtype=np.float64)  # image key (see _image_keys) -> baseline area
+        self.pending = None         # held back rows of an incomplete well / timepoint group
+        self.stats = RunningStats()
+        self.curve_parts = []       # closure sum / count per (Row, Column, Time_s) of each chunk, see curves()
+        # per-well statistics, regrouped without the outlier wells at the end (qc only)
+        self.well_stats = RunningStats(["Well", *RunningStats.KEYS]) if qc else None
+        self.hours = set()
+        self.n_rows = 0
+        self.touched = set()        # conditions with new rows since the last refresh_results()
+        self.plot = None            # plot table of the last refresh_results()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        pd.DataFrame(columns=self.SORTED_COLS).to_csv(
+            self.sorted_path, index=False, encoding="utf-8"
+        )
+
+    @property
+    def output_dir(self):
+        return os.path.join(self.plate_name, "csv")
+
+    @property
+    def sorted_path(self):
+        return os.path.join(self.output_dir, "results_sorted.csv")
+
+    def process(self, df):
+        '''Process one chunk. Returns the set of hours seen for the first time.'''
+        if self.plane_agg:
+            with self.profiler.stage("plane_agg", rows=len(df), accumulate=True):
+                df = self._aggregate(df)
+        return self._process_rows(df)
+
+    def flush(self):
+        '''Process the held back rows (end of the table). Returns the set of new hours.'''
+        pending, self.pending = self.pending, None
+        if pending is None or pending.empty:
+            return set()
+        with self.profiler.stage("plane_agg", accumulate=True):    # rows counted with their chunk
+            df = aggregate_rows(pending, self.plane_agg, self.GROUP_KEYS)
+        return self._process_rows(df)
+
+    def _process_rows(self, df):
+        if df.empty:
+            return set()
+
+        profiler = self.profiler
+        with profiler.stage("derive", rows=len(df), accumulate=True):
+            df = self._derive(df)
+        self.n_rows += len(df)
+
+        with profiler.stage("csv", rows=len(df), accumulate=True):
+            df[self.SORTED_COLS].to_csv(
+                self.sorted_path, mode="a", header=False, index=False, encoding="utf-8"
+            )
+        with profiler.stage("aggregate", rows=len(df), accumulate=True):
+            self.stats.update(df)
+            self.touched.update(df["Condition"].dropna().unique())
+            if self.well_stats is not None:
+                self.well_stats.update(df)
+            self._update_curves(df)
+
+        new_hours = set(df["Time_h"].unique()) - self.hours
+        self.hours |= new_hours
+        return new_hours
+
+    def _update_curves(self, df):
+        # Appended as is: merging into one table at every chunk would copy it each time
+        g = df.groupby(["Row", "Column", "Time_s"])["Closure"]
+        self.curve_parts.append(pd.DataFrame({"sum": g.sum(), "n": g.count()}))
+
+    def curves(self):
+        '''Closure sum / count per (Row, Column, Time_s) over all chunks so far, None before any row'''
+        if not self.curve_parts:
+            return None
+        if len(self.curve_parts) > 1:
+            merged = pd.concat(self.curve_parts).groupby(level=["Row", "Column", "Time_s"]).sum()
+            self.curve_parts = [merged]
+        return self.curve_parts[0]
+
+    def _aggregate(self, df):
+        '''Combine the images of each well / timepoint, holding back the last group of the chunk'''
+        if self.pending is not None:
+            df = pd.concat([self.pending, df], ignore_index=True)
+        if df.empty:
+            return df
+        last = df[self.GROUP_KEYS].iloc[-1]
+        held = (df[self.GROUP_KEYS] == last).all(axis=1).to_numpy()
+        self.pending = df[held]
+        return aggregate_rows(df[~held], self.plane_agg, self.GROUP_KEYS)
+
+    def _image_keys(self, df):
+        '''Integer key of the image of each row: well index in the plate format and Plane / Field codes'''
+        rows = df["Row"].to_numpy(dtype=np.int64)
+        cols = df["Column"].to_numpy(dtype=np.int64)
+        fmt = get_format(max(self.format.n_rows, int(rows.max())), max(self.format.n_cols, int(cols.max())))
+        if fmt is not self.format:
+            # Wells outside the current format: keys of the baselines already set moved to the larger one
+            wells, images = np.divmod(self.area_t0.index.to_numpy(dtype=np.int64), IMAGE_CODES)
+            self.area_t0.index = fmt.index(*self.format.position(wells)) * IMAGE_CODES + images
+            self.format = fmt
+
+        keys = self.format.index(rows, cols) * IMAGE_CODES
+        for col, shift in zip(IMAGE_COLUMNS, (2**16, 1)):
+            if col in df:
+                keys += (df[col].to_numpy(dtype=np.int64) + _INT16_SHIFT) * shift
+        return keys
+
+    def _derive(self, df):
+        '''Well, condition, time and closure columns of a chunk'''
+        keys = self._image_keys(df)
+
+        df["Well"] = self.format.label(df["Row"], df["Column"])
+        df["Condition"] = df["Well"].map(self.conditions)
+        df["Replicate"] = df["Well"].map(self.replicates)
+
+        df["Time_s"] = df["Time_s"].round().astype(int)
+        df["Time_h"] = (df["Time_s"] / 3600).round().astype(int)
+
+        # Baselines first (first valid row of each image), so they apply to the later rows of this chunk
+        valid = df["Area_um2"].gt(0).to_numpy()
+        first = pd.Series(df["Area_um2"].to_numpy()[valid], index=keys[valid])
+        first = first[~first.index.duplicated()]
+        first = first[~first.index.isin(self.area_t0.index)]
+        if len(first):
+            self.area_t0 = pd.concat([self.area_t0, first]) if len(self.area_t0) else first
+        df["Area_t0"] = self.area_t0.reindex(keys).to_numpy()
+
+        df["Closure"] = 100 * (df["Area_t0"] - df["Area_um2"]) / df["Area_t0"]
+        df["Closure"] = df["Closure"].clip(lower=0)
+        return df
+
+    def results(self):
+        '''Current ['Condition', 'Time_h', 'mean', 'std'] table'''
+        return self.stats.result()
+
+    def refresh_results(self):
+        '''
+        Live update of 'results_plot.csv' from the running statistics only: the rows of the
+        conditions touched since the last call are recomputed, the others reused. The per-well
+        tables (kinetics, comparisons, QC, intervals, dose-response) are left to write_results.
+        Returns the plot table.
+        '''
+        touched, self.touched = self.touched, set()
+        if self.plot is None:
+            self.plot = self.results()
+        elif touched:
+            state = self.stats.state
+            part = RunningStats(self.stats.keys)
+            part.state = state[state.index.get_level_values("Condition").isin(list(touched))]
+            kept = self.plot[~self.plot["Condition"].isin(touched)]
+            self.plot = (pd.concat([kept, part.result()], ignore_index=True)
+                         .sort_values(by=self.stats.keys).reset_index(drop=True))
+        self.plot.to_csv(os.path.join(self.output_dir, "results_plot.csv"), index=False, encoding="utf-8")
+        return self.plot
+
+    def write_results(self):
+        '''
+        Write 'results_plot.csv' from the running statistics, the kinetics tables, the
+        comparisons to the controls, the bootstrap confidence intervals (with intervals) and
+        the dose-response fits (with dose_response) from the per-well curves, return the plot table.
+        With qc, the outlier wells found on the per-well curves are left out of the
+        per-condition results (the running statistics are regrouped without them).
+        '''
+        profiler = self.profiler
+        with profiler.stage("aggregate", accumulate=True):
+            df = self.results()
+            curves = self.curves()
+        if curves is not None:
+            curves = curves.reset_index()
+            curves["Closure"] = (curves["sum"] / curves["n"]).where(curves["n"] > 0)
+            labels = well_labels(curves["Row"], curves["Column"])
+            conditions = pd.Series(labels).map(self.conditions).to_numpy()
+            time_h = (curves["Time_s"] / 3600).round().to_numpy()
+
+            excluded = set()
+            if self.qc:
+                with profiler.stage("qc") as rec:
+                    table = flag_outliers(labels, conditions, time_h, curves["Closure"].to_numpy())
+                    write_qc(table, self.output_dir)
+                    excluded = excluded_wells(table)
+                    rec["rows"] = len(table)
+            if excluded:
+                with profiler.stage("aggregate", accumulate=True):
+                    kept = ~self.well_stats.state.index.get_level_values("Well").isin(list(excluded))
+                    df = self.well_stats.regroup(RunningStats.KEYS, kept).result()
+                conditions = np.where(np.isin(labels, list(excluded)), None, conditions)
+
+            with profiler.stage("kinetics") as rec:
+                wells = well_kinetics_from_long(curves, self.well_map)
+                write_kinetics(wells, self.output_dir, excluded)
+                rec["rows"] = len(wells)
+
+            with profiler.stage("statistics") as rec:
+                replicates = (conditions, time_h, curves["Closure"].to_numpy())
+                stats = group_stats(*replicates)
+                table = compare_to_controls(stats, control_conditions(self.well_map))
+                write_control_stats(table, self.output_dir)
+                rec["rows"] = len(table)
+            if self.intervals:
+                with profiler.stage("bootstrap") as rec:
+                    table = condition_intervals(*replicates)
+                    write_intervals(table, self.output_dir)
+                    rec["rows"] = len(table)
+            if self.dose_response:
+                with profiler.stage("dose_response") as rec:
+                    table = fit_dose_response(stats)
+                    write_dose_response(table, self.output_dir)
+                    rec["rows"] = len(table)
+        with profiler.stage("csv", rows=len(df), accumulate=True):
+            df.to_csv(os.path.join(self.output_dir, "results_plot.csv"), index=False, encoding="utf-8")
+        return df
+
+
+def read_plate_chunks(filepath, start, chunksize):
+    '''Iterate over the data table at byte offset 'start' by chunks of chunksize rows'''
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        dtypes, renames = table_schema(read_header(f))
+
+        f.seek(start)
+        reader = pd.read_csv(
+            f,
+            sep="\t",
+            usecols=list(dtypes),
+            dtype=dtypes,
+            engine="c",
+            encoding="utf-8",
+            chunksize=chunksize
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk.rename(columns=renames)
+
+
+def data_processing_streaming(filepath, well_map, start, plate_name, chunksize=200_000, plane_agg=None,
+                              intervals=False, qc=False, dose_response=False, profiler=NULL_PROFILER):
+    '''
+    Same outputs as data_processing, with a peak memory bounded by chunksize rows.
+    Rows of 'results_sorted.csv' are in file order instead of being sorted by well.
+    The reading of the chunks is profiled as one 'parse' stage (see StreamingProcessor for the others).
+    '''
+    processor = StreamingProcessor(well_map, plate_name, plane_agg, intervals, qc, dose_response, profiler)
+    chunks = read_plate_chunks(filepath, start, chunksize)
+    while True:
+        with profiler.stage("parse", accumulate=True) as rec:
+            chunk = next(chunks, None)
+            rec["rows"] = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        processor.process(chunk)
+    processor.flush()
+    return processor.write_results()
@@ -0,0 +1,172 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import time
+
+from backend.plate_format import format_of_wells
+
+# Structured well-map document
+WELL_MAP_SCHEMA = "naos-well-map"
+WELL_MAP_VERSION = 1
+
+DEFAULT_LIBRARY_DIR = "./data/well_maps"
+
+
+# ----------------------------------------------------------------------
+#   DOCUMENT FORMAT
+# ----------------------------------------------------------------------
+
+def to_document(well_map, plate_name=None):
+    """
+    Document JSON d'une carte de plaque :
+    {"schema", "version", "plate_name", "plate_format", "wells": {well: {condition, replicate, control_group}}}
+    """
+    wells = {
+        well: {
+            "condition": info.get("condition"),
+            "replicate": info.get("replicate"),
+            "control_group": bool(info.get("control_group", False)),
+        }
+        for well, info in well_map.items()
+    }
+    return {
+        "schema": WELL_MAP_SCHEMA,
+        "version": WELL_MAP_VERSION,
+        "plate_name": plate_name,
+        "plate_format": format_of_wells(wells).name,
+        "wells": wells,
+    }
+
+
+def from_document(doc):
+    """Carte {well: {...}} d'un document, après vérification du schéma et de la version."""
+    if not isinstance(doc, dict) or doc.get("schema") != WELL_MAP_SCHEMA:
+        raise ValueError("Fichier de carte de plaque non reconnu")
+    if doc.get("version", 0) > WELL_MAP_VERSION:
+        raise ValueError(f"Version de carte de plaque non supportée: {doc.get('version')}")
+    wells = doc.get("wells")
+    if not isinstance(wells, dict):
+        raise ValueError("Carte de plaque invalide: 'wells' manquant")
+    return wells
+
+
+def well_map_hash(well_map):
+    """Hash (SHA-256) du contenu de la carte, indépendant de l'ordre des puits."""
+    canonical = json.dumps(to_document(well_map)["wells"], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def save_well_map(well_map, path, plate_name=None):
+    """Écrit la carte au format JSON structuré."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(to_document(well_map, plate_name), f, indent=1, ensure_ascii=False)
+
+
+def load_well_map(path):
+    """
+    Charge une carte de plaque : format JSON structuré, ou ancien fichier
+    Python 'well_map = {...}' lu comme un littéral (le fichier n'est pas exécuté).
+    """
+    if path.lower().endswith(".py"):
+        return load_legacy_map(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return from_document(json.load(f))
+
+
+def load_legacy_map(path):
+    """Lit le dict 'well_map' d'un ancien fichier well_map.py sans l'exécuter."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if (isinstance(node, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == "well_map" for t in node.targets)):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                raise ValueError(f"{path}: 'well_map' doit être un dictionnaire littéral")
+    raise ValueError(f"{path}: aucune variable 'well_map' trouvée")
+
+
+# ----------------------------------------------------------------------
+#   LIBRARY
+# ----------------------------------------------------------------------
+
+class WellMapLibrary:
+    """
+    Bibliothèque locale de cartes de plaque.
+    Chaque carte est un fichier '<hash>.json' ; 'index.json' associe
+    hash -> {plate_name, saved} pour retrouver les cartes par nom de plaque.
+    """
+
+    def __init__(self, library_dir=DEFAULT_LIBRARY_DIR):
+        self.library_dir = library_dir
+        self.index_path = os.path.join(library_dir, "index.json")
+        os.makedirs(library_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=1, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def path(self, key):
+        return os.path.join(self.library_dir, key + ".json")
+
+    def add(self, well_map, plate_name=None):
+        """Ajoute la carte (si absente) et retourne son hash."""
+        key = well_map_hash(well_map)
+        if not os.path.exists(self.path(key)):
+            save_well_map(well_map, self.path(key), plate_name)
+        entry = self.index.setdefault(key, {"plate_name": plate_name})
+        if plate_name:
+            entry["plate_name"] = plate_name
+        entry["saved"] = time.time()
+        self._save_index()
+        return key
+
+    def get(self, key):
+        return load_well_map(self.path(key))
+
+    def find(self, plate_name):
+        """Hash des cartes enregistrées pour ce nom de plaque, de la plus récente à la plus ancienne."""
+        keys = [k for k, e in self.index.items() if e.get("plate_name") == plate_name]
+        return sorted(keys, key=lambda k: self.index[k].get("saved", 0), reverse=True)
+
+    def latest(self):
+        """Hash de la dernière carte enregistrée, None si la bibliothèque est vide."""
+        if not self.index:
+            return None
+        return max(self.index, key=lambda k: self.index[k].get("saved", 0))
+
+    def import_file(self, path, plate_name=None):
+        """Importe un fichier de carte (.json ou ancien .py) dans la bibliothèque."""
+        if plate_name is None:
+            plate_name = os.path.splitext(os.path.basename(path))[0]
+        return self.add(load_well_map(path), plate_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import de cartes de plaque dans la bibliothèque.")
+    parser.add_argument("files", nargs="+", help="Cartes à importer (.py ou .json)")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_DIR, help="Dossier de la bibliothèque")
+    args = parser.parse_args(argv)
+
+    library = WellMapLibrary(args.library)
+    for path in args.files:
+        key = library.import_file(path)
+        print(f"{path} -> {key[:12]}")
+
+
+if __name__ == "__main__":
+    main()
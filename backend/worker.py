@@ -0,0 +1,115 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+
+
+def _worker_main(jobs, events):
+    '''
+    Worker process loop. Heavy modules are imported once at start-up,
+    then jobs (job_id, filepath, well_map, options) are run one at a time.
+    Events sent back: ("ready",), ("progress", job_id, stage),
+    ("done", job_id, result), ("error", job_id, message).
+    '''
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    from backend.pipeline import run_plate
+    import matplotlib.pyplot  # noqa: F401  (warm-up for save_fig)
+
+    events.put(("ready",))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, filepath, well_map, options = job
+        try:
+            result = run_plate(
+                filepath, well_map,
+                progress=lambda stage: events.put(("progress", job_id, stage)),
+                **options
+            )
+            events.put(("done", job_id, result))
+        except Exception as e:
+            events.put(("error", job_id, str(e)))
+
+
+class PipelineWorker:
+    '''
+    Runs the pipeline in a separate, warm process so the Tk main loop stays responsive.
+    Jobs are submitted with submit() and their events collected with poll()
+    (typically from a Tk after() callback). cancel() stops the running job by
+    replacing the worker process with a fresh one.
+    '''
+
+    def __init__(self):
+        self._ctx = mp.get_context("spawn")
+        self._ids = itertools.count(1)
+        self.current_job = None
+        self._start()
+
+    def _start(self):
+        self._jobs = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        self._process = self._ctx.Process(
+            target=_worker_main, args=(self._jobs, self._events), daemon=True
+        )
+        self._process.start()
+
+    @property
+    def busy(self):
+        return self.current_job is not None
+
+    def submit(self, filepath, well_map, **options):
+        '''Queue a run of backend.pipeline.run_plate, returns its job id'''
+        job_id = next(self._ids)
+        self.current_job = job_id
+        self._jobs.put((job_id, filepath, dict(well_map), options))
+        return job_id
+
+    def poll(self):
+        '''Events received since the last call (never blocks)'''
+        events = []
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] in ("done", "error") and event[1] == self.current_job:
+                self.current_job = None
+            events.append(event)
+
+        if self.current_job is not None and not self._process.is_alive():
+            events.append(("error", self.current_job, "Le processus de traitement s'est arrêté"))
+            self.current_job = None
+            self._start()
+        return events
+
+    def cancel(self):
+        '''Stop the running job (if any) and restart a warm worker'''
+        if self.current_job is None:
+            return
+        self.current_job = None
+        self._process.terminate()
+        self._process.join()
+        self._start()
+
+    def close(self):
+        if self._process.is_alive():
+            self._jobs.put(None)
+            self._process.join(timeout=2)
+            if self._process.is_alive():
+                self._process.terminate()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    '''Shared PipelineWorker of the application, started on first use (thread-safe)'''
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = PipelineWorker()
+    return _worker
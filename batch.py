@@ -0,0 +1,197 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Figures are rendered off-screen in the worker processes
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from backend.assign import import_existing_map
+from backend.baseline import AGGREGATIONS
+from backend.bootstrap import METHODS
+from backend.data_processing import data_preprocessing
+from backend.pipeline import run_plate
+
+# ---------------------------------------------------------------------------
+#  Headless batch processing of a set of PlateResults files
+#
+#  python -m batch data/ --well-map data/well_map_1.py -o results/
+#  python -m batch "exports/*.txt" --well-map-dir maps/ -j 8
+# ---------------------------------------------------------------------------
+
+def find_plates(inputs):
+    """Expand folders and glob patterns into a sorted list of .txt files."""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(glob.glob(os.path.join(item, "*.txt")))
+        else:
+            files.extend(glob.glob(item))
+    return sorted({os.path.abspath(f) for f in files})
+
+
+def find_well_map(plate_file, well_map=None, well_map_dir=None):
+    """
+    Well map of a plate: '<well_map_dir>/<plate file name>.json' (or .py) if it exists,
+    else the shared well map.
+    """
+    if well_map_dir:
+        stem = os.path.splitext(os.path.basename(plate_file))[0]
+        for ext in (".json", ".py"):
+            path = os.path.join(well_map_dir, stem + ext)
+            if os.path.exists(path):
+                return os.path.abspath(path)
+    if well_map:
+        return os.path.abspath(well_map)
+    return None
+
+
+def duplicate_plate_names(plates):
+    """
+    Plate names shared by several files: {plate name: files}. The outputs of a plate are
+    written to '<plate name>/', so these files would overwrite each other's results.
+    Files whose header cannot be read are left to their worker, which reports the error.
+    """
+    by_name = {}
+    for plate in plates:
+        try:
+            name = data_preprocessing(plate)[1]
+        except (OSError, ValueError):
+            continue
+        by_name.setdefault(name, []).append(plate)
+    return {name: files for name, files in by_name.items() if len(files) > 1}
+
+
+def process_plate(plate_file, map_file, output_dir, figures, chunksize=None, profile=False,
+                  cprofile=False, force=False, plane_agg=None, significance=False, ci=None,
+                  qc=False, dose_response=False, endpoint=None):
+    """Worker: run the whole pipeline for one plate and return its manifest entry."""
+    entry = {"file": plate_file, "well_map": map_file, "status": "ok"}
+    t = time.perf_counter()
+    try:
+        if map_file is None:
+            raise ValueError("Aucune carte de plaque (well map) trouvée pour ce fichier")
+        os.chdir(output_dir)
+        # Plates are already processed in parallel: figures are rendered in this process
+        result = run_plate(plate_file, import_existing_map(map_file), figures=figures,
+                           chunksize=chunksize, figure_jobs=1,
+                           profile=profile, cprofile=cprofile, force=force,
+                           plane_agg=plane_agg, significance=significance, ci=ci, qc=qc,
+                           dose_response=dose_response, endpoint=endpoint)
+        entry.update(result)
+        entry["excel_path"] = os.path.abspath(result["excel_path"])
+        if "profile_path" in result:
+            entry["profile_path"] = os.path.abspath(result["profile_path"])
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+        entry["traceback"] = traceback.format_exc()
+    entry["total"] = time.perf_counter() - t
+    return entry
+
+
+def run_batch(plates, output_dir, well_map=None, well_map_dir=None, figures=True, jobs=None,
+              chunksize=None, profile=False, cprofile=False, force=False, plane_agg=None,
+              significance=False, ci=None, qc=False, dose_response=False, endpoint=None):
+    """Process all plates on a process pool and write 'manifest.json' in output_dir."""
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    t = time.perf_counter()
+    entries = []
+
+    # Plates sharing a plate name (same output directory) are not processed
+    skipped = set()
+    for name, files in duplicate_plate_names(plates).items():
+        for plate in files:
+            others = ", ".join(os.path.basename(f) for f in files if f != plate)
+            entry = {"file": plate, "well_map": find_well_map(plate, well_map, well_map_dir), "status": "error",
+                     "error": f"Plate Name '{name}' partagé avec {others} : les résultats iraient dans "
+                              f"le même dossier, renommer la plaque dans l'export", "total": 0.0}
+            entries.append(entry)
+            skipped.add(plate)
+            print(f"[error] {os.path.basename(plate)} - {entry['error']}")
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(process_plate, plate, find_well_map(plate, well_map, well_map_dir),
+                        output_dir, figures, chunksize, profile, cprofile, force, plane_agg,
+                        significance, ci, qc, dose_response, endpoint)
+            for plate in plates if plate not in skipped
+        ]
+        for future in as_completed(futures):
+            entry = future.result()
+            entries.append(entry)
+            print(f"[{entry['status']:>5}] {os.path.basename(entry['file'])} "
+                  f"({entry['total']:.1f} s)" + (f" - {entry['error']}" if "error" in entry else ""))
+
+    entries.sort(key=lambda e: e["file"])
+    manifest = {
+        "output_dir": output_dir,
+        "n_plates": len(entries),
+        "n_errors": sum(e["status"] != "ok" for e in entries),
+        "wall_time": time.perf_counter() - t,
+        "plates": entries,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Traitement en lot de fichiers PlateResults.")
+    parser.add_argument("inputs", nargs="+", help="Dossiers ou motifs glob de fichiers .txt")
+    parser.add_argument("--well-map", help="Carte de plaque (.json ou .py) commune à toutes les plaques")
+    parser.add_argument("--well-map-dir", help="Dossier de cartes '<nom du fichier>.json' (ou .py) par plaque")
+    parser.add_argument("-o", "--output", default=".", help="Dossier de sortie (défaut: dossier courant)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument("--no-figures", action="store_true", help="Ne pas générer les figures")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Lecture par blocs de N lignes (mémoire bornée)")
+    parser.add_argument("--plane-agg", choices=AGGREGATIONS, default=None,
+                        help="Combiner les plans / champs de chaque puits avant la référence Area_t0")
+    parser.add_argument("--significance", action="store_true",
+                        help="Marquer sur les figures les points différents du contrôle (Dunnett)")
+    parser.add_argument("--ci", choices=METHODS, default=None,
+                        help="Barres d'erreur : intervalle de confiance à 95 %% par bootstrap des puits "
+                             "(percentile ou BCa) au lieu de l'écart-type")
+    parser.add_argument("--qc", action="store_true",
+                        help="Exclure les puits réplicats aberrants des résultats par condition "
+                             "(décisions dans '<plaque>/csv/qc_wells.csv')")
+    parser.add_argument("--dose-response", action="store_true",
+                        help="Ajuster des courbes dose-réponse (4PL : EC50, pente de Hill) par composé "
+                             "et par heure ('<plaque>/csv/dose_response.csv')")
+    parser.add_argument("--endpoint", type=int, default=None,
+                        help="Heure des EC50 de l'Excel et des figures dose-réponse "
+                             "(défaut : dernière heure de chaque composé)")
+    parser.add_argument("--force", action="store_true",
+                        help="Tout recalculer, même les étapes dont les entrées n'ont pas changé")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profiler chaque étape (temps, mémoire) dans '<plaque>/profile.json'")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Ajouter le détail par fonction (cProfile) dans '<plaque>/profile.pstats'")
+    args = parser.parse_args(argv)
+
+    if not args.well_map and not args.well_map_dir:
+        parser.error("--well-map ou --well-map-dir est requis")
+
+    plates = find_plates(args.inputs)
+    if not plates:
+        parser.error("Aucun fichier de données trouvé")
+
+    manifest = run_batch(plates, args.output, args.well_map, args.well_map_dir,
+                         figures=not args.no_figures, jobs=args.jobs, chunksize=args.chunksize,
+                         profile=args.profile, cprofile=args.cprofile, force=args.force,
+                         plane_agg=args.plane_agg, significance=args.significance, ci=args.ci,
+                         qc=args.qc, dose_response=args.dose_response, endpoint=args.endpoint)
+    print(f"{manifest['n_plates'] - manifest['n_errors']}/{manifest['n_plates']} plaques traitées "
+          f"en {manifest['wall_time']:.1f} s -> {os.path.join(manifest['output_dir'], 'manifest.json')}")
+    return 1 if manifest["n_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
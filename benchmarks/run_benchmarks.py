@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from backend.data_processing import data_preprocessing, data_processing
+from backend.save_excel import save_excel
+from backend.save_fig import save_fig
+from backend.series_index import SeriesIndex
+from benchmarks.synthetic_plate import generate_plate
+
+# ---------------------------------------------------------------------------
+#  Benchmarks of the pipeline stages on synthetic plates
+#
+#  python -m benchmarks.run_benchmarks                      compare with baselines
+#  python -m benchmarks.run_benchmarks --save-baseline      store new baselines
+#  python -m benchmarks.run_benchmarks --scales 96 384 --no-figures
+# ---------------------------------------------------------------------------
+
+SCALES = {
+    "96": {"plate_format": "96", "timepoints": 25},
+    "384": {"plate_format": "384", "timepoints": 49},
+    "1536": {"plate_format": "1536", "timepoints": 97},
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+
+
+def stage_functions(plate_file, well_map, figures):
+    '''Ordered (stage, function) pairs; each function receives the previous stage output'''
+    plate_name = data_preprocessing(plate_file)[1]
+    stages = [
+        ("data_preprocessing", lambda _: data_preprocessing(plate_file)),
+        ("data_processing", lambda prev: data_processing(plate_file, well_map, *prev, use_cache=False)),
+        ("save_excel", lambda results: (save_excel(results, well_map, plate_name), results)[1]),
+    ]
+    if figures:
+        stages.append(
+            ("save_fig", lambda results: save_fig(SeriesIndex(results), well_map, plate_name, jobs=1))
+        )
+    return stages
+
+
+def measure(plate_file, well_map, figures=True, repeat=3):
+    '''
+    Time (best of 'repeat') and peak traced memory of each stage.
+    Timing runs are done without tracemalloc, then one traced run measures memory.
+    '''
+    stages = stage_functions(plate_file, well_map, figures)
+    best = {name: float("inf") for name, _ in stages}
+    for _ in range(repeat):
+        prev = None
+        for name, func in stages:
+            t = time.perf_counter()
+            prev = func(prev)
+            best[name] = min(best[name], time.perf_counter() - t)
+
+    peak = {}
+    prev = None
+    tracemalloc.start()
+    for name, func in stages:
+        tracemalloc.reset_peak()
+        prev = func(prev)
+        peak[name] = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+
+    return {name: {"time": best[name], "peak_mb": peak[name]} for name, _ in stages}
+
+
+def run(scales, work_dir, figures=True, repeat=3):
+    results = {}
+    for scale in scales:
+        plate_file = os.path.join(work_dir, f"plate_{scale}.txt")
+        well_map = generate_plate(plate_file, **SCALES[scale])
+        rows = sum(1 for _ in open(plate_file, "rb")) - 9
+        print(f"[{scale} wells] {rows} rows, {os.path.getsize(plate_file) / 1024**2:.1f} MB", flush=True)
+
+        results[scale] = measure(plate_file, well_map, figures, repeat)
+        for stage, r in results[scale].items():
+            print(f"  {stage:<20}{r['time'] * 1000:>10.1f} ms{r['peak_mb']:>10.1f} MB", flush=True)
+    return results
+
+
+def compare(results, baselines, threshold):
+    '''Stages slower (time) or bigger (peak memory) than baseline * (1 + threshold)'''
+    regressions = []
+    for scale, stages in results.items():
+        for stage, r in stages.items():
+            base = baselines.get(scale, {}).get(stage)
+            if not base:
+                continue
+            for metric in ("time", "peak_mb"):
+                if base[metric] > 0 and r[metric] > base[metric] * (1 + threshold):
+                    regressions.append(
+                        f"{scale}/{stage} {metric}: {r[metric]:.3f} vs baseline {base[metric]:.3f} "
+                        f"(+{100 * (r[metric] / base[metric] - 1):.0f} %)"
+                    )
+    return regressions
+
+
+def missing_baselines(results, baselines):
+    '''Measured scale/stage pairs without a baseline to compare with'''
+    return [f"{scale}/{stage}" for scale, stages in results.items()
+            for stage in stages if not baselines.get(scale, {}).get(stage)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks des étapes du traitement sur des plaques synthétiques.")
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de mesures (meilleur temps retenu)")
+    parser.add_argument("--no-figures", action="store_true", help="Ne pas mesurer save_fig")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier des références")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les résultats comme références")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Ralentissement toléré par rapport aux références (0.25 = +25 %%)")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)  # the writers use paths relative to the working directory
+        try:
+            results = run(args.scales, work_dir, not args.no_figures, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        for scale, stages in results.items():
+            baselines.setdefault(scale, {}).update(stages)
+        baselines["_machine"] = {"python": platform.python_version(), "platform": platform.platform()}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=4)
+        print(f"Références enregistrées dans {args.baseline}")
+        return 0
+
+    regressions = compare(results, baselines, args.threshold)
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    missing = missing_baselines(results, baselines)
+    if missing:
+        print(f"ERREUR : aucune référence pour {', '.join(missing)} dans {args.baseline} "
+              "(lancer avec --save-baseline pour en enregistrer).", file=sys.stderr)
+    return 1 if regressions or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
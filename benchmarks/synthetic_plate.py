@@ -0,0 +1,166 @@
+import argparse
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from backend.plate_format import PLATE_FORMATS
+from backend.well_map_store import save_well_map
+
+# Columns of a Harmony "PlateResults" export, in order
+HARMONY_COLUMNS = [
+    "Row", "Column", "Plane", "Timepoint",
+    "wound - Region Area [µm²] - Sum per Well",
+    "Number of Analyzed Fields", "Global Image Binning", "Height [µm]", "Time [s]",
+    "Temperature", "Target Temperature", "CO2", "Target CO2",
+    "Compound", "Concentration", "Cell Type", "Cell Count",
+]
+
+CONTROLS = ["DMEM+SVF", "DMEM vide"]
+DOSE_UNITS = ["ng", "pg"]
+
+
+def synthetic_well_map(plate_format, replicates=3, doses=4, seed=0):
+    '''
+    Well map of a synthetic screen: two control conditions, then compounds
+    ('CPD<i>-R') at increasing doses, each condition on 'replicates'
+    consecutive wells. Returns (well_map, {condition: kinetics parameters}).
+    '''
+    rng = np.random.default_rng(seed)
+    wells = plate_format.wells()
+    n_conditions = len(wells) // replicates
+
+    conditions = list(CONTROLS)
+    compound = 0
+    while len(conditions) < n_conditions:
+        compound += 1
+        unit = DOSE_UNITS[compound % len(DOSE_UNITS)]
+        base = 5 if unit == "ng" else 500
+        conditions += [f"CPD{compound}-R {base * 2**d}{unit}" for d in range(doses)]
+    conditions = conditions[:n_conditions]
+
+    # Logistic closure kinetics: plateau [%], rate [1/h], half-closure time [h]
+    params = {}
+    for i, cond in enumerate(conditions):
+        if cond == "DMEM+SVF":
+            params[cond] = (95.0, 0.25, 18.0)
+        elif cond == "DMEM vide":
+            params[cond] = (40.0, 0.12, 30.0)
+        else:
+            dose_rank = i % doses
+            params[cond] = (
+                rng.uniform(50, 95) * (0.7 + 0.1 * dose_rank),
+                rng.uniform(0.12, 0.3),
+                rng.uniform(14, 32) - 2 * dose_rank,
+            )
+
+    well_map = {}
+    for i, well in enumerate(wells):
+        c = i // replicates
+        if c < len(conditions):
+            cond = conditions[c]
+            well_map[well] = {"condition": cond, "replicate": i % replicates + 1,
+                              "control_group": cond in CONTROLS}
+        else:
+            well_map[well] = {"condition": None, "replicate": None, "control_group": False}
+    return well_map, params
+
+
+def generate_plate(path, plate_format="96", timepoints=25, interval_h=2.0, planes=1, fields=8,
+                   replicates=3, doses=4, seed=0, plate_name=None):
+    '''
+    Write a Harmony-style PlateResults export with realistic wound-closure kinetics
+    (logistic closure per condition, well-to-well and measurement noise, jittered
+    acquisition times) and return its well map.
+    Rows are ordered like Harmony exports: timepoint, then well, then plane.
+    '''
+    fmt = PLATE_FORMATS[str(plate_format)]
+    rng = np.random.default_rng(seed)
+    well_map, params = synthetic_well_map(fmt, replicates, doses, seed)
+    plate_name = plate_name or f"synthetic_{fmt.name}_{timepoints}tp_{planes}pl"
+
+    n_wells = fmt.n_wells
+    rows, cols = fmt.position(np.arange(n_wells))
+    plateau, rate, t50 = np.array([
+        params.get(well_map[w]["condition"], (0.0, 0.1, 24.0)) for w in fmt.wells()
+    ]).T
+    plateau = plateau * rng.normal(1.0, 0.05, n_wells)
+
+    # (timepoints, wells) acquisition time [s]: scan order delay + jitter, exactly 0 at t0
+    t = np.arange(timepoints)[:, None] * interval_h * 3600.0
+    time_s = t + np.where(t > 0, rng.uniform(-3.0, 3.0, (timepoints, n_wells)), 0.0)
+    hours = time_s / 3600.0
+
+    closure = plateau / (1 + np.exp(-rate * (hours - t50)))
+    closure -= plateau / (1 + np.exp(rate * t50))   # 0 % at t0
+    area0 = rng.normal(3.8e6, 2.5e5, (n_wells, planes)) * fields / 8
+    area = area0[None, :, :] * (1 - closure[:, :, None] / 100)
+    area *= rng.normal(1.0, 0.01, area.shape)
+    area[0] = area0
+
+    # Long table: timepoint-major, then well, then plane
+    tp_idx, w_idx, p_idx = np.meshgrid(
+        np.arange(timepoints), np.arange(n_wells), np.arange(planes), indexing="ij"
+    )
+    tp_idx, w_idx, p_idx = tp_idx.ravel(), w_idx.ravel(), p_idx.ravel()
+    n = len(tp_idx)
+
+    df = pd.DataFrame({
+        "Row": rows[w_idx],
+        "Column": cols[w_idx],
+        "Plane": p_idx + 1,
+        "Timepoint": tp_idx + 1,
+        HARMONY_COLUMNS[4]: area[tp_idx, w_idx, p_idx].round(5),
+        "Number of Analyzed Fields": np.full(n, fields),
+        "Global Image Binning": np.full(n, 4),
+        "Height [µm]": p_idx * 5,
+        "Time [s]": time_s[tp_idx, w_idx],
+        "Temperature": "Off",
+        "Target Temperature": 37,
+        "CO2": "Off",
+        "Target CO2": 5,
+    })
+    for col in HARMONY_COLUMNS[13:]:
+        df[col] = ""
+
+    header = [
+        "Database Name\tODA",
+        "Database Location\thttp://localhost/ODA/OdaService.asmx",
+        f"Evaluation Signature\t{uuid.UUID(int=int(rng.integers(2**63)))}",
+        f"Plate Name\t{plate_name}",
+        "Measurement\tMeasurement 1",
+        "Evaluation\tEvaluation1",
+        "",
+        "[Data]",
+    ]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("\r\n".join(header) + "\r\n")
+        df.to_csv(f, sep="\t", index=False, lineterminator="\t\r\n")
+
+    return well_map
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère un export PlateResults synthétique (style Harmony).")
+    parser.add_argument("output", help="Fichier .txt à écrire")
+    parser.add_argument("--format", default="96", choices=list(PLATE_FORMATS), help="Format de plaque")
+    parser.add_argument("--timepoints", type=int, default=25)
+    parser.add_argument("--interval", type=float, default=2.0, help="Intervalle entre mesures [h]")
+    parser.add_argument("--planes", type=int, default=1)
+    parser.add_argument("--fields", type=int, default=8)
+    parser.add_argument("--replicates", type=int, default=3)
+    parser.add_argument("--doses", type=int, default=4, help="Doses par composé")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    well_map = generate_plate(args.output, args.format, args.timepoints, args.interval, args.planes,
+                              args.fields, args.replicates, args.doses, args.seed)
+    map_path = os.path.splitext(args.output)[0] + ".json"
+    save_well_map(well_map, map_path)
+    print(f"{args.output} + {map_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import sys
+import time
+
+# Modules that should not be loaded before the first window is drawn
+HEAVY_MODULES = ("pandas", "matplotlib", "xlsxwriter", "numpy")
+
+
+class StartupProfile:
+    """
+    Records named checkpoints from interpreter start-up to the first paint
+    and prints the time spent (and number of modules imported) in each step.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []
+        self._last = self.t0
+        self._last_modules = len(sys.modules)
+
+    def mark(self, label):
+        """Close the current step under the given label."""
+        now = time.perf_counter()
+        n_modules = len(sys.modules)
+        self.marks.append((label, now - self._last, now - self.t0, n_modules - self._last_modules))
+        self._last, self._last_modules = now, n_modules
+
+    def report(self, file=None):
+        file = file or sys.stdout
+        print("Startup profile", file=file)
+        print(f"  {'step':<28}{'ms':>9}{'total ms':>11}{'modules':>9}", file=file)
+        for label, step, total, modules in self.marks:
+            print(f"  {label:<28}{step * 1000:>9.1f}{total * 1000:>11.1f}{modules:>9}", file=file)
+        loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        print(f"  heavy modules loaded: {', '.join(loaded) if loaded else 'none'}", file=file)
@@ -2,12 +2,16 @@ import tkinter as tk
 from tkinter import filedialog
 
 from backend.assign import (
-    ROWS, COLS,
     random_color, get_suggestions,
-    import_existing_map, export_well_map
+    import_existing_map
 )
+from backend.well_map_store import WellMapLibrary
+from backend.plate_format import PLATE_96, PLATE_FORMATS, format_of_wells
 from backend.condition_manager import ConditionManager
 
+# Suggestions are refreshed once typing pauses for this long [ms]
+SUGGESTION_DELAY_MS = 150
+
 class AssignPage(tk.Frame):
     """
     Assign conditions to wells.
@@ -25,10 +29,12 @@ class AssignPage(tk.Frame):
         self.cond_colors = {}
         self.control_conditions = {}
         self.well_buttons = {}
+        self.plate_format = PLATE_96
 
         # Condition manager
         self.condition_manager = ConditionManager()
         self.condition_library = self.condition_manager.get_all()
+        self._suggestion_job = None
 
         self._build_ui()
 
@@ -74,18 +80,18 @@ class AssignPage(tk.Frame):
 
         tk.Button(top, text="Sélectionner", command=self._set_condition, bg="#072939", fg="white").pack(side=tk.LEFT, padx=5)
 
-        # Plate grid
-        grid = tk.Frame(assign_frame, bg="#F5F6F7")
-        grid.pack(pady=10)
+        # Plate format
+        fmt_frame = tk.Frame(assign_frame, bg="#F5F6F7")
+        fmt_frame.pack(pady=5)
+        tk.Label(fmt_frame, text="Format de plaque :", bg="#F5F6F7").pack(side=tk.LEFT)
+        self.format_var = tk.StringVar(value=self.plate_format.name)
+        tk.OptionMenu(fmt_frame, self.format_var, *PLATE_FORMATS,
+                      command=lambda name: self._set_format(PLATE_FORMATS[name])).pack(side=tk.LEFT, padx=5)
 
-        for r, row in enumerate(ROWS):
-            for c, col in enumerate(COLS):
-                well = f"{row}{col}"
-                btn = tk.Button(grid, text=well, width=4,
-                                command=lambda w=well: self._assign_well(w))
-                btn.grid(row=r, column=c, padx=2, pady=2)
-                btn.bind("<Button-3>", lambda e, w=well: self._unassign_well(w))
-                self.well_buttons[well] = btn
+        # Plate grid
+        self.grid_frame = tk.Frame(assign_frame, bg="#F5F6F7")
+        self.grid_frame.pack(pady=10)
+        self._build_grid()
 
         # --- Separator ---
         sep = tk.Frame(main, width=2, bg="#072939")
@@ -106,6 +112,35 @@ class AssignPage(tk.Frame):
         self.legend_frame.pack(pady=5)
         self.legend_labels = {}
 
+    def _build_grid(self):
+        """(Re)build the well buttons for the current plate format."""
+        for w in self.grid_frame.winfo_children():
+            w.destroy()
+        self.well_buttons = {}
+
+        fmt = self.plate_format
+        small = fmt.n_wells > 96
+        for r, row in enumerate(fmt.row_labels):
+            for c, col in enumerate(fmt.col_labels):
+                well = f"{row}{col}"
+                btn = tk.Button(self.grid_frame, text="" if small else well, width=2 if small else 4,
+                                font=("Segoe UI", 6) if small else None,
+                                command=lambda w=well: self._assign_well(w))
+                btn.grid(row=r, column=c, padx=0 if small else 2, pady=0 if small else 2)
+                btn.bind("<Button-3>", lambda e, w=well: self._unassign_well(w))
+                self.well_buttons[well] = btn
+
+    def _set_format(self, plate_format):
+        """Switch plate format; assignments outside the new plate are dropped."""
+        self.plate_format = plate_format
+        self.format_var.set(plate_format.name)
+        self._build_grid()
+        for cond, wells in self.well_map.items():
+            wells[:] = [w for w in wells if w in self.well_buttons]
+            for well in wells:
+                self._refresh_button(well, cond)
+        self._update_legend()
+
     # ----------------------------------------------------------------------
     #                            UI LOGIC
     # ----------------------------------------------------------------------
@@ -114,9 +149,16 @@ class AssignPage(tk.Frame):
         self.status_label.config(text=message, fg=color, anchor="w")
 
     def _update_suggestions(self, event=None):
+        # Debounce: only the last key release of a burst refreshes the list
+        if self._suggestion_job is not None:
+            self.after_cancel(self._suggestion_job)
+        self._suggestion_job = self.after(SUGGESTION_DELAY_MS, self._show_suggestions)
+
+    def _show_suggestions(self):
+        self._suggestion_job = None
         typed = self.cond_entry.get().strip()
         self.suggestion_box.delete(0, tk.END)
-        for s in get_suggestions(typed, self.condition_library):
+        for s in get_suggestions(typed, self.condition_manager.index):
             self.suggestion_box.insert(tk.END, s)
 
     def _select_suggestion(self, event):
@@ -132,6 +174,10 @@ class AssignPage(tk.Frame):
         if not cond:
             return self._set_status("Entrer un nom de condition.", warning=True)
 
+        # Même condition écrite autrement (unité, espace) : nom de la bibliothèque
+        cond = self.condition_manager.add_condition(cond)
+        self.condition_library = self.condition_manager.get_all()
+
         self.current_condition = cond
         self.current_control = self.control_var.get()
         self.control_conditions[cond] = self.current_control
@@ -139,9 +185,6 @@ class AssignPage(tk.Frame):
         self.well_map.setdefault(cond, [])
         self.cond_colors.setdefault(cond, random_color())
 
-        self.condition_manager.add_condition(cond)
-        self.condition_library = self.condition_manager.get_all()
-
         self._update_legend()
         self._set_status(f"Condition active: {cond}", warning=False)
 
@@ -183,20 +226,24 @@ class AssignPage(tk.Frame):
     def _import_map(self):
         path = filedialog.askopenfilename(
             title="Choisir un fichier de plaque existant",
-            filetypes=[("Python", "*.py")]
+            filetypes=[("Carte de plaque", "*.json *.py"), ("JSON", "*.json"), ("Python", "*.py")]
         )
         if not path:
             return
 
-        loaded = import_existing_map(path)
+        try:
+            loaded = import_existing_map(path)
+        except (OSError, ValueError, SyntaxError) as e:
+            return self._set_status(f"Import impossible: {e}", warning=True)
 
         self.well_map.clear()
         self.cond_colors.clear()
         self.control_conditions.clear()
+        self._set_format(format_of_wells(loaded))
 
         for well, info in loaded.items():
             cond = info.get("condition")
-            if not cond:
+            if not cond or well not in self.well_buttons:
                 continue
             self.well_map.setdefault(cond, []).append(well)
             self.cond_colors.setdefault(cond, random_color())
@@ -210,30 +257,30 @@ class AssignPage(tk.Frame):
         """Export + navigate to next page."""
         final = {}
         replicate = {}
-        for row in ROWS:
-            for col in COLS:
-                well = f"{row}{col}"
-                cond = None
-                for c, wells in self.well_map.items():
-                    if well in wells:
-                        cond = c
-                        break
-                if cond:
-                    replicate.setdefault(cond, 0)
-                    replicate[cond] += 1
-                    final[well] = {
-                        "condition": cond,
-                        "replicate": replicate[cond],
-                        "control_group": self.control_conditions.get(cond, False)
-                    }
-                else:
-                    final[well] = {
-                        "condition": None,
-                        "replicate": None,
-                        "control_group": False
-                    }
-        export_well_map(final)
-        # self.controller.set_state("well_map", final)
+        for well in self.plate_format.wells():
+            cond = None
+            for c, wells in self.well_map.items():
+                if well in wells:
+                    cond = c
+                    break
+            if cond:
+                replicate.setdefault(cond, 0)
+                replicate[cond] += 1
+                final[well] = {
+                    "condition": cond,
+                    "replicate": replicate[cond],
+                    "control_group": self.control_conditions.get(cond, False)
+                }
+            else:
+                final[well] = {
+                    "condition": None,
+                    "replicate": None,
+                    "control_group": False
+                }
+        # Saved in the local library, and handed to RunPage in memory
+        key = WellMapLibrary().add(final)
+        self.controller.set_state("well_map", final)
+        self.controller.set_state("well_map_hash", key)
         self.controller.show_frame("RunPage")
 
     def on_show(self):
@@ -1,11 +1,36 @@
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, ttk
 import os
 import webbrowser
 
-from backend.data_processing import data_preprocessing, data_processing
-from backend.save_excel import save_excel
-from backend.well_map import well_map
+from backend.well_map_store import WellMapLibrary
+from backend.worker import get_worker
+
+# Interval between two polls of the worker events [ms]
+POLL_MS = 100
+
+# Status text of each pipeline stage (see backend.pipeline.STAGES)
+STAGE_LABELS = {
+    "preprocessing": "Lecture de l'en-tête",
+    "processing": "Traitement des données",
+    "excel": "Export Excel",
+    "figures": "Génération des figures",
+}
+
+# Combination of the planes / fields of each well before the baseline (see backend/baseline.py)
+PLANE_AGG_LABELS = {
+    "Plans séparés": None,
+    "Somme des plans": "sum",
+    "Moyenne des plans": "mean",
+    "Maximum des plans": "max",
+}
+
+# Error bars of the Excel charts (see backend/bootstrap.py)
+ERROR_BAR_LABELS = {
+    "Barres : écart-type": None,
+    "Barres : IC 95 % (percentile)": "percentile",
+    "Barres : IC 95 % (BCa)": "bca",
+}
 
 class RunPage(tk.Frame):
     """
@@ -18,6 +43,8 @@ class RunPage(tk.Frame):
         self.controller = controller
         self.filepath = None
         self.excel_path = None
+        self.job_id = None
+        self.stages = list(STAGE_LABELS)    # stages of the running job, in order
 
         # --- Main container ---
         main = tk.Frame(self, bg="#F5F6F7", padx=20, pady=20)
@@ -42,10 +69,54 @@ class RunPage(tk.Frame):
         self.file_label.pack(pady=5)
 
         # Run processing button
-        tk.Button(
+        self.run_btn = tk.Button(
             main, text="Lancer le traitement", width=25, bg="#072939", fg="white",
             command=self._run_backend
-        ).pack(pady=25)
+        )
+        self.run_btn.pack(pady=(25, 5))
+
+        # Plane / field aggregation (z-stack acquisitions)
+        self.plane_agg_var = tk.StringVar(value=next(iter(PLANE_AGG_LABELS)))
+        ttk.Combobox(
+            main, textvariable=self.plane_agg_var, values=list(PLANE_AGG_LABELS),
+            state="readonly", width=22
+        ).pack(pady=(0, 5))
+
+        # Standard deviation or bootstrap confidence intervals as error bars
+        self.ci_var = tk.StringVar(value=next(iter(ERROR_BAR_LABELS)))
+        ttk.Combobox(
+            main, textvariable=self.ci_var, values=list(ERROR_BAR_LABELS),
+            state="readonly", width=28
+        ).pack(pady=(0, 5))
+
+        # Outlier replicate wells left out of the results (see backend/qc.py)
+        self.qc_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            main, text="Exclure les puits aberrants", variable=self.qc_var,
+            bg="#F5F6F7", font=("Segoe UI", 9)
+        ).pack(pady=(0, 5))
+
+        # EC50 of each compound (see backend/dose_response.py)
+        self.dose_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            main, text="Courbes dose-réponse (EC50)", variable=self.dose_var,
+            bg="#F5F6F7", font=("Segoe UI", 9)
+        ).pack(pady=(0, 5))
+
+        # Opt-in per-stage profiling, written to 'plate_name/profile.json'
+        self.profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            main, text="Profiler le traitement", variable=self.profile_var,
+            bg="#F5F6F7", font=("Segoe UI", 9)
+        ).pack(pady=(0, 15))
+
+        # Progress (shown while running): number of stages of the job completed
+        self.progress = ttk.Progressbar(
+            main, mode="determinate", length=300, maximum=len(STAGE_LABELS)
+        )
+        self.cancel_btn = tk.Button(
+            main, text="Annuler", width=25, bg="#cc0000", fg="white", command=self._cancel
+        )
 
         # Status label
         self.status_label = tk.Label(
@@ -63,6 +134,11 @@ class RunPage(tk.Frame):
             width=25, bg="#072939", fg="white", command=self._back_to_home
         )
 
+    @property
+    def worker(self):
+        """Background worker (separate process, warmed up by MainApp after the first paint)."""
+        return get_worker()
+
     # ----------------------------------------------------------------------
     # UI LOGIC
     # ----------------------------------------------------------------------
@@ -83,31 +159,85 @@ class RunPage(tk.Frame):
     def _run_backend(self):
         if not self.filepath:
             return self._set_status("Choisissez d'abord un fichier.", warning=True)
+        if self.worker.busy:
+            return self._set_status("Un traitement est déjà en cours.", warning=True)
 
-        try:
-            self._set_status("Traitement en cours...", warning=False)
-            self.update()
+        well_map = self._current_well_map()
+        if not well_map:
+            return self._set_status("Aucune carte de plaque : assignez d'abord les conditions.", warning=True)
 
-            # Preprocessing
-            start, plate_name = data_preprocessing(self.filepath)
+        self._set_status("Traitement en cours...", warning=False)
+        self.open_excel_btn.pack_forget()
+        self.home_btn.pack_forget()
+        self.run_btn.config(state="disabled")
 
-            # Main processing
-            results = data_processing(
-                self.filepath,
-                well_map,
-                start,
-                plate_name
-            )
+        # Parsing, processing and Excel export run in the worker process
+        figures = False
+        self.stages = [stage for stage in STAGE_LABELS if figures or stage != "figures"]
+        self.progress.config(maximum=len(self.stages), value=0)
+        self.progress.pack(pady=5)
+        self.cancel_btn.pack(pady=5)
 
-            # Save Excel
-            self.excel_path = save_excel(results, well_map, plate_name)
-            if self.excel_path:
+        self.job_id = self.worker.submit(self.filepath, well_map, figures=figures,
+                                         profile=self.profile_var.get(),
+                                         plane_agg=PLANE_AGG_LABELS[self.plane_agg_var.get()],
+                                         ci=ERROR_BAR_LABELS[self.ci_var.get()],
+                                         qc=self.qc_var.get(),
+                                         dose_response=self.dose_var.get())
+        self.after(POLL_MS, self._poll_worker)
+
+    def _current_well_map(self):
+        """Well map handed over by AssignPage, else the last one saved in the library."""
+        well_map = self.controller.get_state("well_map")
+        if well_map is None:
+            library = WellMapLibrary()
+            key = library.latest()
+            if key is not None:
+                well_map = library.get(key)
+        return well_map
+
+    def _poll_worker(self):
+        """Handle the worker events, then poll again until the job ends."""
+        if self.job_id is None:
+            return
+
+        for event in self.worker.poll():
+            kind = event[0]
+            if kind == "ready" or event[1] != self.job_id:
+                continue
+            if kind == "progress":
+                stage = event[2]
+                if stage in self.stages:
+                    self.progress["value"] = self.stages.index(stage)
+                self._set_status(f"Traitement en cours... {STAGE_LABELS.get(stage, stage)}", warning=False)
+            elif kind == "done":
+                self.progress["value"] = self.progress["maximum"]
+                self._end_job()
+                self.excel_path = os.path.abspath(event[2]["excel_path"])
                 self._set_status("Traitement réussi!", warning=False)
                 self.open_excel_btn.pack(pady=10)
                 self.home_btn.pack(pady=5)
+                return
+            elif kind == "error":
+                self._end_job()
+                self._set_status(f"Erreur pendant le traitement: {event[2]}", warning=True)
+                return
+
+        self.after(POLL_MS, self._poll_worker)
+
+    def _cancel(self):
+        """Stop the running job; the worker is restarted in the background."""
+        if self.job_id is None:
+            return
+        self.worker.cancel()
+        self._end_job()
+        self._set_status("Traitement annulé.", warning=True)
 
-        except Exception as e:
-            self._set_status(f"Erreur pendant le traitement: {str(e)}", warning=True)
+    def _end_job(self):
+        self.job_id = None
+        self.progress.pack_forget()
+        self.cancel_btn.pack_forget()
+        self.run_btn.config(state="normal")
 
     def _open_excel(self):
         if self.excel_path and os.path.exists(self.excel_path):
@@ -117,8 +247,11 @@ class RunPage(tk.Frame):
 
     def _back_to_home(self):
         """Clear all page data and return to Home page."""
+        if self.job_id is not None:
+            self._cancel()
         self.filepath = None
         self.excel_path = None
+        self.job_id = None
         self.file_label.config(text="Aucun fichier choisi", fg="gray")
         self.status_label.config(text="")
         self.open_excel_btn.pack_forget()
@@ -1,11 +1,25 @@
+import sys
+import threading
+
+from frontend.startup_profile import StartupProfile
+
+# Started first so that imports are included (printed with --profile-startup)
+PROFILE = StartupProfile()
+
 import tkinter as tk
 from tkinter import ttk
+PROFILE.mark("import tkinter")
 
 # ---------------------------------------------------------------------------
 #  Import UI pages
+# Heavy scientific modules (numpy, pandas, matplotlib, XlsxWriter) are not imported
+# here: processing runs in the background worker (backend/worker.py).
 from frontend.ui_home import HomePage
+PROFILE.mark("import HomePage")
 from frontend.ui_assign import AssignPage
+PROFILE.mark("import AssignPage")
 from frontend.ui_run import RunPage
+PROFILE.mark("import RunPage")
 
 # ---------------------------------------------------------------------------
 # Main Application Class
@@ -22,6 +36,7 @@ class MainApp(tk.Tk):
 
     def __init__(self):
         super().__init__()
+        PROFILE.mark("create window")
 
         # ------------------- Window configuration ----------------------
         self.title("NAOS Data Analysis Tool")
@@ -49,13 +64,37 @@ class MainApp(tk.Tk):
         container.grid_rowconfigure(0, weight=1)
         container.grid_columnconfigure(0, weight=1)
 
+        # ------------------- Shared state ----------------------
+        # Data handed from one page to the next (e.g. the assigned well map)
+        self.shared_state = {}
+
         # ------------------- Frame registry ----------------------
         self.frames = {}
         self._register_pages(container)
+        PROFILE.mark("build pages")
 
         # Show the first page
         self.show_frame("HomePage")
 
+        # Once the window is drawn: start the worker process in the background
+        self._first_paint = False
+        self.bind("<Map>", self._on_first_paint, add="+")
+
+    # ------------------------------------------------------------------
+    def _on_first_paint(self, event=None):
+        if self._first_paint or event.widget is not self:
+            return
+        self._first_paint = True
+        self.after_idle(self._after_first_paint)
+
+    def _after_first_paint(self):
+        PROFILE.mark("first paint")
+        if "--profile-startup" in sys.argv:
+            PROFILE.report()
+
+        from backend.worker import get_worker
+        threading.Thread(target=get_worker, daemon=True).start()
+
     # ------------------------------------------------------------------
     def _register_pages(self, container):
         """
@@ -70,11 +109,21 @@ class MainApp(tk.Tk):
             self.frames[name] = frame
             frame.grid(row=0, column=0, sticky="nsew")
 
+    # ------------------------------------------------------------------
+    def set_state(self, key, value):
+        """Store a value shared between pages."""
+        self.shared_state[key] = value
+
+    def get_state(self, key, default=None):
+        """Read a value shared between pages."""
+        return self.shared_state.get(key, default)
+
     # ------------------------------------------------------------------
     def reset_pages(self):
         """
         Re-instantiate all pages to reset their state.
         """
+        self.shared_state.clear()
         container = self.frames["HomePage"].master  # container frame
         # Destroy old frames
         for frame in self.frames.values():
@@ -90,6 +139,8 @@ class MainApp(tk.Tk):
         """
         frame = self.frames[name]
         frame.tkraise()
+        if hasattr(frame, "on_show"):
+            frame.on_show()
 
 # ---------------------------------------------------------------------------
 #  Launch application
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.bootstrap import condition_intervals, mean_intervals, norm_ppf
+from backend.control_stats import norm_cdf
+
+
+def _coverage(out, true_mean):
+    percentile = np.mean((out["ci_low"] <= true_mean) & (true_mean <= out["ci_high"]))
+    bca = np.mean((out["bca_low"] <= true_mean) & (true_mean <= out["bca_high"]))
+    return percentile, bca
+
+
+def test_norm_ppf():
+    assert norm_ppf(0.5) == pytest.approx(0.0, abs=1e-12)
+    assert norm_ppf(0.975) == pytest.approx(1.959964, abs=1e-6)
+    assert norm_ppf(0.01) == pytest.approx(-2.326348, abs=1e-6)
+    p = np.array([1e-6, 0.02, 0.3, 0.7, 0.98, 1 - 1e-6])
+    assert norm_cdf(norm_ppf(p)) == pytest.approx(p, rel=1e-6)
+
+
+def test_coverage_normal():
+    # 2000 groups of 30 values: both intervals cover the true mean about 95 % of the time
+    samples = np.random.default_rng(1).normal(5.0, 2.0, (2000, 30))
+    percentile, bca = _coverage(mean_intervals(samples, resamples=1000), 5.0)
+    assert 0.925 <= percentile <= 0.965
+    assert 0.925 <= bca <= 0.965
+
+
+def test_bca_skewed():
+    # Right-skewed values: the BCa interval is shifted to the right and covers better
+    samples = np.random.default_rng(1).exponential(1.0, (2000, 20))
+    out = mean_intervals(samples, resamples=1000)
+    percentile, bca = _coverage(out, 1.0)
+    assert bca > percentile
+    assert np.mean(out["bca_high"] - out["mean"]) > np.mean(out["mean"] - out["bca_low"])
+    assert np.all(out["ci_low"] <= out["ci_high"]) and np.all(out["bca_low"] <= out["bca_high"])
+
+
+def test_single_value_groups():
+    out = mean_intervals(np.array([[3.0], [4.0]]))
+    assert out["mean"] == pytest.approx([3.0, 4.0])
+    assert np.isnan(out["ci_low"]).all() and np.isnan(out["bca_high"]).all()
+
+
+def _replicates(seed=0):
+    rng = np.random.default_rng(seed)
+    conditions = np.repeat(["A", "B", "C"], [8, 6, 8 * 2])
+    time_h = np.r_[np.zeros(8), np.zeros(6), np.repeat([0, 24], 8)]
+    values = rng.normal(50.0, 10.0, len(conditions))
+    return conditions, time_h, values
+
+
+def test_condition_intervals_seeded():
+    first = condition_intervals(*_replicates(), resamples=500)
+    pd.testing.assert_frame_equal(first, condition_intervals(*_replicates(), resamples=500))
+    other = condition_intervals(*_replicates(), resamples=500, seed=1)
+    assert not np.allclose(first["ci_low"], other["ci_low"])
+    assert list(first["n"]) == [8, 6, 8, 8]
+
+
+def test_condition_intervals_independent_of_other_groups():
+    # The resamples of a group only depend on its replicate count and the seed
+    conditions, time_h, values = _replicates()
+    alone = condition_intervals(conditions[:8], time_h[:8], values[:8], resamples=500)
+    others_first = np.r_[np.arange(8, len(conditions)), np.arange(8)]
+    together = condition_intervals(conditions[others_first], time_h[others_first], values[others_first],
+                                   resamples=500)
+    assert together.iloc[0]["Condition"] == "A"
+    for name in ("mean", "ci_low", "ci_high", "bca_low", "bca_high"):
+        assert together.iloc[0][name] == pytest.approx(alone.iloc[0][name])
+
+
+def test_condition_intervals_missing_values():
+    table = condition_intervals(["A", "A", None, "B"], [0, 0, 0, 0], [1.0, math.nan, 2.0, 3.0])
+    assert list(table["Condition"]) == ["A", "B"]
+    assert list(table["n"]) == [1, 1]
+    assert table["ci_low"].isna().all()
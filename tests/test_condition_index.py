@@ -0,0 +1,103 @@
+import itertools
+
+import pytest
+
+from backend.condition_index import (MIN_SIMILARITY, PREFIX_BONUS, RECENCY_HALF_LIFE, SUBSTRING_BONUS,
+                                     WORD_PREFIX_BONUS, ConditionIndex, normalize, trigrams)
+
+NOW = 1_700_000_000.0
+
+LIBRARY = ["Ctrl", "Ctrl+", "Ctrl-", "DMSO 0.1%", "Scratch only"] + [
+    f"{compound} {dose}{unit}"
+    for compound, dose, unit in itertools.product(
+        ["COL7A1-R", "COL7A1-E", "NRP1-E", "PTX-3", "VEGFA", "TGFB1"], [1, 10, 100, 2000], ["ng", "pg", "nM", "µM"])
+]
+
+
+def brute_force(names, typed, usage, n, now):
+    '''Same ranking as ConditionIndex.search, by scoring every name'''
+    query = normalize(typed)
+    if not query:
+        return []
+    index = ConditionIndex(usage=usage)
+    scored = []
+    for name in names:
+        key = normalize(name)
+        similarity = 2 * len(trigrams(query) & trigrams(key)) / (len(trigrams(query)) + len(trigrams(key)))
+        if key.startswith(query):
+            bonus = PREFIX_BONUS
+        elif any(word.startswith(query) for word in key.split()):
+            bonus = WORD_PREFIX_BONUS
+        elif query in key:
+            bonus = SUBSTRING_BONUS
+        elif similarity >= MIN_SIMILARITY:
+            bonus = 0.0
+        else:
+            continue
+        scored.append((-(similarity + bonus + index.usage_weight(name, now)), key, name))
+    return [name for _, _, name in sorted(scored)[:n]]
+
+
+USAGE = {"Ctrl": [12, NOW - 3600], "PTX-3 10nM": [3, NOW - RECENCY_HALF_LIFE], "VEGFA 100ng": [1, NOW - 60]}
+
+
+@pytest.mark.parametrize("typed", ["c", "co", "col", "COL7A1", "col7a1-e 10", "a1", "7", "nm", "µm", "uM",
+                                   "ptx3", "vegfa 10ng", "2000 pg", "ctrl", "scrach", "xyz", "%"])
+@pytest.mark.parametrize("n", [5, len(LIBRARY)])
+def test_matches_brute_force(typed, n):
+    index = ConditionIndex(LIBRARY, {k: list(v) for k, v in USAGE.items()})
+    assert index.search(typed, n, now=NOW) == brute_force(LIBRARY, typed, USAGE, n, NOW)
+
+
+@pytest.mark.parametrize("typed", ["c", "a1", "7", "l7a", "-e", "0.", "m", "2000 pg"])
+def test_every_name_containing_the_query_is_suggested(typed):
+    index = ConditionIndex(LIBRARY)
+    suggested = index.search(typed, n=len(LIBRARY))
+    assert {name for name in LIBRARY if normalize(typed) in normalize(name)} <= set(suggested)
+
+
+def test_prefix_matches_first():
+    index = ConditionIndex(["Scratch Ctrl", "Ctrl", "Ctrl+", "NRP1-E 10ng"])
+    assert index.search("ctr", n=4)[:2] == ["Ctrl", "Ctrl+"]
+    assert index.search("ctr", n=4)[2] == "Scratch Ctrl"
+
+
+def test_normalize():
+    assert normalize("  PTX-3   0.5 μM ") == "ptx-3 0.5 µm"
+    assert ConditionIndex(["PTX-3 0.5µM"]).search("ptx-3 0.5μm") == ["PTX-3 0.5µM"]
+
+
+def test_fuzzy_match_of_a_typo():
+    index = ConditionIndex(LIBRARY)
+    assert index.search("VEGAF 10ng", n=1) == ["VEGFA 10ng"]
+    assert index.search("Scracth", n=1) == ["Scratch only"]
+
+
+def test_empty_query():
+    index = ConditionIndex(LIBRARY)
+    assert index.search("") == []
+    assert index.search("   ") == []
+
+
+def test_add_and_record_use():
+    usage = {}
+    index = ConditionIndex(["PTX-3 10nM", "PTX-3 10ng"], usage)
+    assert index.search("ptx-3 10n") == ["PTX-3 10ng", "PTX-3 10nM"]    # alphabetical on a tie
+    index.record_use("PTX-3 10nM", now=NOW)
+    assert usage == {"PTX-3 10nM": [1, NOW]}                            # shared with the caller
+    assert index.search("ptx-3 10n", now=NOW) == ["PTX-3 10nM", "PTX-3 10ng"]
+
+    index.record_use("PTX-3 1µM", now=NOW)                              # indexed on first use
+    index.add("PTX-3 10ng")                                             # already indexed
+    assert len(index) == 3
+    assert index.search("ptx-3 1µ", n=1, now=NOW) == ["PTX-3 1µM"]
+
+
+def test_usage_weight_decays():
+    index = ConditionIndex(usage={"A": [3, NOW]})
+    assert index.usage_weight("B", NOW) == 0.0
+    recent = index.usage_weight("A", NOW)
+    later = index.usage_weight("A", NOW + RECENCY_HALF_LIFE)
+    assert recent > later > 0.0
+    # Only the recency part is halved
+    assert recent - later == pytest.approx((recent - index.usage_weight("A", NOW + 1e12)) / 2)
@@ -0,0 +1,63 @@
+import pytest
+
+from backend.conditions import parse_condition
+
+
+# Spellings of the same dose: value as written, canonical amount and unit
+@pytest.mark.parametrize("name, value, unit, kind, amount", [
+    ("COL7A1-R 2000pg", 2000.0, "pg", "mass", 2.0),
+    ("COL7A1-R 2 ng", 2.0, "ng", "mass", 2.0),
+    ("COL7A1-R 0,002µg", 0.002, "µg", "mass", 2.0),
+    ("COL7A1-R 0.002ug", 0.002, "ug", "mass", 2.0),
+    ("COL7A1-R 0.000002 mg", 0.000002, "mg", "mass", 2.0),
+    ("PTX-3 500000 pM", 500000.0, "pM", "molar", 500.0),
+    ("PTX-3 500 nM", 500.0, "nM", "molar", 500.0),
+    ("PTX-3 0.5 µM", 0.5, "µM", "molar", 500.0),
+    ("PTX-3 0,5μM", 0.5, "μM", "molar", 500.0),     # Greek mu
+    ("PTX-3 .0005mM", 0.0005, "mM", "molar", 500.0),
+    ("VEGFA 10", 10.0, "", "", 10.0),
+])
+def test_dose_units(name, value, unit, kind, amount):
+    c = parse_condition(name)
+    assert c.value == pytest.approx(value)
+    assert (c.unit, c.kind, c.amount) == (unit, kind, amount)
+    assert c.canonical_unit == {"mass": "ng", "molar": "nM", "": ""}[kind]
+
+
+def test_equivalent_spellings_share_key():
+    keys = {parse_condition(n).key for n in ("COL7A1-R 2000pg", "COL7A1-R 2 ng", "COL7A1-R 0,002µg")}
+    assert keys == {("COL7A1-R", "mass", 2.0)}
+    # A mass and a molar dose are never the same condition
+    assert parse_condition("X 2 ng").key != parse_condition("X 2 nM").key
+
+
+def test_name_parts():
+    c = parse_condition("COL7A1-R 2000pg")
+    assert (c.base, c.subgroup, c.family) == ("COL7A1-R", "COL7A1-R", "COL7A1")
+
+
+@pytest.mark.parametrize("name", ["Ctrl", "X 10 cells", "10 cells", "", "   ", "nan"])
+def test_names_without_dose(name):
+    c = parse_condition(name)
+    assert (c.base, c.value, c.unit, c.kind, c.amount) == (name, None, "", None, None)
+    assert c.dose_key == (0, 0.0)
+
+
+def test_none_and_non_string_input():
+    assert parse_condition(None) is None
+    assert parse_condition(12).name == "12"
+    with pytest.raises(TypeError):
+        parse_condition(["COL7A1-R 2ng"])     # unhashable: not a condition name
+
+
+def test_memoized():
+    parse_condition.cache_clear()
+    first = parse_condition("NRP1-E 2000 pg")
+    assert parse_condition("NRP1-E 2000 pg") is first
+    assert parse_condition.cache_info().hits == 1
+
+
+def test_dose_sort_order():
+    names = ["X 1 µM", "X", "X 5", "X 500 ng", "X 20 pg", "X 100 nM"]
+    ordered = sorted(names, key=lambda n: parse_condition(n).dose_key)
+    assert ordered == ["X", "X 5", "X 20 pg", "X 500 ng", "X 100 nM", "X 1 µM"]
@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.control_stats import dunnett_p, fdr_bh, t_sf2
+
+
+# Two-sided 5 % critical values of Student's t (3 decimals)
+@pytest.mark.parametrize("df, critical", [
+    (1, 12.706),
+    (2, 4.303),
+    (5, 2.571),
+    (10, 2.228),
+    (20, 2.086),
+    (1e6, 1.960),
+])
+def test_t_sf2_critical_values(df, critical):
+    assert t_sf2(critical, df) == pytest.approx(0.05, abs=1e-4)
+    assert t_sf2(-critical, df) == pytest.approx(0.05, abs=1e-4)
+
+
+def test_t_sf2_limits():
+    assert t_sf2(0.0, 10) == pytest.approx(1.0)
+    assert t_sf2(np.inf, 10) == 0.0
+    assert math.isnan(t_sf2(np.nan, 10))
+
+
+# Two-sided 5 % critical values of Dunnett's test with equal group sizes (2 decimals):
+# k comparisons to the control, df degrees of freedom of the pooled variance
+@pytest.mark.parametrize("df, k, critical", [
+    (10, 2, 2.57),
+    (10, 4, 2.89),
+    (20, 2, 2.38),
+    (20, 3, 2.54),
+    (20, 4, 2.65),
+    (60, 2, 2.27),
+    (60, 4, 2.51),
+    (1e6, 2, 2.21),
+    (1e6, 4, 2.44),
+])
+def test_dunnett_critical_values(df, k, critical):
+    t = np.full((1, k), critical)
+    b = np.full((1, k), math.sqrt(0.5))    # equal n: corr(T_i, T_j) = 1/2
+    p = dunnett_p(t, b, np.array([df]))
+    assert p == pytest.approx(np.full((1, k), 0.05), abs=2e-3)
+
+
+def test_dunnett_several_families_and_padding():
+    # Families are independent: batching them gives the per-family p-values
+    t = np.array([[2.38, 2.38], [2.65, np.nan]])
+    b = np.array([[math.sqrt(0.5)] * 2, [math.sqrt(0.5), np.nan]])
+    df = np.array([20.0, 20.0])
+    p = dunnett_p(t, b, df)
+    assert p[0] == pytest.approx(dunnett_p(t[:1], b[:1], df[:1])[0])
+    assert math.isnan(p[1, 1])
+    # A single comparison is a plain t test
+    assert p[1, 0] == pytest.approx(t_sf2(2.65, 20), abs=1e-4)
+
+
+def test_fdr_bh_hand_computed():
+    # Sorted p: 0.005 0.01 0.03 0.04, m = 4 -> p * m / rank: 0.02 0.02 0.04 0.04
+    q = fdr_bh([0.01, 0.04, 0.03, 0.005, np.nan])
+    assert q[:4] == pytest.approx([0.02, 0.04, 0.04, 0.02])
+    assert math.isnan(q[4])
+
+
+def test_fdr_bh_step_up():
+    # p * m / rank: 0.03 0.045 0.031, the minimum over the larger ranks gives 0.031 to rank 2
+    assert fdr_bh([0.031, 0.01, 0.03]) == pytest.approx([0.031, 0.03, 0.031])
+    assert fdr_bh([0.5, 0.9]) == pytest.approx([0.9, 0.9])
+    assert fdr_bh([0.8, 0.9, 0.95]).max() <= 1.0
+    assert fdr_bh([]).shape == (0,)
@@ -0,0 +1,127 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.dose_response import (DOSE_COLUMNS, EC50_MARGIN, MAX_HILL, endpoint_fits, fit_dose_response,
+                                   logistic4)
+
+DOSES = np.array([1.0, 3.0, 10.0, 30.0, 100.0, 300.0])
+LOG_DOSES = np.log10(DOSES)
+
+
+def stats(compound, unit, doses, means, n=3, var=1.0, time=24):
+    '''Statistics table of one compound at one time (see control_stats.group_stats)'''
+    return pd.DataFrame({
+        "Condition": [f"{compound} {d:g}{unit}" for d in doses],
+        "Time_h": time,
+        "n": n,
+        "mean": means,
+        "var": var,
+    })
+
+
+def _fit(*tables):
+    return fit_dose_response(pd.concat(tables, ignore_index=True)).set_index("Compound")
+
+
+def test_recovers_known_parameters():
+    fit = _fit(stats("CPD1", "ng", DOSES, logistic4(LOG_DOSES, 10.0, 80.0, math.log10(20), 1.2)))
+    assert list(fit.reset_index().columns) == DOSE_COLUMNS
+    row = fit.loc["CPD1"]
+    assert (row["bottom"], row["top"], row["hill"]) == pytest.approx((10.0, 80.0, 1.2), rel=1e-4)
+    assert row["ec50"] == pytest.approx(20.0, rel=1e-4)
+    assert row["in_range"]
+    assert (row["Unit"], row["n_doses"], row["n_wells"]) == ("ng", 6, 18)
+    assert (row["dose_min"], row["dose_max"]) == (1.0, 300.0)
+
+
+def test_decreasing_response_and_canonical_unit():
+    # Doses written in pg: the EC50 is reported in ng
+    fit = _fit(stats("CPD2", "pg", DOSES * 1000, logistic4(LOG_DOSES, 70.0, 15.0, math.log10(8), 1.5)))
+    row = fit.loc["CPD2"]
+    assert row["Unit"] == "ng"
+    assert row["ec50"] == pytest.approx(8.0, rel=1e-4)
+    assert row["hill"] * (row["top"] - row["bottom"]) < 0
+
+
+def test_rmse_and_r2_over_the_wells():
+    fit = _fit(stats("CPD1", "ng", DOSES, logistic4(LOG_DOSES, 10.0, 80.0, math.log10(20), 1.2), var=4.0))
+    row = fit.loc["CPD1"]
+    # The means are fitted exactly: only the spread of the wells (variance 4, 2 degrees of freedom) is left
+    assert row["rmse"] == pytest.approx(math.sqrt(2 * 4.0 / 3), rel=1e-4)
+    assert 0.99 < row["r2"] < 1.0
+
+
+def test_flat_response_has_no_ec50():
+    fit = _fit(stats("FLAT", "ng", DOSES, np.full(len(DOSES), 40.0)))
+    row = fit.loc["FLAT"]
+    assert math.isnan(row["ec50"]) and math.isnan(row["hill"])
+    assert not row["in_range"]
+
+
+def test_step_response_hill_at_bound():
+    fit = _fit(stats("STEP", "ng", DOSES, np.where(DOSES < 20, 10.0, 90.0)))
+    row = fit.loc["STEP"]
+    assert abs(row["hill"]) == pytest.approx(MAX_HILL)
+    assert row["in_range"]
+
+
+def test_ec50_pinned_at_the_bound():
+    # True EC50 at 10^4 ng, beyond the tested doses: the fit stops EC50_MARGIN decades above them
+    fit = _fit(stats("FAR", "ng", DOSES, logistic4(LOG_DOSES, 0.0, 100.0, 4.0, 0.5)))
+    row = fit.loc["FAR"]
+    assert row["log10_ec50"] == pytest.approx(LOG_DOSES.max() + EC50_MARGIN)
+    assert not row["in_range"]
+
+
+def test_ec50_outside_the_doses():
+    fit = _fit(stats("OUT", "ng", DOSES, logistic4(LOG_DOSES, 5.0, 95.0, math.log10(3000), 1.0)))
+    row = fit.loc["OUT"]
+    assert LOG_DOSES.max() < row["log10_ec50"] <= LOG_DOSES.max() + EC50_MARGIN
+    assert not row["in_range"]
+
+
+@pytest.mark.parametrize("means", [10 + 12 * LOG_DOSES, 90 - 12 * LOG_DOSES])
+def test_plateaus_bounded(means):
+    row = _fit(stats("LIN", "ng", DOSES, means)).loc["LIN"]
+    assert 0.0 <= row["bottom"] <= 100.0 and 0.0 <= row["top"] <= 100.0
+    assert abs(row["hill"]) <= MAX_HILL
+
+
+def test_several_compounds_at_once():
+    # Batched fits are independent: each compound gives the same fit alone
+    first = stats("CPD1", "ng", DOSES, logistic4(LOG_DOSES, 10.0, 80.0, math.log10(20), 1.2))
+    second = stats("PTX-3", "nM", DOSES, logistic4(LOG_DOSES, 20.0, 60.0, math.log10(50), 0.8))
+    together = _fit(second, first)
+    assert list(together.index) == ["CPD1", "PTX-3"]
+    for table in (first, second):
+        alone = _fit(table)
+        compound = alone.index[0]
+        for name in ("bottom", "top", "ec50", "hill"):
+            assert together.loc[compound, name] == pytest.approx(alone.loc[compound, name])
+    assert together.loc["PTX-3", "Unit"] == "nM"
+
+
+def test_conditions_left_out():
+    fit = _fit(
+        stats("FEW", "ng", DOSES[:3], [10.0, 40.0, 80.0]),     # fewer than MIN_DOSES doses
+        pd.DataFrame({"Condition": ["Ctrl", "CPD1 0ng"], "Time_h": 24, "n": 3, "mean": 5.0, "var": 1.0}),
+        stats("CPD1", "ng", DOSES, logistic4(LOG_DOSES, 10.0, 80.0, math.log10(20), 1.2)),
+    )
+    assert list(fit.index) == ["CPD1"]
+    assert fit.loc["CPD1", "n_doses"] == 6
+    assert fit_dose_response(stats("FEW", "ng", DOSES[:3], [10.0, 40.0, 80.0])).empty
+
+
+def test_endpoint_fits():
+    means = logistic4(LOG_DOSES, 10.0, 80.0, math.log10(20), 1.2)
+    table = fit_dose_response(pd.concat([
+        stats("CPD1", "ng", DOSES, means, time=t) for t in (0, 24, 48)
+    ] + [stats("CPD2", "ng", DOSES, means, time=24)], ignore_index=True))
+    last = endpoint_fits(table)
+    assert sorted(zip(last["Compound"], last["Time_h"])) == [("CPD1", 48), ("CPD2", 24)]
+    at_24 = endpoint_fits(table, endpoint="24")
+    assert sorted(at_24["Compound"]) == ["CPD1", "CPD2"]
+    assert endpoint_fits(table, endpoint=12).empty
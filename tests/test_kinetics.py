@@ -0,0 +1,104 @@
+import math
+
+import numpy as np
+import pytest
+
+from backend.kinetics import (area_under_curve, crossing_time, curve_metrics, fit_logistic, initial_rate,
+                              plateau)
+
+HOURS = np.arange(0.0, 49.0, 4.0)
+
+
+def _logistic(K, r, tmid, time=HOURS):
+    return K / (1 + np.exp(-r * (time - tmid)))
+
+
+def _curves(*closures):
+    closure = np.array(closures, dtype=np.float64)
+    return np.broadcast_to(HOURS, closure.shape).copy(), closure
+
+
+def test_linear_curve_metrics():
+    # closure = 2 t over 0..48 h: slope 2, 50 % at 25 h, last three points 80, 88, 96
+    time, closure = _curves(2 * HOURS)
+    assert initial_rate(time, closure) == pytest.approx([2.0])
+    assert crossing_time(time, closure, 50.0) == pytest.approx([25.0])
+    assert plateau(time, closure) == pytest.approx([88.0])
+    assert area_under_curve(time, closure) == pytest.approx([48.0 * 96.0 / 2])
+
+
+def test_missing_points_are_skipped():
+    closure = 2 * HOURS
+    closure[[1, 6, 7]] = np.nan          # 4 h, 24 h, 28 h
+    time, closure = _curves(closure)
+    # The initial slope uses the first three valid points 0, 8, 12 h
+    assert initial_rate(time, closure) == pytest.approx([2.0])
+    # 50 % is interpolated between 20 h and 32 h
+    assert crossing_time(time, closure, 50.0) == pytest.approx([25.0])
+    # The trapezoids bridge the gaps: a straight line is still integrated exactly
+    assert area_under_curve(time, closure) == pytest.approx([48.0 * 96.0 / 2])
+
+
+def test_degenerate_curves():
+    time, closure = _curves(np.full(len(HOURS), 30.0), np.full(len(HOURS), np.nan),
+                            np.r_[10.0, np.full(len(HOURS) - 1, np.nan)])
+    assert math.isnan(crossing_time(time, closure, 50.0)[0])    # never reached
+    assert np.isnan(initial_rate(time, closure)[1:]).all()       # fewer than 2 points
+    assert np.isnan(area_under_curve(time, closure)[1:]).all()
+    assert math.isnan(plateau(time, closure)[1])
+    assert plateau(time, closure)[2] == pytest.approx(10.0)
+
+
+def test_crossing_time_per_curve_level():
+    time, closure = _curves(2 * HOURS, 2 * HOURS)
+    assert crossing_time(time, closure, [20.0, 70.0]) == pytest.approx([10.0, 35.0])
+
+
+# Known logistic parameters: K [%], r [1/h], t_mid [h]
+PARAMS = [(80.0, 0.3, 20.0), (60.0, 0.15, 30.0), (95.0, 0.5, 12.0), (40.0, 0.2, 24.0)]
+
+
+def test_fit_logistic_exact_curves():
+    time, closure = _curves(*(_logistic(*p) for p in PARAMS))
+    K, r, tmid, rmse = fit_logistic(time, closure)
+    assert np.column_stack([K, r, tmid]) == pytest.approx(np.array(PARAMS), rel=1e-6)
+    assert rmse == pytest.approx(np.zeros(len(PARAMS)), abs=1e-6)
+
+
+def test_fit_logistic_noisy_curves():
+    rng = np.random.default_rng(0)
+    time, closure = _curves(*(_logistic(*p) + rng.normal(0, 1.0, len(HOURS)) for p in PARAMS))
+    K, r, tmid, rmse = fit_logistic(time, closure)
+    expected = np.array(PARAMS)
+    assert K == pytest.approx(expected[:, 0], abs=3.0)
+    assert r == pytest.approx(expected[:, 1], abs=0.05)
+    assert tmid == pytest.approx(expected[:, 2], abs=1.0)
+    assert np.all((0.5 < rmse) & (rmse < 1.5))
+
+
+def test_fit_logistic_batch_matches_single_curves():
+    # Each curve is fitted independently: missing points of one curve do not affect another
+    rng = np.random.default_rng(1)
+    closures = [_logistic(*p) + rng.normal(0, 1.0, len(HOURS)) for p in PARAMS]
+    closures[1][[2, 5, 9]] = np.nan
+    time, closure = _curves(*closures)
+    batch = np.column_stack(fit_logistic(time, closure))
+    for i in range(len(PARAMS)):
+        single = np.column_stack(fit_logistic(time[i:i + 1], closure[i:i + 1]))
+        assert batch[i] == pytest.approx(single[0])
+
+
+def test_fit_logistic_too_few_points():
+    closure = _logistic(*PARAMS[0])
+    closure[3:] = np.nan
+    time, closure = _curves(closure, _logistic(*PARAMS[0]))
+    K, r, tmid, rmse = fit_logistic(time, closure)
+    assert np.isnan([K[0], r[0], tmid[0], rmse[0]]).all()
+    assert K[1] == pytest.approx(80.0)
+
+
+def test_curve_metrics_max_closure():
+    time, closure = _curves(2 * HOURS, np.full(len(HOURS), np.nan))
+    metrics = curve_metrics(time, closure)
+    assert metrics["max_closure"][0] == pytest.approx(96.0)
+    assert math.isnan(metrics["max_closure"][1])
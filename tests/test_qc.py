@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.data_processing import data_preprocessing, data_processing
+from backend.qc import excluded_wells, flag_outliers, robust_z
+from benchmarks.synthetic_plate import generate_plate
+
+HOURS = np.arange(0, 48, 4)
+
+
+def _replicates(wells_per_condition=4, seed=0):
+    '''Flat (wells, conditions, time_h, values) of noisy logistic closure curves'''
+    rng = np.random.default_rng(seed)
+    rows = []
+    for c, condition in enumerate(["A", "B"]):
+        curve = (60 + 20 * c) / (1 + np.exp(-(HOURS - 24) / 4))
+        for r in range(wells_per_condition):
+            well = f"{'AB'[c]}{r + 1}"
+            rows += [(well, condition, h, v) for h, v in zip(HOURS, curve + rng.normal(0, 1.5, len(HOURS)))]
+    wells, conditions, time_h, values = (np.array(v) for v in zip(*rows))
+    return wells, conditions, time_h, values.astype(np.float64)
+
+
+def _decisions(table):
+    return dict(zip(table["Well"], table["decision"]))
+
+
+def test_robust_z():
+    z, median = robust_z([1.0, 2.0, 3.0, 4.0, 100.0], np.zeros(5), min_mad=0.0)
+    assert np.allclose(median, 3.0)
+    # MAD of the non-zero distances (2, 1, 1, 97) is 1.5
+    assert np.allclose(z, 0.6745 * (np.array([1.0, 2.0, 3.0, 4.0, 100.0]) - 3.0) / 1.5)
+
+
+def test_clean_plate_has_no_outlier():
+    table = flag_outliers(*_replicates())
+    assert set(table["decision"]) == {"ok"}
+    assert len(table) == 8
+
+
+def test_planted_outlier_well_is_excluded():
+    wells, conditions, time_h, values = _replicates()
+    values = np.where((wells == "A3") & (time_h >= 8), values + 30, values)
+    table = flag_outliers(wells, conditions, time_h, values)
+    decisions = _decisions(table)
+    assert decisions.pop("A3") == "excluded"
+    assert set(decisions.values()) == {"ok"}
+    assert "curve" in table.set_index("Well").loc["A3", "reason"]
+    assert excluded_wells(table) == {"A3"}
+
+
+def test_single_outlier_point_keeps_the_well():
+    wells, conditions, time_h, values = _replicates()
+    values = np.where((wells == "B2") & (time_h == 24), values + 40, values)
+    table = flag_outliers(wells, conditions, time_h, values).set_index("Well")
+    assert table.loc["B2", "outlier_points"] == 1
+    assert set(table["decision"]) == {"ok"}
+
+
+def test_small_conditions_are_not_judged():
+    wells, conditions, time_h, values = _replicates(wells_per_condition=2)
+    values = np.where(wells == "A2", values + 50, values)
+    assert set(flag_outliers(wells, conditions, time_h, values)["decision"]) == {"ok"}
+
+
+@pytest.mark.parametrize("chunksize", [None, 300])
+def test_excluded_well_left_out_of_condition_results(tmp_path, monkeypatch, chunksize):
+    monkeypatch.chdir(tmp_path)
+    plate_file = "plate.txt"
+    well_map = generate_plate(plate_file, plate_format="96", timepoints=8, fields=1)
+
+    # Well A1 (3 replicates of its condition) shrinks to 30 % of its area after t0
+    with open(plate_file, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    data = lines.index("[Data]") + 2
+    for i in range(data, len(lines)):
+        cells = lines[i].split("\t")
+        if len(cells) > 4 and cells[:2] == ["1", "1"] and cells[3] != "1":
+            cells[4] = str(float(cells[4]) * 0.3)
+            lines[i] = "\t".join(cells)
+    with open(plate_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+    start, plate_name = data_preprocessing(plate_file)
+    results = data_processing(plate_file, well_map, start, plate_name, use_cache=False, qc=True,
+                              chunksize=chunksize)
+    csv_dir = os.path.join(plate_name, "csv")
+    qc = pd.read_csv(os.path.join(csv_dir, "qc_wells.csv"))
+    assert excluded_wells(qc) == {"A1"}
+
+    # The condition of A1 is the mean of its two other wells
+    condition = well_map["A1"]["condition"]
+    wells = pd.read_csv(os.path.join(csv_dir, "results_sorted.csv"))
+    kept = wells[(wells["Condition"] == condition) & (wells["Well"] != "A1")]
+    expected = kept.groupby("Time_h")["Closure"].mean()
+    got = results[results["Condition"] == condition].set_index("Time_h")["mean"]
+    assert np.allclose(got.to_numpy(), expected.loc[got.index].to_numpy())
+    assert (wells.loc[wells["Well"] == "A1", "Closure"].max()) > 60    # still in the per-well table
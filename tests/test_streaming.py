@@ -0,0 +1,42 @@
+import os
+
+import pandas as pd
+import pytest
+
+from backend.data_processing import data_preprocessing, data_processing
+from benchmarks.synthetic_plate import generate_plate
+
+
+def _process(plate_file, well_map, out_dir, monkeypatch, **options):
+    '''Run data_processing in out_dir (outputs are written relative to the working directory)'''
+    os.makedirs(out_dir)
+    monkeypatch.chdir(out_dir)
+    start, plate_name = data_preprocessing(plate_file)
+    data_processing(plate_file, well_map, start, plate_name, use_cache=False, **options)
+    return os.path.join(out_dir, plate_name, "csv")
+
+
+def _read(csv_dir, name, keys):
+    df = pd.read_csv(os.path.join(csv_dir, name), dtype={"Condition": str})
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("plane_agg", [None, "sum"])
+def test_streaming_matches_dense(tmp_path, monkeypatch, plane_agg):
+    plate_file = str(tmp_path / "plate.txt")
+    well_map = generate_plate(plate_file, plate_format="96", timepoints=6, planes=2, fields=2)
+
+    dense = _process(plate_file, well_map, tmp_path / "dense", monkeypatch, plane_agg=plane_agg)
+    # Small chunks: images and timepoint groups are split across chunks
+    streamed = _process(plate_file, well_map, tmp_path / "streamed", monkeypatch,
+                        plane_agg=plane_agg, chunksize=257)
+
+    sorted_keys = ["Well", "Time_s", "Area_t0", "Area_um2"]
+    pd.testing.assert_frame_equal(_read(dense, "results_sorted.csv", sorted_keys),
+                                  _read(streamed, "results_sorted.csv", sorted_keys), check_dtype=False)
+    plot_keys = ["Condition", "Time_h"]
+    pd.testing.assert_frame_equal(_read(dense, "results_plot.csv", plot_keys),
+                                  _read(streamed, "results_plot.csv", plot_keys), check_dtype=False)
+    stats_keys = ["Condition", "Control", "Time_h"]
+    pd.testing.assert_frame_equal(_read(dense, "stats_vs_control.csv", stats_keys),
+                                  _read(streamed, "stats_vs_control.csv", stats_keys), check_dtype=False)